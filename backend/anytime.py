@@ -0,0 +1,84 @@
+"""
+Description : Mode "anytime" : les planificateurs publient chaque meilleure solution au fil de la recherche
+Licence : On devrait peut-être mettre une licence hein
+Anno : 43
+
+Un IncumbentStream est passé au planificateur (paramètre stream=) :
+- le planificateur appelle publier() à chaque amélioration du meilleur coût global
+  et regarde arret_demande() régulièrement pour s'arrêter plus tôt ;
+- le serveur lit les solutions avec recevoir() et les pousse au navigateur en
+  Server-Sent Events, et appelle arreter() quand l'utilisateur accepte la solution courante.
+La file et l'événement viennent du contexte multiprocessing "spawn" : les workers des
+restarts parallèles publient directement dedans.
+"""
+import json
+import multiprocessing
+import queue
+import time
+from typing import Dict, Iterator, Optional
+
+_MP_CONTEXTE = multiprocessing.get_context("spawn")
+
+
+class IncumbentStream:
+    def __init__(self):
+        self.debut = time.time()
+        self._file = _MP_CONTEXTE.Queue()
+        self._arret = _MP_CONTEXTE.Event()
+        self.dernier: Optional[Dict] = None  # dernière solution reçue (côté lecteur)
+
+    def publier(self, cout: float, assignment: Dict[str, Optional[str]], solveur: str):
+        """Appelé par le planificateur (éventuellement depuis un worker)."""
+        self._file.put({
+            "cout": cout,
+            "assignes": sum(1 for c in assignment.values() if c),
+            "total": len(assignment),
+            "temps": round(time.time() - self.debut, 3),
+            "solveur": solveur,
+            "assignment": {m: c for m, c in assignment.items() if c},
+        })
+
+    def arreter(self):
+        """L'utilisateur garde la meilleure solution actuelle : le planificateur s'arrête au plus tôt."""
+        self._arret.set()
+
+    def arret_demande(self) -> bool:
+        return self._arret.is_set()
+
+    def recevoir(self, timeout: float = 1.0) -> Optional[Dict]:
+        """Prochaine solution publiée, None si rien n'est arrivé pendant timeout secondes."""
+        try:
+            solution = self._file.get(timeout=timeout)
+        except queue.Empty:
+            return None
+        self.dernier = solution
+        return solution
+
+
+def evenement_sse(nom: str, donnees) -> str:
+    """Formate un message Server-Sent Events."""
+    return f"event: {nom}\ndata: {json.dumps(donnees, ensure_ascii=False)}\n\n"
+
+
+def flux_sse(stream: IncumbentStream, termine, resultat, heartbeat: float = 15.0) -> Iterator[str]:
+    """
+    Générateur pour la réponse HTTP : un événement "incumbent" par solution améliorée,
+    puis "done" avec resultat() quand termine() est vrai (et la file vidée).
+    Un commentaire est envoyé toutes les `heartbeat` secondes pour garder la connexion ouverte.
+    """
+    if stream.dernier is not None:
+        yield evenement_sse("incumbent", stream.dernier)
+    dernier_envoi = time.time()
+    while True:
+        fini = termine()
+        solution = stream.recevoir(timeout=0.5)
+        if solution is not None:
+            yield evenement_sse("incumbent", solution)
+            dernier_envoi = time.time()
+            continue
+        if fini:
+            yield evenement_sse("done", resultat())
+            return
+        if time.time() - dernier_envoi > heartbeat:
+            yield ": keep-alive\n\n"
+            dernier_envoi = time.time()
@@ -1,11 +1,22 @@
-from flask import Flask, request, jsonify, send_file, send_from_directory
+from flask import Flask, request, jsonify, send_file, send_from_directory, Response, stream_with_context
 from flask_cors import CORS
 import os
+import threading
+import uuid
 from pathlib import Path
 from dotenv import load_dotenv
 import json
-#from scheduler_repetition import RepetitionScheduler
+from scheduler_repetition import RepetitionScheduler
 from scheduler import OptimizedRepetitionScheduler
+from hybrid import HybridScheduler
+from lexicographic import LexicographicScheduler
+from decomposition import DecomposedScheduler
+from rolling_horizon import RollingHorizonScheduler
+from anytime import IncumbentStream, flux_sse
+from cpsat_profiles import coeurs_disponibles
+from parse_cache import cache_par_defaut
+from upload_validation import UploadInvalide, probleme, valider_upload
+from warm_start import charger_fichier_solution, charger_solution
 import traceback
 
 load_dotenv()
@@ -35,6 +46,11 @@ GENERATED_FILE_PATH = None
 os.makedirs(UPLOAD_FOLDER, exist_ok=True)
 os.makedirs(EXPORTS_FOLDER, exist_ok=True)
 
+# Cache des fichiers déjà lus (voir parse_cache.py) : un re-planning qui ne change que
+# les paramètres ne relit pas les Excel. Par l'environnement, pour que les processus de
+# la décomposition en profitent aussi.
+os.environ.setdefault("PARSE_CACHE_DIR", str(DATA_DIR / "cache"))
+
 @app.route('/')
 def serve_frontend():
     """Sert le fichier index.html du frontend"""
@@ -60,43 +76,138 @@ def serve_public_image(filename):
     images_dir = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'images', 'public')
     return send_from_directory(images_dir, filename)
 
-@app.route('/api/upload', methods=['POST'])
-def upload():
+def _warm_start_depuis_formulaire():
+    """
+    Solution précédente (dict morceau -> créneau) : fichier exporté envoyé, "last" (dernier
+    export du serveur) ou texte JSON. Le champ texte n'est jamais pris pour un chemin : seuls
+    le fichier envoyé et le dernier export sont lus sur le disque. Illisible : UploadInvalide (422).
+    """
+    texte = request.form.get("warm_start") or None
     try:
-        dispo_file = request.files['disponibilites']
-        repart_file = request.files['repartition']
-        maybe_penalty = int(request.form['maybe_penalty'])
-        max_load = int(request.form['max_load'])
-        load_penalty = int(request.form['load_penalty'])
-        group_bonus = int(request.form['group_bonus'])
-        seuil_absence = int(request.form.get("seuil_absence", 0))
-        mode_absence = request.form.get("mode_absence", "strict")
-        timeout_limit = int(request.form.get("timeout_limit", 120))
-        # NOUVEAU : récupération des créneaux spéciaux
-        creneaux_speciaux_json = request.form.get("creneaux_speciaux", "[]")
-        creneaux_speciaux = json.loads(creneaux_speciaux_json) if creneaux_speciaux_json else []
-        seuil_absence_special = int(request.form.get("seuil_absence_creneau_special", 5))
-       
-
-        dispo_path = UPLOAD_FOLDER / dispo_file.filename
-        repart_path = UPLOAD_FOLDER / repart_file.filename
-        
-        dispo_file.save(str(dispo_path))
-        repart_file.save(str(repart_path))
+        if 'warm_start' in request.files:
+            warm_file = request.files['warm_start']
+            # seule l'extension du nom envoyé est gardée (.xlsx ou .json)
+            chemin = UPLOAD_FOLDER / f"warm_start{Path(warm_file.filename or '').suffix.lower()}"
+            warm_file.save(str(chemin))
+            return charger_fichier_solution(str(chemin))
+        if texte == "last":
+            if GENERATED_FILE_PATH and os.path.exists(GENERATED_FILE_PATH):
+                return charger_fichier_solution(GENERATED_FILE_PATH)
+            return None
+        return charger_solution(texte) if texte else None
+    except Exception as e:  # JSON invalide, xlsx sans feuille "Planning"...
+        raise UploadInvalide([probleme("warm_start_illisible", "warm_start",
+                                       f"Solution précédente illisible : {e}", exception=type(e).__name__)])
 
-        print("🧾 Params :", maybe_penalty, max_load, load_penalty, group_bonus, 
-              mode_absence, seuil_absence, f"timeout={timeout_limit}s")
+def _planner_depuis_formulaire(stream=None):
+    """
+    Sauvegarde les fichiers envoyés, les vérifie (UploadInvalide s'ils sont refusés) et
+    construit le planificateur avec les paramètres du formulaire.
+    Renvoie (planificateur, avertissements de la vérification).
+    """
+    dispo_file = request.files['disponibilites']
+    repart_file = request.files['repartition']
+    maybe_penalty = int(request.form['maybe_penalty'])
+    max_load = int(request.form['max_load'])
+    load_penalty = int(request.form['load_penalty'])
+    group_bonus = int(request.form['group_bonus'])
+    seuil_absence = int(request.form.get("seuil_absence", 0))
+    mode_absence = request.form.get("mode_absence", "strict")
+    timeout_limit = int(request.form.get("timeout_limit", 120))
+    # NOUVEAU : récupération des créneaux spéciaux
+    creneaux_speciaux_json = request.form.get("creneaux_speciaux", "[]")
+    creneaux_speciaux = json.loads(creneaux_speciaux_json) if creneaux_speciaux_json else []
+    seuil_absence_special = int(request.form.get("seuil_absence_creneau_special", 5))
+    # nombre de processus pour les restarts en parallèle (1 = séquentiel), au plus les cœurs
+    # vraiment disponibles (quota cgroup compris : os.cpu_count() donne ceux de l'hôte)
+    workers = max(1, min(int(request.form.get("workers", 1)), coeurs_disponibles()))
+    # moteur de recherche locale : "min_conflicts", "tabu" ou "annealing"
+    engine = request.form.get("engine", "min_conflicts")
+    # voisinages composés, liste JSON parmi "swap", "chain", "day" (absent = aucun)
+    neighbourhoods_json = request.form.get("neighbourhoods")
+    neighbourhoods = json.loads(neighbourhoods_json) if neighbourhoods_json else []
+    # arrêt anticipé : pas d'amélioration depuis N secondes (absent ou 0 = jamais, le front propose un curseur), écart relatif à la borne
+    stagnation_seconds = float(request.form.get("stagnation_seconds", 0)) or None
+    gap_tolerance = float(request.form.get("gap_tolerance", 0))
+    # solution précédente : fichier exporté envoyé, "last" (dernier export du serveur) ou JSON
+    warm_start = _warm_start_depuis_formulaire()
+    # solveur : "local" (recherche locale), "cpsat" (exact), "hybrid" (local puis CP-SAT)
+    # ou "lexicographic" (CP-SAT, un critère après l'autre au lieu de la somme pondérée)
+    solver = request.form.get("solver", "local")
+    if solver not in ("local", "cpsat", "hybrid", "lexicographic"):
+        raise ValueError(f"Solveur inconnu : {solver} (choix : local, cpsat, hybrid, lexicographic)")
+    local_time_limit = request.form.get("local_time_limit")
+    # découpe en groupes de morceaux sans musicien commun, résolus en parallèle (workers processus)
+    decomposition = request.form.get("decomposition", "").lower() in ("1", "true", "on")
+    if decomposition and solver == "hybrid":
+        raise ValueError("La décomposition n'est pas disponible avec le solveur hybrid")
+    # horizon glissant : fenêtres de rolling_weeks semaines (0 = toute la saison d'un bloc),
+    # dont rolling_overlap re-résolues par la fenêtre suivante
+    rolling_weeks = int(request.form.get("rolling_weeks", 0))
+    rolling_overlap = int(request.form.get("rolling_overlap", 0))
+    if rolling_weeks and (solver == "hybrid" or decomposition):
+        raise ValueError("L'horizon glissant n'est disponible ni avec le solveur hybrid, ni avec la décomposition")
+    # réglages CP-SAT (solveurs cpsat, hybrid et lexicographic) : profil, threads (0 = selon les cœurs du serveur)
+    cpsat_profile = request.form.get("cpsat_profile", "balanced")
+    cpsat_workers = int(request.form.get("cpsat_workers", 0)) or None
 
-        
-        
-        planner = OptimizedRepetitionScheduler(
-            str(repart_path), str(dispo_path),
-            maybe_penalty, max_load, load_penalty, group_bonus,
-            mode_absence, seuil_absence,
-            creneaux_speciaux=creneaux_speciaux,
-            seuil_absence_creneau_special=seuil_absence_special,
-            generation_time_limit=timeout_limit
-        )
+    # xlsx, xls, CSV, JSON ou Parquet : le format est reconnu au contenu (voir input_formats.py)
+    dispo_path = UPLOAD_FOLDER / dispo_file.filename
+    repart_path = UPLOAD_FOLDER / repart_file.filename
+    
+    dispo_file.save(str(dispo_path))
+    repart_file.save(str(repart_path))
+    # en-têtes, puis musiciens et morceaux, avant de construire quoi que ce soit (voir upload_validation.py)
+    avertissements = valider_upload(str(repart_path), str(dispo_path), cache_par_defaut())
+
+    print("🧾 Params :", maybe_penalty, max_load, load_penalty, group_bonus, 
+          mode_absence, seuil_absence, f"timeout={timeout_limit}s", f"workers={workers}", f"engine={engine}",
+          f"neighbourhoods={neighbourhoods}", f"stagnation={stagnation_seconds}s", f"gap={gap_tolerance}",
+          f"warm_start={'oui' if warm_start else 'non'}", f"solver={solver}",
+          f"cpsat_profile={cpsat_profile}", f"decomposition={decomposition}",
+          f"rolling={rolling_weeks}/{rolling_overlap}")
+
+    options_locales = dict(
+        creneaux_speciaux=creneaux_speciaux,
+        seuil_absence_creneau_special=seuil_absence_special,
+        workers=workers,
+        engine=engine,
+        neighbourhoods=neighbourhoods,
+        stagnation_seconds=stagnation_seconds,
+        gap_tolerance=gap_tolerance,
+    )
+    communs = (str(repart_path), str(dispo_path),
+               maybe_penalty, max_load, load_penalty, group_bonus,
+               mode_absence, seuil_absence)
+    options_cpsat = dict(profil=cpsat_profile, workers=cpsat_workers)
+    classe, options = {
+        "cpsat": (RepetitionScheduler, options_cpsat),
+        "lexicographic": (LexicographicScheduler, options_cpsat),
+    }.get(solver, (OptimizedRepetitionScheduler, options_locales))
+    if rolling_weeks:
+        planner = RollingHorizonScheduler(classe, *communs, semaines=rolling_weeks, chevauchement=rolling_overlap,
+                                          generation_time_limit=timeout_limit, stream=stream,
+                                          warm_start=warm_start, **options)
+    elif decomposition:
+        planner = DecomposedScheduler(classe, *communs, processus=workers, generation_time_limit=timeout_limit,
+                                      stream=stream, warm_start=warm_start, **options)
+    elif solver in ("cpsat", "lexicographic"):
+        planner = classe(*communs, generation_time_limit=timeout_limit,
+                         stream=stream, warm_start=warm_start, **options_cpsat)
+    elif solver == "hybrid":
+        planner = HybridScheduler(*communs, generation_time_limit=timeout_limit,
+                                  local_time_limit=int(local_time_limit) if local_time_limit else None,
+                                  local_options=options_locales, stream=stream, warm_start=warm_start,
+                                  **options_cpsat)
+    else:
+        planner = OptimizedRepetitionScheduler(*communs, generation_time_limit=timeout_limit,
+                                               stream=stream, warm_start=warm_start, **options_locales)
+    return planner, avertissements
+
+@app.route('/api/upload', methods=['POST'])
+def upload():
+    try:
+        planner, avertissements = _planner_depuis_formulaire()
         planner.generer_planning()
         
         global GENERATED_FILE_PATH
@@ -104,12 +215,84 @@ def upload():
         GENERATED_FILE_PATH = planner.export_planning(str(EXPORTS_FOLDER), base_filename="planning")
         
         json_data = planner.get_json_data()
+        json_data["avertissements"] = avertissements
         return jsonify(json_data)
     
+    except UploadInvalide as e:
+        # fichiers refusés avant toute résolution : pas de trace, la liste des problèmes suffit
+        print("🚫 Upload refusé :", e)
+        return jsonify(e.json()), 422
+    except Exception as e:
+        traceback.print_exc()
+        return jsonify({"error": str(e)}), 500
+
+# --- Mode anytime : la génération tourne dans un thread, les solutions arrivent en SSE ---
+# job_id -> {"stream", "thread", "resultat", "erreur"}
+JOBS = {}
+JOBS_LOCK = threading.Lock()
+MAX_JOBS = 20
+
+def _executer_job(job, planner, avertissements):
+    global GENERATED_FILE_PATH
+    try:
+        planner.generer_planning()
+        GENERATED_FILE_PATH = planner.export_planning(str(EXPORTS_FOLDER), base_filename="planning")
+        job["resultat"] = dict(planner.get_json_data(), avertissements=avertissements)
+    except Exception as e:
+        traceback.print_exc()
+        job["erreur"] = str(e)
+
+def _job(job_id):
+    with JOBS_LOCK:
+        return JOBS.get(job_id)
+
+@app.route('/api/solve/start', methods=['POST'])
+def solve_start():
+    """Mêmes champs que /api/upload ; renvoie tout de suite un job_id à suivre sur /api/solve/<job_id>/stream."""
+    try:
+        stream = IncumbentStream()
+        planner, avertissements = _planner_depuis_formulaire(stream=stream)
+        job_id = uuid.uuid4().hex
+        job = {"stream": stream, "resultat": None, "erreur": None}
+        job["thread"] = threading.Thread(target=_executer_job, args=(job, planner, avertissements), daemon=True)
+        with JOBS_LOCK:
+            # on oublie les plus vieux jobs terminés
+            termines = [j for j, v in JOBS.items() if not v["thread"].is_alive()]
+            for ancien in termines[:max(0, len(JOBS) - MAX_JOBS + 1)]:
+                del JOBS[ancien]
+            JOBS[job_id] = job
+        job["thread"].start()
+        return jsonify({"job_id": job_id, "avertissements": avertissements}), 202
+    except UploadInvalide as e:
+        print("🚫 Upload refusé :", e)
+        return jsonify(e.json()), 422
     except Exception as e:
         traceback.print_exc()
         return jsonify({"error": str(e)}), 500
 
+@app.route('/api/solve/<job_id>/stream')
+def solve_stream(job_id):
+    """Événements "incumbent" (coût, nombre assignés, assignation) puis "done" (même JSON que /api/upload)."""
+    job = _job(job_id)
+    if job is None:
+        return jsonify({"error": "Job introuvable"}), 404
+
+    def resultat():
+        return job["resultat"] if job["erreur"] is None else {"error": job["erreur"]}
+
+    flux = flux_sse(job["stream"], lambda: not job["thread"].is_alive(), resultat)
+    return Response(stream_with_context(flux), mimetype="text/event-stream",
+                    headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
+@app.route('/api/solve/<job_id>/accept', methods=['POST'])
+def solve_accept(job_id):
+    """Garde la meilleure solution actuelle : la recherche s'arrête, le résultat final arrive en "done"."""
+    job = _job(job_id)
+    if job is None:
+        return jsonify({"error": "Job introuvable"}), 404
+    job["stream"].arreter()
+    return jsonify({"status": "stopping", "dernier": job["stream"].dernier}), 202
+
 @app.route('/api/download')
 def download():
     try:
@@ -145,7 +328,8 @@ def health_check():
         'debug': DEBUG_MODE,
         'frontend_exists': (ROOT_DIR / 'frontend' / 'index.html').exists(),
         'images_folder_exists': (ROOT_DIR / 'images').exists(),
-        'team_profiles_exists': (ROOT_DIR / 'team-profiles.json').exists()  # AJOUT
+        'team_profiles_exists': (ROOT_DIR / 'team-profiles.json').exists(),  # AJOUT
+        'parse_cache': cache_par_defaut().stats() if cache_par_defaut() else None
     })
 
 if __name__ == '__main__':
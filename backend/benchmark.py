@@ -0,0 +1,674 @@
+#!/usr/bin/env python3
+"""
+Description : Bancs d'essai du planificateur sur des instances générées
+Licence : On devrait peut-être mettre une licence hein
+Anno : 43
+
+Usage :
+    python benchmark.py moteurs [--budget 10] [--graines 3] [--tolerance 0.01]
+    python benchmark.py voisinages [--budget 10] [--graines 3] [--tolerance 0.01]
+    python benchmark.py modele [--mode fixed] [--presolve]
+    python benchmark.py symetries [--budget 30] [--doublons 0.3]
+    python benchmark.py decomposition [--budget 30] [--ensembles 4] [--processus 4]
+    python benchmark.py horizon [--budget 30] [--semaines 8] [--fenetre 1] [--chevauchement 0]
+    python benchmark.py lexico [--budget 30] [--mode auto]
+    python benchmark.py ingestion [--tailles 20x50 60x200 120x400] [--repetitions 3]
+    python benchmark.py validation [--tailles saison]
+    python benchmark.py profils [--budget 20] [--profils fast balanced] [--instance repart.xlsx dispo.xlsx] [--csv out.csv]
+
+Les instances sont des fichiers Excel générés au même format que nos exports
+(répartitions avec 'Titre' + colonnes d'instruments, disponibilités avec 'Nom'), sur
+de vraies dates à partir du lundi DEBUT_SAISON : dès deux semaines, on passe d'un mois
+à l'autre, comme dans une vraie saison.
+"""
+import argparse
+import csv
+import os
+import random
+import statistics
+import tempfile
+import time
+from datetime import date, timedelta
+from typing import Dict, List, Tuple
+
+import pandas as pd
+from ortools.sat.python import cp_model
+
+from scheduler import OptimizedRepetitionScheduler
+from scheduler_repetition import RepetitionScheduler
+from restart_strategies import GreedyRestart
+from cpsat_profiles import PROFILS, coeurs_disponibles
+from decomposition import DecomposedScheduler
+from rolling_horizon import RollingHorizonScheduler
+from lexicographic import LexicographicScheduler
+from ingestion import lire_disponibilites, lire_repartitions
+from upload_validation import UploadInvalide, valider_upload
+
+JOURS = ["lun.", "mar.", "mer.", "jeu.", "ven."]
+DEBUT_SAISON = date(2025, 9, 22)  # un lundi
+HORAIRES = [(14, 16), (16, 18), (18, 20), (20, 22)]
+INSTRUMENTS = ["Violon", "Alto", "Violoncelle", "Piano", "Flûte", "Saxophone", "Guitare", "Chant"]
+
+# (musiciens, morceaux, semaines)
+TAILLES = {
+    "petite": (12, 25, 1),
+    "moyenne": (25, 40, 2),
+    "saison": (40, 80, 3),
+}
+
+
+def entete_creneau(k: int) -> str:
+    """En-tête du k-ième créneau de la saison ("lun. 22\n14:00 - 16:00"), jours ouvrés de DEBUT_SAISON."""
+    par_semaine = len(HORAIRES) * len(JOURS)
+    jour = DEBUT_SAISON + timedelta(weeks=k // par_semaine, days=(k // len(HORAIRES)) % len(JOURS))
+    h1, h2 = HORAIRES[k % len(HORAIRES)]
+    return f"{JOURS[jour.weekday()]} {jour.day:02d}\n{h1}:00 - {h2}:00"
+
+
+def generer_instance(dossier: str, n_musiciens: int, n_morceaux: int, n_semaines: int,
+                     graine: int = 0, doublons: float = 0.0, ensembles: int = 1) -> Tuple[str, str]:
+    """
+    Écrit un couple (répartitions, disponibilités) aléatoire dans dossier et renvoie les chemins.
+    doublons : proportion de morceaux qui reprennent les musiciens d'un morceau précédent
+    (tutti, pupitres...).
+    ensembles : nombre de groupes de musiciens disjoints (cuivres, cordes...) ; chaque
+    morceau ne prend ses musiciens que dans un seul groupe.
+    """
+    rng = random.Random(graine)
+    musiciens = [f"Musicien{i:02d}" for i in range(n_musiciens)]
+
+    colonnes = [entete_creneau(k) for k in range(n_semaines * len(JOURS) * len(HORAIRES))]
+
+    dispos = []
+    for musicien in musiciens:
+        ligne = {"Nom": musicien, "Email": f"{musicien.lower()}@orchestrakot.be"}
+        for col in colonnes:
+            ligne[col] = rng.choices(["yes", "maybe", "no"], [0.6, 0.15, 0.25])[0]
+        dispos.append(ligne)
+
+    repartitions = []
+    for i in range(n_morceaux):
+        ligne = {"Titre": f"Morceau {i}", "Compositeur": "", "Arrangeur": "", "Durée": "",
+                 "Niveau": "", "Remarques": ""}
+        if repartitions and rng.random() < doublons:
+            modele = rng.choice(repartitions)
+            ligne.update({instrument: modele[instrument] for instrument in INSTRUMENTS})
+            repartitions.append(ligne)
+            continue
+        ligne.update({instrument: None for instrument in INSTRUMENTS})
+        ensemble = musiciens[i % ensembles::ensembles]
+        for k, musicien in enumerate(rng.sample(ensemble, rng.randint(2, min(7, len(ensemble))))):
+            instrument = INSTRUMENTS[k % len(INSTRUMENTS)]
+            ligne[instrument] = f"{ligne[instrument]}, {musicien}" if ligne[instrument] else musicien
+        repartitions.append(ligne)
+
+    suffixe = f"{n_musiciens}x{n_morceaux}x{n_semaines}_{graine}" + (f"_d{doublons}" if doublons else "") \
+        + (f"_e{ensembles}" if ensembles > 1 else "")
+    repart_path = os.path.join(dossier, f"repartitions_{suffixe}.xlsx")
+    dispo_path = os.path.join(dossier, f"disponibilites_{suffixe}.xlsx")
+    pd.DataFrame(repartitions).to_excel(repart_path, index=False)
+    pd.DataFrame(dispos).to_excel(dispo_path, index=False)
+    return repart_path, dispo_path
+
+
+def _trace_moteur(repart_path: str, dispo_path: str, moteur: str, graine: int,
+                  budget: float, **options) -> List[Tuple[float, int, int]]:
+    """Un seul restart (départ glouton) ; renvoie les améliorations (temps, itération, meilleur coût)."""
+    planner = OptimizedRepetitionScheduler(repart_path, dispo_path, seed=graine, engine=moteur, **options)
+    planner.load_data()
+    planner.build_model()
+    planner._vider_assignation()
+    GreedyRestart().construire(planner, planner._rng)
+    planner._moteur.demarrer()
+
+    debut = time.time()
+    meilleur = planner._cout_courant()
+    trace = [(0.0, 0, meilleur)]
+    iteration = 0
+    while time.time() - debut < budget:
+        iteration += 1
+        if planner._moteur.step():
+            trace.append((time.time() - debut, iteration, 0))
+            break
+        cout = planner._cout_courant()
+        if cout < meilleur:
+            meilleur = cout
+            trace.append((time.time() - debut, iteration, cout))
+    return trace
+
+
+def _pour_cible(trace: List[Tuple[float, int, int]], cible: float) -> Tuple[float, float]:
+    """(temps, itérations) pour atteindre la cible, inf si jamais atteinte."""
+    for t, iteration, cout in trace:
+        if cout <= cible:
+            return t, iteration
+    return float("inf"), float("inf")
+
+
+def _mediane_atteinte(valeurs: List[float], fmt: str) -> Tuple[int, str]:
+    atteintes = [v for v in valeurs if v != float("inf")]
+    return len(atteintes), (format(statistics.median(atteintes), fmt) if atteintes else "—")
+
+
+def bench_moteurs(budget: float, n_graines: int, tolerance: float, tailles: List[str]):
+    """
+    Temps pour atteindre un coût cible par moteur. La cible d'une instance est le meilleur
+    coût final tous moteurs confondus, à `tolerance` près.
+    """
+    moteurs = ["min_conflicts", "tabu", "annealing"]
+    with tempfile.TemporaryDirectory() as dossier:
+        for taille in tailles:
+            n_mus, n_morceaux, n_semaines = TAILLES[taille]
+            repart_path, dispo_path = generer_instance(dossier, n_mus, n_morceaux, n_semaines)
+
+            traces: Dict[str, List] = {m: [] for m in moteurs}
+            for moteur in moteurs:
+                for graine in range(n_graines):
+                    traces[moteur].append(_trace_moteur(repart_path, dispo_path, moteur, graine, budget))
+
+            meilleur = min(t[-1][2] for runs in traces.values() for t in runs)
+            cible = meilleur * (1 + tolerance)
+            print(f"\n=== {taille} : {n_mus} musiciens, {n_morceaux} morceaux, {n_semaines} semaine(s) "
+                  f"— cible {cible:.0f} (meilleur {meilleur}) ===")
+            print(f"{'moteur':<15}{'atteint':>10}{'temps médian (s)':>20}{'coût final médian':>20}")
+            for moteur in moteurs:
+                atteints, mediane = _mediane_atteinte([_pour_cible(t, cible)[0] for t in traces[moteur]], ".2f")
+                final = statistics.median(t[-1][2] for t in traces[moteur])
+                print(f"{moteur:<15}{atteints:>5}/{n_graines:<4}{mediane:>20}{final:>20.0f}")
+
+
+def bench_voisinages(budget: float, n_graines: int, tolerance: float, tailles: List[str]):
+    """
+    Itérations et temps pour atteindre la cible avec min-conflicts, en déplacement simple
+    seul puis avec chaque voisinage composé et avec tous.
+    """
+    variantes = {
+        "simple": [],
+        "swap": ["swap"],
+        "chain": ["chain"],
+        "day": ["day"],
+        "tous": ["swap", "chain", "day"],
+    }
+    with tempfile.TemporaryDirectory() as dossier:
+        for taille in tailles:
+            n_mus, n_morceaux, n_semaines = TAILLES[taille]
+            repart_path, dispo_path = generer_instance(dossier, n_mus, n_morceaux, n_semaines)
+
+            traces = {nom: [_trace_moteur(repart_path, dispo_path, "min_conflicts", graine, budget,
+                                          neighbourhoods=voisinages)
+                            for graine in range(n_graines)]
+                      for nom, voisinages in variantes.items()}
+
+            meilleur = min(t[-1][2] for runs in traces.values() for t in runs)
+            cible = meilleur * (1 + tolerance)
+            print(f"\n=== {taille} : {n_mus} musiciens, {n_morceaux} morceaux, {n_semaines} semaine(s) "
+                  f"— cible {cible:.0f} (meilleur {meilleur}) ===")
+            print(f"{'voisinages':<12}{'atteint':>10}{'itérations':>14}{'temps (s)':>12}{'coût final médian':>20}")
+            for nom in variantes:
+                atteints, iterations = _mediane_atteinte([_pour_cible(t, cible)[1] for t in traces[nom]], ".0f")
+                _, temps = _mediane_atteinte([_pour_cible(t, cible)[0] for t in traces[nom]], ".2f")
+                final = statistics.median(t[-1][2] for t in traces[nom])
+                print(f"{nom:<12}{atteints:>5}/{n_graines:<4}{iterations:>14}{temps:>12}{final:>20.0f}")
+
+
+def bench_modele(tailles: List[str], mode: str, presolve: bool):
+    """Taille du modèle CP-SAT de RepetitionScheduler (variables, contraintes, temps de construction)."""
+    with tempfile.TemporaryDirectory() as dossier:
+        print(f"{'taille':<10}{'variables':>12}{'contraintes':>14}{'construction (s)':>18}"
+              + (f"{'presolve (s)':>14}" if presolve else ""))
+        for taille in tailles:
+            repart_path, dispo_path = generer_instance(dossier, *TAILLES[taille])
+            planner = RepetitionScheduler(repart_path, dispo_path, 10, 3, 50, 20, mode, 2)
+            planner.load_data()
+            planner.build_model()
+            stats = planner.statistiques_modele(presolve=presolve)
+            print(f"{taille:<10}{stats['variables']:>12}{stats['contraintes']:>14}{stats['temps_construction']:>18.3f}"
+                  + (f"{stats['temps_presolve']:>14.3f}" if presolve else ""))
+
+
+class _TraceSolutions(cp_model.CpSolverSolutionCallback):
+    """(temps, objectif) de chaque solution trouvée par CP-SAT."""
+
+    def __init__(self):
+        super().__init__()
+        self.solutions: List[Tuple[float, float]] = []
+
+    def on_solution_callback(self):
+        self.solutions.append((self.WallTime(), self.ObjectiveValue()))
+
+
+def bench_symetries(budget: float, tailles: List[str], doublons: float, mode: str):
+    """
+    CP-SAT avec et sans cassage des symétries, sur des instances où une partie des
+    morceaux ont les mêmes musiciens : objectif et borne au bout du budget, temps de
+    preuve de l'optimum quand il est atteint.
+    """
+    with tempfile.TemporaryDirectory() as dossier:
+        for taille in tailles:
+            repart_path, dispo_path = generer_instance(dossier, *TAILLES[taille], doublons=doublons)
+            print(f"\n=== {taille} (doublons {doublons:.0%}) ===")
+            print(f"{'symétries':<12}{'classes':>9}{'objectif':>12}{'borne':>12}{'statut':>12}{'temps (s)':>12}")
+            for symetries in (False, True):
+                planner = RepetitionScheduler(repart_path, dispo_path, 10, 3, 50, 20, mode, 2,
+                                              symetries=symetries)
+                planner.load_data()
+                planner.build_model()
+                solver = cp_model.CpSolver()
+                planner.configurer_solveur(solver, budget)
+                status = solver.Solve(planner.model)
+                classes = f"{len(planner.classes_morceaux)}+{len(planner.classes_jours)}"
+                if status in (cp_model.OPTIMAL, cp_model.FEASIBLE):
+                    resultat = f"{solver.ObjectiveValue():>12.0f}{solver.BestObjectiveBound():>12.0f}"
+                else:
+                    resultat = f"{'—':>12}{'—':>12}"
+                print(f"{'oui' if symetries else 'non':<12}{classes:>9}{resultat}"
+                      f"{solver.StatusName(status):>12}{solver.WallTime():>12.2f}")
+
+
+def bench_decomposition(budget: int, tailles: List[str], ensembles: int, processus: int, mode: str):
+    """
+    Résolution d'un bloc contre décomposition en composantes, pour les deux planificateurs,
+    sur des instances à `ensembles` groupes de musiciens disjoints. Le coût est celui du
+    planificateur complet (recherche locale : coût total, CP-SAT : objectif).
+    """
+    print(f"Cœurs disponibles : {coeurs_disponibles()}, {processus} processus pour la décomposition")
+    with tempfile.TemporaryDirectory() as dossier:
+        for taille in tailles:
+            n_mus, n_morceaux, n_semaines = TAILLES[taille]
+            repart_path, dispo_path = generer_instance(dossier, n_mus, n_morceaux // 2, n_semaines,
+                                                       ensembles=ensembles)
+            args = (repart_path, dispo_path, 10, 3, 50, 20, mode, 2)
+            print(f"\n=== {taille} : {n_morceaux // 2} morceaux, {ensembles} ensembles ===")
+            print(f"{'planificateur':<15}{'méthode':<15}{'coût':>10}{'assignés':>10}{'temps (s)':>12}")
+            for nom, classe in (("local", OptimizedRepetitionScheduler), ("cpsat", RepetitionScheduler)):
+                for methode in ("bloc", "composantes"):
+                    debut = time.time()
+                    if methode == "bloc":
+                        planner = classe(*args, generation_time_limit=budget)
+                        planner.generer_planning()
+                    else:
+                        decompose = DecomposedScheduler(classe, *args, processus=processus,
+                                                        generation_time_limit=budget)
+                        decompose.generer_planning()
+                        planner = decompose.planner
+                    duree = time.time() - debut
+                    cout = planner._calculate_total_cost() if nom == "local" else planner.valeur_objectif
+                    print(f"{nom:<15}{methode:<15}{cout:>10.0f}{len(planner.solution):>10}{duree:>12.1f}")
+
+
+def bench_horizon(budget: int, n_semaines: int, fenetre: int, chevauchement: int, mode: str):
+    """
+    Saison d'un bloc contre horizon glissant, pour les deux planificateurs, sur une saison
+    de n_semaines semaines (environ 19 morceaux par semaine pour 20 créneaux).
+    """
+    with tempfile.TemporaryDirectory() as dossier:
+        n_morceaux = 19 * n_semaines
+        repart_path, dispo_path = generer_instance(dossier, 40, n_morceaux, n_semaines)
+        args = (repart_path, dispo_path, 10, 3, 50, 20, mode, 2)
+        print(f"\n=== {n_morceaux} morceaux, {n_semaines} semaines, fenêtres de {fenetre} "
+              f"(chevauchement {chevauchement}) ===")
+        print(f"{'planificateur':<15}{'méthode':<15}{'coût':>10}{'assignés':>10}{'temps (s)':>12}")
+        for nom, classe in (("local", OptimizedRepetitionScheduler), ("cpsat", RepetitionScheduler)):
+            for methode in ("bloc", "fenêtres"):
+                debut = time.time()
+                if methode == "bloc":
+                    planner = classe(*args, generation_time_limit=budget)
+                    planner.generer_planning()
+                else:
+                    glissant = RollingHorizonScheduler(classe, *args, semaines=fenetre, chevauchement=chevauchement,
+                                                       generation_time_limit=budget)
+                    glissant.generer_planning()
+                    planner = glissant.planner
+                duree = time.time() - debut
+                cout = planner._calculate_total_cost() if nom == "local" else planner.valeur_objectif
+                print(f"{nom:<15}{methode:<15}{cout:>10.0f}{len(planner.solution):>10}{duree:>12.1f}")
+
+
+def bench_lexico(budget: int, tailles: List[str], mode: str):
+    """
+    CP-SAT pondéré contre lexicographique, même budget : morceaux assignés, objectif
+    pondéré (pour comparer), et pour le lexicographique les valeurs et durées par étape.
+    """
+    with tempfile.TemporaryDirectory() as dossier:
+        for taille in tailles:
+            repart_path, dispo_path = generer_instance(dossier, *TAILLES[taille])
+            args = (repart_path, dispo_path, 10, 3, 50, 20, mode, 2)
+            print(f"\n=== {taille} ({mode}) ===")
+            print(f"{'méthode':<15}{'assignés':>10}{'objectif':>12}{'temps (s)':>12}  valeurs")
+            for nom, classe in (("pondéré", RepetitionScheduler), ("lexicographique", LexicographicScheduler)):
+                planner = classe(*args, generation_time_limit=budget)
+                debut = time.time()
+                planner.generer_planning()
+                duree = time.time() - debut
+                objectif = f"{planner.valeur_objectif:>12.0f}" if planner.valeur_objectif is not None else f"{'—':>12}"
+                valeurs = " ".join(f"{e['critere']}={e['valeur']} ({e['duree']:.1f}s)"
+                                   for e in getattr(planner, "etapes", []))
+                print(f"{nom:<15}{len(planner.solution):>10}{objectif}{duree:>12.1f}  {valeurs}")
+
+
+def generer_doodle(dossier: str, n_musiciens: int, n_creneaux: int, format_dispo: str, graine: int = 0) -> str:
+    """
+    Disponibilités seules, n_musiciens x n_creneaux : format "nom" (comme generer_instance)
+    ou "cally" (créneaux sur la première ligne de données, email en deuxième colonne).
+    """
+    rng = random.Random(graine)
+    creneaux = [entete_creneau(k) for k in range(n_creneaux)]
+    reponses = [[rng.choices(["yes", "maybe", "no", None], [0.55, 0.15, 0.25, 0.05])[0] for _ in creneaux]
+                for _ in range(n_musiciens)]
+    musiciens = [(f"musicien{i:03d}", f"musicien{i:03d}@orchestrakot.be") for i in range(n_musiciens)]
+    if format_dispo == "nom":
+        df = pd.DataFrame([list(m) + r for m, r in zip(musiciens, reponses)], columns=["Nom", "Email"] + creneaux)
+    else:
+        lignes = [[None, None] + [f"{c} [93%]" for c in creneaux]] + [[None] * (n_creneaux + 2)] * 3
+        lignes += [list(m) + r for m, r in zip(musiciens, reponses)]
+        df = pd.DataFrame(lignes, columns=["Sondage", "Contact"] + [f"c{k}" for k in range(n_creneaux)])
+    chemin = os.path.join(dossier, f"doodle_{format_dispo}_{n_musiciens}x{n_creneaux}.xlsx")
+    df.to_excel(chemin, index=False)
+    return chemin
+
+
+def _transformer_ancien(texte: str):
+    """transformer_simple d'avant ingestion.py, pour comparer."""
+    import re
+    t = texte.strip().replace("\n", " ").replace("\r", " ")
+    m = re.search(r"(\w+\.)\s+(\d+).*?(\d{1,2}):(\d{2})\s*-\s*(\d{1,2}):(\d{2})", t)
+    if not m:
+        return None
+    jour_txt, d, h1, m1, h2, m2 = m.groups()
+    jours = {'lun.': 'LUN', 'mar.': 'MAR', 'mer.': 'MER', 'jeu.': 'JEU', 'ven.': 'VEN', 'sam.': 'SAM', 'dim.': 'DIM'}
+    jour = jours.get(jour_txt.lower(), jour_txt.upper().rstrip('.'))
+    return f"{jour}_{int(d):02d}_{int(h1):02d}:{int(m1):02d}-{int(h2):02d}:{int(m2):02d}"
+
+
+def ancien_chargement(dispo_path: str) -> Dict[str, Dict[str, str]]:
+    """Lecture des disponibilités d'avant ingestion.py : pd.read_excel + iterrows(), regex par cellule."""
+    df = pd.read_excel(dispo_path)
+    disponibilites, creneaux = {}, []
+    if 'Nom' in df.columns:
+        for _, row in df.iterrows():
+            if pd.isna(row['Nom']):
+                continue  # (l'ancien code en faisait un musicien "Nan")
+            musicien = str(row['Nom']).strip().title()
+            disponibilites[musicien] = {}
+            for col in df.columns[2:]:
+                slot = _transformer_ancien(str(col))
+                if slot:
+                    disponibilites[musicien][slot] = str(row[col]).strip().lower() if not pd.isna(row[col]) else "no"
+        return disponibilites
+    for _, row in df.iterrows():
+        for col in df.columns[2:]:
+            cellule = str(row[col]) if not pd.isna(row[col]) else ""
+            if cellule and any(jour in cellule for jour in ['lun.', 'mar.', 'mer.', 'jeu.', 'ven.', 'sam.', 'dim.']):
+                slot = _transformer_ancien(cellule.replace('\n', ' ').replace('[93%]', '').strip())
+                if slot:
+                    creneaux.append(slot)
+    for idx, row in df.iterrows():
+        if idx <= 3 or pd.isna(row.iloc[1]) or '@' not in str(row.iloc[1]):
+            continue
+        musicien = str(row.iloc[0]).strip().title()
+        disponibilites[musicien] = {}
+        for col_idx in range(2, min(len(row), len(creneaux) + 2)):
+            val = str(row.iloc[col_idx]).strip().lower() if not pd.isna(row.iloc[col_idx]) else "no"
+            disponibilites[musicien][creneaux[col_idx - 2]] = ("yes" if val in ['yes', 'oui'] else
+                                                               "maybe" if val in ['maybe', 'peut-être'] else "no")
+    return disponibilites
+
+
+# format -> écriture d'un DataFrame (None : le fichier généré lui-même) ; Parquet demande pyarrow
+FORMATS_ENTREE = {
+    "xlsx": None,
+    "csv": lambda df, chemin: df.to_csv(chemin, index=False),
+    "json": lambda df, chemin: df.to_json(chemin, orient="records", force_ascii=False),
+}
+
+
+def bench_ingestion(tailles: List[str], repetitions: int):
+    """
+    Ancienne lecture (pandas + iterrows) contre ingestion.py, sur des exports Doodle
+    générés de taille croissante ("60x200" = 60 musiciens x 200 créneaux), dans les deux
+    formats. Vérifie au passage que les deux donnent les mêmes disponibilités. Puis le
+    même tableau lu depuis chaque format d'entrée (xlsx, CSV, JSON).
+    """
+    print(f"{'format':<8}{'taille':>10}{'ancien (s)':>12}{'nouveau (s)':>13}{'gain':>8}  identique")
+    with tempfile.TemporaryDirectory() as dossier:
+        for taille in tailles:
+            n_musiciens, n_creneaux = (int(x) for x in taille.split("x"))
+            for format_dispo in ("nom", "cally"):
+                chemin = generer_doodle(dossier, n_musiciens, n_creneaux, format_dispo)
+                temps = {}
+                for nom, lire in (("ancien", ancien_chargement),
+                                  ("nouveau", lambda c: lire_disponibilites(c)["disponibilites"])):
+                    durees = []
+                    for _ in range(repetitions):
+                        debut = time.perf_counter()
+                        resultat = lire(chemin)
+                        durees.append(time.perf_counter() - debut)
+                    temps[nom] = (min(durees), resultat)
+                identique = temps["ancien"][1] == temps["nouveau"][1]
+                print(f"{format_dispo:<8}{taille:>10}{temps['ancien'][0]:>12.3f}{temps['nouveau'][0]:>13.3f}"
+                      f"{temps['ancien'][0] / temps['nouveau'][0]:>7.1f}x  {'oui' if identique else 'NON'}")
+        # les répartitions passent aussi par ingestion.py
+        repart_path, _ = generer_instance(dossier, 60, 200, 1)
+        debut = time.perf_counter()
+        morceaux, _, _ = lire_repartitions(repart_path)
+        print(f"\nRépartitions : {len(morceaux)} morceaux lus en {time.perf_counter() - debut:.3f}s")
+
+        # même tableau "nom" dans les autres formats d'entrée (voir input_formats.py)
+        print(f"\n{'taille':>10}" + "".join(f"{f + ' (s)':>12}" for f in FORMATS_ENTREE) + "  identique")
+        for taille in tailles:
+            n_musiciens, n_creneaux = (int(x) for x in taille.split("x"))
+            xlsx = generer_doodle(dossier, n_musiciens, n_creneaux, "nom")
+            df = pd.read_excel(xlsx)
+            chemins = {"xlsx": xlsx}
+            for format_entree, ecrire in FORMATS_ENTREE.items():
+                if ecrire is not None:
+                    chemins[format_entree] = os.path.join(dossier, f"doodle_{taille}.{format_entree}")
+                    ecrire(df, chemins[format_entree])
+            temps, resultats = [], []
+            for format_entree in FORMATS_ENTREE:
+                durees = []
+                for _ in range(repetitions):
+                    debut = time.perf_counter()
+                    resultat = lire_disponibilites(chemins[format_entree])["disponibilites"]
+                    durees.append(time.perf_counter() - debut)
+                temps.append(min(durees))
+                resultats.append(resultat)
+            identique = all(r == resultats[0] for r in resultats)
+            print(f"{taille:>10}" + "".join(f"{t:>12.3f}" for t in temps) + f"  {'oui' if identique else 'NON'}")
+
+
+def _variantes_invalides(dossier: str, repart_path: str, dispo_path: str) -> Dict[str, Tuple[str, str]]:
+    """Le couple valide et des copies abîmées chacune d'une façon."""
+    repart, dispo = pd.read_excel(repart_path), pd.read_excel(dispo_path)
+
+    def ecrire(nom: str, df: pd.DataFrame) -> str:
+        chemin = os.path.join(dossier, f"{nom}.xlsx")
+        df.to_excel(chemin, index=False)
+        return chemin
+
+    inconnu = repart.copy()
+    inconnu.loc[0, INSTRUMENTS[0]] = f"{repart.loc[0, INSTRUMENTS[0]]}, Musicien Fantôme"
+    vide = pd.concat([repart, pd.DataFrame([{"Titre": "Morceau sans personne"}])], ignore_index=True)
+    illisibles = dispo.rename(columns={c: f"créneau {k}" for k, c in enumerate(dispo.columns[2:])})
+    return {
+        "valide": (repart_path, dispo_path),
+        "fichiers inversés": (dispo_path, repart_path),
+        "sans 'Titre'": (ecrire("sans_titre", repart.rename(columns={"Titre": "Title"})), dispo_path),
+        "créneaux illisibles": (repart_path, ecrire("illisibles", illisibles)),
+        "musicien inconnu": (ecrire("inconnu", inconnu), dispo_path),
+        "ensemble vide": (ecrire("vide", vide), dispo_path),
+    }
+
+
+def bench_validation(tailles: List[str]):
+    """
+    Temps de upload_validation.valider_upload sur des fichiers valides ou abîmés, et
+    code renvoyé ; à comparer avec la lecture complète de load_data (sans cache), que
+    l'ancien /api/upload faisait avant de découvrir l'erreur (ou pas).
+    """
+    print(f"{'taille':<10}{'cas':<22}{'validation (ms)':>17}{'load_data (ms)':>16}  résultat")
+    with tempfile.TemporaryDirectory() as dossier:
+        for taille in tailles:
+            repart_path, dispo_path = generer_instance(dossier, *TAILLES[taille])
+            for cas, (repart, dispo) in _variantes_invalides(dossier, repart_path, dispo_path).items():
+                debut = time.perf_counter()
+                try:
+                    avertissements = valider_upload(repart, dispo)
+                    resultat = "accepté" + "".join(f", {p['code']}" for p in avertissements)
+                except UploadInvalide as e:
+                    resultat = "refusé : " + ", ".join(p["code"] for p in e.problemes)
+                validation = time.perf_counter() - debut
+
+                planner = OptimizedRepetitionScheduler(repart, dispo)
+                debut = time.perf_counter()
+                try:
+                    planner.load_data()
+                except Exception:
+                    pass
+                chargement = time.perf_counter() - debut
+                print(f"{taille:<10}{cas:<22}{validation * 1000:>17.1f}{chargement * 1000:>16.1f}  {resultat}")
+
+
+def _corpus(dossier: str, tailles: List[str], instances: List[List[str]]) -> List[Tuple[str, str, str]]:
+    """(nom, répartitions, disponibilités) : instances générées puis vrais fichiers passés en option."""
+    corpus = [(taille, *generer_instance(dossier, *TAILLES[taille])) for taille in tailles]
+    corpus += [(os.path.basename(dispo), repart, dispo) for repart, dispo in instances]
+    return corpus
+
+
+def bench_profils(budget: float, profils: List[str], tailles: List[str], instances: List[List[str]],
+                  mode: str, workers, chemin_csv):
+    """
+    Chaque profil CP-SAT sur chaque instance du corpus : temps jusqu'à la première solution,
+    objectif final, borne, écart et statut. Même budget et même modèle pour tous.
+    """
+    print(f"Cœurs disponibles : {coeurs_disponibles()}")
+    lignes = []
+    with tempfile.TemporaryDirectory() as dossier:
+        for nom, repart_path, dispo_path in _corpus(dossier, tailles, instances):
+            print(f"\n=== {nom} ===")
+            print(f"{'profil':<15}{'workers':>8}{'1re sol. (s)':>14}{'objectif':>12}{'borne':>12}"
+                  f"{'écart':>9}{'statut':>12}")
+            for profil in profils:
+                planner = RepetitionScheduler(repart_path, dispo_path, 10, 3, 50, 20, mode, 2,
+                                              profil=profil, workers=workers)
+                planner.load_data()
+                planner.build_model()
+                solver = cp_model.CpSolver()
+                parametres = planner.configurer_solveur(solver, budget)
+                trace = _TraceSolutions()
+                status = solver.Solve(planner.model, trace)
+
+                trouve = status in (cp_model.OPTIMAL, cp_model.FEASIBLE)
+                objectif = solver.ObjectiveValue() if trouve else None
+                borne = solver.BestObjectiveBound() if trouve else None
+                ecart = (objectif - borne) / max(1.0, abs(objectif)) if trouve else None
+                ligne = {
+                    "instance": nom, "profil": profil, "workers": parametres["num_workers"],
+                    "premiere_solution": round(trace.solutions[0][0], 3) if trace.solutions else None,
+                    "objectif": objectif, "borne": borne, "ecart": ecart,
+                    "statut": solver.StatusName(status), "duree": round(solver.WallTime(), 3),
+                }
+                lignes.append(ligne)
+                premiere = f"{ligne['premiere_solution']:.2f}" if trace.solutions else "—"
+                print(f"{profil:<15}{ligne['workers']:>8}{premiere:>14}"
+                      + (f"{objectif:>12.0f}{borne:>12.0f}{ecart:>9.1%}" if trouve else f"{'—':>12}{'—':>12}{'—':>9}")
+                      + f"{ligne['statut']:>12}")
+
+    if chemin_csv:
+        with open(chemin_csv, "w", newline="", encoding="utf-8") as f:
+            writer = csv.DictWriter(f, fieldnames=list(lignes[0]))
+            writer.writeheader()
+            writer.writerows(lignes)
+        print(f"\n📄 Résultats écrits dans {chemin_csv}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Bancs d'essai du planificateur")
+    sous = parser.add_subparsers(dest="commande", required=True)
+
+    p_moteurs = sous.add_parser("moteurs", help="temps pour atteindre un coût cible par moteur de recherche")
+    p_moteurs.add_argument("--budget", type=float, default=10, help="secondes par exécution")
+    p_moteurs.add_argument("--graines", type=int, default=3)
+    p_moteurs.add_argument("--tolerance", type=float, default=0.01)
+    p_moteurs.add_argument("--tailles", nargs="+", default=list(TAILLES), choices=list(TAILLES))
+
+    p_voisinages = sous.add_parser("voisinages", help="itérations pour atteindre un coût cible par voisinage")
+    p_voisinages.add_argument("--budget", type=float, default=10, help="secondes par exécution")
+    p_voisinages.add_argument("--graines", type=int, default=3)
+    p_voisinages.add_argument("--tolerance", type=float, default=0.01)
+    p_voisinages.add_argument("--tailles", nargs="+", default=list(TAILLES), choices=list(TAILLES))
+
+    p_modele = sous.add_parser("modele", help="taille du modèle CP-SAT")
+    p_modele.add_argument("--mode", default="fixed", choices=["fixed", "strict", "auto", "flexible"])
+    p_modele.add_argument("--presolve", action="store_true", help="mesure aussi le temps de presolve")
+    p_modele.add_argument("--tailles", nargs="+", default=list(TAILLES), choices=list(TAILLES))
+
+    p_symetries = sous.add_parser("symetries", help="CP-SAT avec et sans cassage des symétries")
+    p_symetries.add_argument("--budget", type=float, default=30, help="secondes par exécution")
+    p_symetries.add_argument("--doublons", type=float, default=0.3, help="proportion de morceaux dupliqués")
+    p_symetries.add_argument("--mode", default="fixed", choices=["fixed", "strict", "auto", "flexible"])
+    p_symetries.add_argument("--tailles", nargs="+", default=list(TAILLES), choices=list(TAILLES))
+
+    p_decomposition = sous.add_parser("decomposition", help="un bloc contre composantes indépendantes")
+    p_decomposition.add_argument("--budget", type=int, default=30, help="secondes par exécution")
+    p_decomposition.add_argument("--ensembles", type=int, default=4, help="groupes de musiciens disjoints")
+    p_decomposition.add_argument("--processus", type=int, default=4)
+    p_decomposition.add_argument("--mode", default="fixed", choices=["fixed", "strict", "auto", "flexible"])
+    p_decomposition.add_argument("--tailles", nargs="+", default=["saison"], choices=list(TAILLES))
+
+    p_horizon = sous.add_parser("horizon", help="un bloc contre horizon glissant")
+    p_horizon.add_argument("--budget", type=int, default=30, help="secondes par exécution")
+    p_horizon.add_argument("--semaines", type=int, default=8, help="longueur de la saison")
+    p_horizon.add_argument("--fenetre", type=int, default=1, help="semaines par fenêtre")
+    p_horizon.add_argument("--chevauchement", type=int, default=0)
+    p_horizon.add_argument("--mode", default="fixed", choices=["fixed", "strict", "auto", "flexible"])
+
+    p_lexico = sous.add_parser("lexico", help="CP-SAT pondéré contre lexicographique")
+    p_lexico.add_argument("--budget", type=int, default=30, help="secondes par exécution")
+    p_lexico.add_argument("--mode", default="auto", choices=["fixed", "strict", "auto", "flexible"])
+    p_lexico.add_argument("--tailles", nargs="+", default=["moyenne"], choices=list(TAILLES))
+
+    p_ingestion = sous.add_parser("ingestion", help="lecture des disponibilités : pandas + iterrows contre ingestion.py")
+    p_ingestion.add_argument("--tailles", nargs="+", default=["20x50", "60x200", "120x400"],
+                             help="musiciens x créneaux")
+    p_ingestion.add_argument("--repetitions", type=int, default=3, help="on garde le meilleur temps")
+
+    p_validation = sous.add_parser("validation", help="vérification des fichiers envoyés, valides ou abîmés")
+    p_validation.add_argument("--tailles", nargs="+", default=["saison"], choices=list(TAILLES))
+
+    p_profils = sous.add_parser("profils", help="profils CP-SAT : première solution et objectif final")
+    p_profils.add_argument("--budget", type=float, default=20, help="secondes par exécution")
+    p_profils.add_argument("--profils", nargs="+", default=list(PROFILS), choices=list(PROFILS))
+    p_profils.add_argument("--tailles", nargs="+", default=list(TAILLES), choices=list(TAILLES))
+    p_profils.add_argument("--instance", nargs=2, action="append", default=[], metavar=("REPART", "DISPO"),
+                           help="vrais fichiers à ajouter au corpus (répétable)")
+    p_profils.add_argument("--mode", default="fixed", choices=["fixed", "strict", "auto", "flexible"])
+    p_profils.add_argument("--workers", type=int, default=None, help="threads CP-SAT (défaut : selon les cœurs)")
+    p_profils.add_argument("--csv", default=None, help="écrit aussi les résultats dans ce fichier")
+
+    args = parser.parse_args()
+    if args.commande == "moteurs":
+        bench_moteurs(args.budget, args.graines, args.tolerance, args.tailles)
+    elif args.commande == "voisinages":
+        bench_voisinages(args.budget, args.graines, args.tolerance, args.tailles)
+    elif args.commande == "modele":
+        bench_modele(args.tailles, args.mode, args.presolve)
+    elif args.commande == "symetries":
+        bench_symetries(args.budget, args.tailles, args.doublons, args.mode)
+    elif args.commande == "decomposition":
+        bench_decomposition(args.budget, args.tailles, args.ensembles, args.processus, args.mode)
+    elif args.commande == "horizon":
+        bench_horizon(args.budget, args.semaines, args.fenetre, args.chevauchement, args.mode)
+    elif args.commande == "lexico":
+        bench_lexico(args.budget, args.tailles, args.mode)
+    elif args.commande == "ingestion":
+        bench_ingestion(args.tailles, args.repetitions)
+    elif args.commande == "validation":
+        bench_validation(args.tailles)
+    elif args.commande == "profils":
+        bench_profils(args.budget, args.profils, args.tailles, args.instance, args.mode, args.workers, args.csv)
+
+
+if __name__ == "__main__":
+    main()
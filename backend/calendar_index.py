@@ -0,0 +1,137 @@
+"""
+Description : Index du calendrier : créneaux par date, ordre chronologique, créneaux consécutifs, semaines
+Licence : On devrait peut-être mettre une licence hein
+Anno : 43
+
+Un créneau s'écrit "LUN_04_16:00-18:00" : code du jour, numéro de la date, plage horaire.
+Avant, les créneaux étaient regroupés par code du jour seul (slot.split("_")[0]) : tous
+les lundis de la saison tombaient dans le même "jour", ce qui gonflait la charge
+journalière et multipliait les contraintes de charge du modèle CP-SAT. Ici une date est
+le préfixe "LUN_04" du créneau. Deux créneaux sont consécutifs s'ils sont la même date
+et que le second commence quand le premier finit (au plus PAUSE_MAX minutes après),
+pas simplement parce qu'ils se suivent dans la liste : 10h-12h puis 14h-16h, ce n'est pas
+une répétition groupée.
+Les exports ne donnent ni le mois ni l'année, seulement le jour de la semaine et le
+numéro du jour dans le mois. Trier sur le numéro mettait le 06 et le 13 octobre avant
+les 22 et 29 septembre. Les colonnes des exports, elles, sont dans l'ordre
+chronologique : chaque date reçoit donc un rang (jours écoulés depuis la première
+date), en suivant l'ordre des colonnes ; quand le numéro redescend, on change de mois,
+et la longueur du mois (28 à 31 jours) est celle qui retombe sur le bon jour de la
+semaine. Le tri, les semaines et le rolling horizon passent par ce rang.
+Limite : la clé reste "LUN_04". Deux dates de même jour de la semaine et de même numéro
+dans un même fichier (lundi 1er septembre et lundi 1er décembre) n'en font qu'une ; elles
+sont signalées dans dates_ambigues (et par la vérification des fichiers).
+La charge, les répétitions groupées (les deux planificateurs, CompiledProblem) et
+l'export passent tous par cet index. Les créneaux sont des Slot (slot.py), déjà découpés.
+"""
+from collections import defaultdict
+from typing import Dict, Iterable, List, Optional
+
+from slot import NOMS_JOURS, Slot, creneau
+
+# Minutes de pause tolérées entre deux créneaux pour qu'ils comptent comme consécutifs
+PAUSE_MAX = 0
+
+JOURS_SEMAINE = list(NOMS_JOURS)  # "LUN" ... "DIM", dans l'ordre de la semaine
+LONGUEURS_MOIS = (31, 30, 29, 28)
+
+
+def ecart_jours(avant: Slot, apres: Slot) -> int:
+    """
+    Jours entre deux dates qui se suivent dans les colonnes : la différence des numéros,
+    plus la longueur d'un mois si le jour de la semaine ne tombe pas juste (le numéro
+    redescend, ou plus d'un mois sépare les deux dates).
+    """
+    ecart = apres.numero - avant.numero
+    if avant.jour not in JOURS_SEMAINE or apres.jour not in JOURS_SEMAINE:
+        return ecart if ecart >= 0 else ecart + LONGUEURS_MOIS[0]
+    decalage = JOURS_SEMAINE.index(apres.jour) - JOURS_SEMAINE.index(avant.jour)
+    if ecart >= 0 and (ecart - decalage) % 7 == 0:
+        return ecart
+    for longueur in LONGUEURS_MOIS:
+        if (ecart + longueur - decalage) % 7 == 0:
+            return ecart + longueur
+    return ecart + LONGUEURS_MOIS[0]
+
+
+def rangs_dates(creneaux: Iterable[Slot]) -> Dict[str, int]:
+    """
+    Rang de chaque date (jours écoulés depuis la première), créneaux dans l'ordre des
+    colonnes du fichier. Un créneau hors format garde le rang de la date d'avant.
+    """
+    rangs: Dict[str, int] = {}
+    precedent = None
+    for c in creneaux:
+        if c.date in rangs:
+            continue
+        if c.jour not in JOURS_SEMAINE:
+            rangs[c.date] = rangs[precedent.date] if precedent is not None else 0
+            continue
+        rangs[c.date] = rangs[precedent.date] + ecart_jours(precedent, c) if precedent is not None else 0
+        precedent = c
+    return rangs
+
+
+class CalendarIndex:
+    def __init__(self, creneaux: Iterable[str], rangs: Optional[Dict[str, int]] = None):
+        """
+        creneaux : les créneaux du planning, dans l'ordre des colonnes du fichier
+        (chronologique : c'est lui qui donne les changements de mois).
+        rangs : rang de chaque date (par défaut calculé depuis creneaux) ; un
+        sous-calendrier garde ainsi les rangs et les numéros de semaine du calendrier complet.
+        """
+        creneaux = list(map(creneau, creneaux))
+        # une date qui revient après une autre : même clé pour deux jours différents (les
+        # doublons ne se voient que dans les en-têtes bruts, avant dédoublonnage)
+        vues = []
+        for c in creneaux:
+            if not vues or vues[-1] != c.date:
+                vues.append(c.date)
+        self.dates_ambigues: List[str] = sorted({d for i, d in enumerate(vues) if d in vues[:i]})
+        creneaux = list(dict.fromkeys(creneaux))
+
+        self.rangs: Dict[str, int] = rangs if rangs is not None else rangs_dates(creneaux)
+        # un créneau hors format est une date à lui tout seul, sans voisin
+        self.creneaux: List[Slot] = sorted(creneaux, key=lambda s: (self.rangs.get(s.date, 0), s.debut))
+        self.ordre: Dict[str, int] = {c: i for i, c in enumerate(self.creneaux)}
+        self.date_de: Dict[str, str] = {c: c.date for c in self.creneaux}
+        self.creneaux_par_date: Dict[str, List[str]] = defaultdict(list)
+        for c in self.creneaux:
+            self.creneaux_par_date[self.date_de[c]].append(c)
+        self.dates: List[str] = list(self.creneaux_par_date)
+
+        # Créneaux consécutifs dans le temps (même date, sans trou)
+        self.precedent: Dict[str, Optional[str]] = dict.fromkeys(self.creneaux)
+        self.suivant: Dict[str, Optional[str]] = dict.fromkeys(self.creneaux)
+        for slots in self.creneaux_par_date.values():
+            for avant, apres in zip(slots, slots[1:]):
+                if avant.fin <= apres.debut <= avant.fin + PAUSE_MAX:
+                    self.suivant[avant] = apres
+                    self.precedent[apres] = avant
+
+        # Semaines comptées depuis la première date (rang 0)
+        self.date2week: Dict[str, int] = {d: self.rangs.get(d, 0) // 7 + 1 for d in self.dates}
+        self.semaine_de: Dict[str, int] = {c: self.date2week[c.date] for c in self.creneaux}
+        self.semaines: List[int] = sorted(set(self.date2week.values()))
+
+    def voisins(self, creneau: str) -> List[str]:
+        """Créneaux juste avant et juste après (ceux qui comptent pour les répétitions groupées)."""
+        return [c for c in (self.precedent.get(creneau), self.suivant.get(creneau)) if c]
+
+    def creneaux_de_semaine(self, semaine: int) -> List[str]:
+        return [c for c in self.creneaux if self.semaine_de[c] == semaine]
+
+    def sous_calendrier(self, creneaux: Iterable[str]) -> "CalendarIndex":
+        """Index restreint à ces créneaux, mêmes rangs et numéros de semaine (voir restreindre())."""
+        return CalendarIndex(creneaux, rangs=self.rangs)
+
+
+if __name__ == "__main__":
+    # Colonnes d'un export : 22 et 29 septembre, puis 6 et 13 octobre
+    calendrier = CalendarIndex(["LUN_22_08:00-10:00", "LUN_22_10:00-12:00", "LUN_22_14:00-16:00",
+                                "MAR_23_18:00-20:00", "LUN_29_10:00-12:00", "LUN_06_10:00-12:00",
+                                "LUN_13_10:00-12:00"])
+    print("Dates :", dict(calendrier.creneaux_par_date))
+    print("Suivants :", {c: s for c, s in calendrier.suivant.items() if s})
+    print("Semaines :", calendrier.date2week)
+    print("Ambiguës :", CalendarIndex(["LUN_01_10:00-12:00", "LUN_08_10:00-12:00", "LUN_01_14:00-16:00"]).dates_ambigues)
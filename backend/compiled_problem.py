@@ -0,0 +1,128 @@
+"""
+Description : Représentation compacte (indices entiers + tableaux NumPy) du problème de planification
+Licence : On devrait peut-être mettre une licence hein
+Anno : 43
+
+Construite une seule fois à la fin de load_data. Les boucles chaudes des deux
+planificateurs travaillent sur ces indices au lieu de re-découper les chaînes
+"LUN_04_16:00-18:00" et de passer par des dicts imbriqués.
+"""
+from typing import Dict, Iterable, List, Set
+import numpy as np
+
+from calendar_index import CalendarIndex
+
+# Codes de disponibilité (matrice int8)
+DISPO_OUI = 0
+DISPO_PEUT_ETRE = 1
+DISPO_NON = 2
+
+VALEURS_NON = ("non", "no")
+VALEURS_PEUT_ETRE = ("peut-être", "maybe")
+
+
+def code_dispo(valeur) -> int:
+    """Même règle que le calcul des conflits : tout ce qui n'est ni non ni peut-être compte comme oui."""
+    if valeur is None or valeur in VALEURS_NON:
+        return DISPO_NON
+    if valeur in VALEURS_PEUT_ETRE:
+        return DISPO_PEUT_ETRE
+    return DISPO_OUI
+
+
+class CompiledProblem:
+    def __init__(self,
+                 morceaux: List[str],
+                 creneaux: List[str],
+                 repartition: Dict[str, Set[str]],
+                 musicien_morceaux: Dict[str, List[str]],
+                 disponibilites: Dict[str, Dict[str, str]],
+                 calendrier: CalendarIndex,
+                 musiciens: Iterable[str] = ()):
+        # --- Identifiants entiers ---
+        self.morceaux: List[str] = list(dict.fromkeys(morceaux))
+        self.morceau_id: Dict[str, int] = {m: i for i, m in enumerate(self.morceaux)}
+
+        self.creneaux: List[str] = list(creneaux)
+        self.creneau_id: Dict[str, int] = {c: i for i, c in enumerate(self.creneaux)}
+
+        tous_musiciens = set(musiciens) | set(disponibilites)
+        for morceau in self.morceaux:
+            tous_musiciens |= repartition[morceau]
+        self.musiciens: List[str] = sorted(tous_musiciens)
+        self.musicien_id: Dict[str, int] = {m: i for i, m in enumerate(self.musiciens)}
+
+        self.jours: List[str] = [d for d in calendrier.dates
+                                 if any(c in self.creneau_id for c in calendrier.creneaux_par_date[d])]
+        self.jour_id: Dict[str, int] = {j: i for i, j in enumerate(self.jours)}
+
+        n_mus, n_slots = len(self.musiciens), len(self.creneaux)
+        n_morceaux = len(self.morceaux)
+
+        # --- Disponibilités : musiciens x créneaux (absence de réponse = non) ---
+        self.disponibilite = np.full((n_mus, n_slots), DISPO_NON, dtype=np.int8)
+        for musicien, dispos in disponibilites.items():
+            i = self.musicien_id[musicien]
+            for creneau, valeur in dispos.items():
+                j = self.creneau_id.get(creneau)
+                if j is not None:
+                    self.disponibilite[i, j] = code_dispo(valeur)
+
+        # --- Incidence morceaux x musiciens ---
+        # Valeur = nombre d'occurrences du morceau dans musicien_morceaux[musicien]
+        # (un musicien noté sur deux instruments compte deux fois pour la charge)
+        self.incidence = np.zeros((n_morceaux, n_mus), dtype=np.int16)
+        for morceau in self.morceaux:
+            p = self.morceau_id[morceau]
+            for musicien in repartition[morceau]:
+                self.incidence[p, self.musicien_id[musicien]] = max(
+                    1, musicien_morceaux.get(musicien, []).count(morceau))
+
+        self.musiciens_de: List[np.ndarray] = [np.flatnonzero(self.incidence[p])
+                                               for p in range(n_morceaux)]
+        self.multiplicites_de: List[np.ndarray] = [self.incidence[p, mus].astype(np.int64)
+                                                   for p, mus in enumerate(self.musiciens_de)]
+
+        # Morceaux qui partagent au moins un musicien (le morceau lui-même compris)
+        partage = (self.incidence > 0).astype(np.int32)
+        partage = partage @ partage.T
+        self.morceaux_lies: List[np.ndarray] = [np.flatnonzero(partage[p]) for p in range(n_morceaux)]
+
+        # --- Calendrier : créneau -> date, créneau -> voisins consécutifs dans le temps (précédent, suivant) ---
+        self.creneau_jour = np.zeros(n_slots, dtype=np.int32)
+        self.creneau_adjacents = np.full((n_slots, 2), -1, dtype=np.int32)
+        for j, creneau in enumerate(self.creneaux):
+            self.creneau_jour[j] = self.jour_id[calendrier.date_de[creneau]]
+            for k, voisin in enumerate((calendrier.precedent[creneau], calendrier.suivant[creneau])):
+                if voisin in self.creneau_id:
+                    self.creneau_adjacents[j, k] = self.creneau_id[voisin]
+
+        self._comptes = None
+
+    def comptes_disponibilites(self):
+        """
+        Matrices morceaux x créneaux du nombre de musiciens absents ("non") et
+        "peut-être", calculées une fois par produit matriciel.
+        """
+        if self._comptes is None:
+            joue = (self.incidence > 0).astype(np.int32)
+            absents = joue @ (self.disponibilite == DISPO_NON).astype(np.int32)
+            maybes = joue @ (self.disponibilite == DISPO_PEUT_ETRE).astype(np.int32)
+            self._comptes = (absents.astype(np.int64), maybes.astype(np.int64))
+        return self._comptes
+
+    @property
+    def taille(self) -> Dict[str, int]:
+        return {
+            "musiciens": len(self.musiciens),
+            "morceaux": len(self.morceaux),
+            "creneaux": len(self.creneaux),
+            "jours": len(self.jours),
+        }
+
+    @classmethod
+    def depuis_scheduler(cls, scheduler) -> "CompiledProblem":
+        """Compile l'état d'un planificateur après load_data (les deux planificateurs ont les mêmes attributs)."""
+        return cls(scheduler.morceaux, scheduler.creneaux, scheduler.repartition,
+                   scheduler._musicien_morceaux, scheduler.disponibilites,
+                   scheduler.calendrier, scheduler.musiciens)
@@ -0,0 +1,62 @@
+"""
+Description : Cache des conflits (morceau, créneau) avec invalidation par version
+Licence : On devrait peut-être mettre une licence hein
+Anno : 43
+
+Chaque entrée garde la version des données dont elle dépend (occupation du
+créneau + charge des musiciens du morceau ce jour-là, voir DeltaCostEngine.version).
+Une entrée dont la version ne correspond plus est simplement ignorée : seules les
+entrées touchées par un déplacement sont invalidées, le reste du cache survit.
+"""
+from collections import OrderedDict
+from typing import Dict, Hashable, Optional
+
+
+class VersionedConflictCache:
+    def __init__(self, max_size: int = 200000):
+        self.max_size = max_size
+        self._entries: "OrderedDict[Hashable, tuple]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+        self.evictions = 0
+
+    def get(self, key: Hashable, version: int) -> Optional[int]:
+        entry = self._entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+        entry_version, value = entry
+        if entry_version != version:
+            # Une dépendance a bougé depuis le calcul
+            del self._entries[key]
+            self.invalidations += 1
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return value
+
+    def put(self, key: Hashable, version: int, value: int):
+        self._entries[key] = (version, value)
+        self._entries.move_to_end(key)
+        if len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def clear(self):
+        self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def stats(self) -> Dict[str, float]:
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "invalidations": self.invalidations,
+            "evictions": self.evictions,
+            "size": len(self._entries),
+            "hit_rate": self.hits / total if total else 0.0,
+        }
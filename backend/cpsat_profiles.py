@@ -0,0 +1,116 @@
+"""
+Description : Profils de paramètres CP-SAT et nombre de workers adapté à la machine
+Licence : On devrait peut-être mettre une licence hein
+Anno : 43
+
+Profils :
+- "fast"          : une bonne solution vite (presolve court, pas de linéarisation ni de symétries)
+- "balanced"      : les réglages par défaut de CP-SAT, c'est ce qu'on utilisait avant
+- "prove-optimal" : plus de temps en presolve, linéarisation et symétries pour resserrer
+                    la borne et prouver l'optimum. Avec peu de cœurs il peut ne trouver
+                    aucune solution dans le temps : à combiner avec un warm start ou le
+                    mode hybride, qui lui donnent une première solution
+
+Les workers sont dimensionnés sur les cœurs vraiment disponibles : quota CPU du cgroup
+(conteneur Docker, Kubernetes...), sinon l'affinité du processus, sinon os.cpu_count().
+Avant, on lançait 8 workers en dur, même sur un serveur à 1 cœur. On garde quand même
+au moins 2 workers : avec un seul, CP-SAT ne fait plus de LNS et trouve nettement moins
+bien (benchmark.py profils, machine à 1 cœur : 1re solution en 7 s au lieu de 1 s).
+N'importe quel paramètre de SatParameters peut être surchargé par son nom
+(symmetry_level, cp_model_presolve, linearization_level, max_presolve_iterations...).
+Lancer ce fichier affiche les cœurs détectés et les paramètres de chaque profil.
+"""
+import math
+import os
+from typing import Dict, Optional
+
+from ortools.sat import sat_parameters_pb2
+
+PROFILS: Dict[str, Dict] = {
+    "fast": {
+        "linearization_level": 0,
+        "symmetry_level": 0,
+        "max_presolve_iterations": 1,
+        "cp_model_probing_level": 0,
+    },
+    "balanced": {},
+    "prove-optimal": {
+        "linearization_level": 2,
+        "symmetry_level": 4,
+        "max_presolve_iterations": 5,
+    },
+}
+PROFIL_DEFAUT = "balanced"
+MIN_WORKERS = 2
+# Au-delà, les workers de CP-SAT se marchent dessus sur nos tailles de modèle
+MAX_WORKERS = {"fast": 8, "balanced": 16, "prove-optimal": 16}
+
+
+def _quota_cgroup() -> Optional[float]:
+    """Nombre de cœurs alloués par le cgroup (v2 puis v1), None si pas de quota."""
+    try:
+        with open("/sys/fs/cgroup/cpu.max") as f:
+            quota, periode = f.read().split()[:2]
+        if quota != "max":
+            return int(quota) / int(periode)
+        return None
+    except (OSError, ValueError):
+        pass
+    try:
+        with open("/sys/fs/cgroup/cpu/cpu.cfs_quota_us") as f:
+            quota = int(f.read())
+        with open("/sys/fs/cgroup/cpu/cpu.cfs_period_us") as f:
+            periode = int(f.read())
+        if quota > 0 and periode > 0:
+            return quota / periode
+    except (OSError, ValueError):
+        pass
+    return None
+
+
+def coeurs_disponibles() -> int:
+    """Cœurs utilisables par ce processus : min(affinité, quota cgroup arrondi au-dessus), au moins 1."""
+    try:
+        coeurs = len(os.sched_getaffinity(0))
+    except AttributeError:  # pas de sched_getaffinity (macOS, Windows)
+        coeurs = os.cpu_count() or 1
+    quota = _quota_cgroup()
+    if quota is not None:
+        coeurs = min(coeurs, math.ceil(quota))
+    return max(1, coeurs)
+
+
+def workers_auto(profil: str = PROFIL_DEFAUT) -> int:
+    return max(MIN_WORKERS, min(coeurs_disponibles(), MAX_WORKERS.get(profil, 16)))
+
+
+def parametres_profil(profil: str = PROFIL_DEFAUT, workers: Optional[int] = None,
+                      surcharges: Optional[Dict] = None) -> Dict:
+    """Paramètres du profil, workers compris (0 ou None = automatique), puis les surcharges."""
+    if profil not in PROFILS:
+        raise ValueError(f"Profil CP-SAT inconnu : {profil} (choix : {', '.join(PROFILS)})")
+    parametres = dict(PROFILS[profil])
+    parametres["num_workers"] = workers or workers_auto(profil)
+    parametres.update(surcharges or {})
+
+    champs = sat_parameters_pb2.SatParameters.DESCRIPTOR.fields_by_name
+    inconnus = [nom for nom in parametres if nom not in champs]
+    if inconnus:
+        raise ValueError(f"Paramètre CP-SAT inconnu : {', '.join(inconnus)}")
+    return parametres
+
+
+def appliquer_profil(solver, profil: str = PROFIL_DEFAUT, workers: Optional[int] = None,
+                     surcharges: Optional[Dict] = None) -> Dict:
+    """Règle solver.parameters selon le profil ; renvoie les paramètres appliqués."""
+    parametres = parametres_profil(profil, workers, surcharges)
+    for nom, valeur in parametres.items():
+        setattr(solver.parameters, nom, valeur)
+    return parametres
+
+
+if __name__ == "__main__":
+    print(f"Cœurs disponibles : {coeurs_disponibles()} (quota cgroup : {_quota_cgroup()}, "
+          f"os.cpu_count : {os.cpu_count()})")
+    for nom in PROFILS:
+        print(f"{nom:<15}{parametres_profil(nom)}")
@@ -0,0 +1,240 @@
+"""
+Description : Décomposition du planning en composantes indépendantes résolues en parallèle
+Licence : On devrait peut-être mettre une licence hein
+Anno : 43
+
+Deux morceaux qui n'ont aucun musicien en commun ne se gênent que par la contrainte
+"un morceau par créneau" : charge journalière, répétitions groupées et absences sont
+par musicien. On construit le graphe morceaux -- musiciens, ses composantes connexes
+sont les sous-problèmes. Elles sont regroupées en au plus `processus` groupes (les plus
+grosses d'abord, dans le groupe le moins chargé), et chaque groupe est résolu dans son
+propre processus par le planificateur choisi (recherche locale ou CP-SAT), restreint à
+ses morceaux (voir restreindre()).
+
+Coordination par réservation des créneaux, en quelques tours :
+1. chaque groupe est résolu avec tous les créneaux qui ne sont pas réservés par un autre ;
+2. un créneau pris par plusieurs groupes est réservé au morceau qui y a le moins
+   d'absents (puis de "peut-être") ; les groupes perdants sont résolus à nouveau, les
+   autres gardent leur solution ;
+3. au dernier tour (ou quand le temps est écoulé), les créneaux encore libres sont partagés d'avance entre les
+   perdants (chacun à son tour prend le meilleur pour ses morceaux) : plus de collision
+   possible.
+Le temps de résolution suit donc le plus gros groupe, pas la saison entière.
+Le mode anytime reçoit la solution fusionnée à la fin de chaque tour.
+"""
+import time
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Optional, Set
+
+import numpy as np
+
+from cpsat_profiles import coeurs_disponibles
+from scheduler import OptimizedRepetitionScheduler, _MP_CONTEXTE
+
+
+def composantes_connexes(probleme) -> List[List[str]]:
+    """Morceaux reliés par au moins un musicien commun (de proche en proche), plus grosses d'abord."""
+    vus = np.zeros(len(probleme.morceaux), dtype=bool)
+    composantes = []
+    for depart in range(len(probleme.morceaux)):
+        if vus[depart]:
+            continue
+        vus[depart] = True
+        pile, composante = [depart], []
+        while pile:
+            p = pile.pop()
+            composante.append(p)
+            for q in probleme.morceaux_lies[p]:
+                if not vus[q]:
+                    vus[q] = True
+                    pile.append(q)
+        composantes.append([probleme.morceaux[p] for p in sorted(composante)])
+    return sorted(composantes, key=len, reverse=True)
+
+
+def regrouper(composantes: List[List[str]], n_groupes: int) -> List[List[str]]:
+    """Répartit les composantes dans n_groupes groupes équilibrés en nombre de morceaux."""
+    groupes: List[List[str]] = [[] for _ in range(max(1, min(n_groupes, len(composantes))))]
+    for composante in composantes:
+        min(groupes, key=len).extend(composante)
+    return groupes
+
+
+def _resoudre_groupe(classe, args, kwargs, morceaux: List[str], interdits: Set[str],
+                     temps: int) -> Dict:
+    """Dans un worker : charge les fichiers, restreint le planificateur au groupe et résout."""
+    planner = classe(*args, **dict(kwargs, generation_time_limit=temps))
+    planner.load_data()
+    planner.restreindre(morceaux, interdits)
+    if isinstance(planner, OptimizedRepetitionScheduler):
+        planner.build_model()
+    planner.solve()
+    assignation = {m: planner.solution.get(m) for m in morceaux}
+    # par sécurité : jamais de créneau réservé à un autre groupe dans le résultat
+    return {m: (c if c not in interdits else None) for m, c in assignation.items()}
+
+
+class DecomposedScheduler:
+    def __init__(self, classe, *args, processus: Optional[int] = None, max_tours: int = 3, **kwargs):
+        """
+        classe : OptimizedRepetitionScheduler ou RepetitionScheduler, construit avec *args et
+        **kwargs (generation_time_limit en mot-clé : c'est le budget total de la décomposition).
+        processus : groupes résolus en parallèle (par défaut les cœurs disponibles) ; le
+        `workers` de kwargs garde son sens pour le planificateur (threads de CP-SAT).
+        max_tours : tours de réservation des créneaux (le dernier partage les créneaux libres).
+        """
+        self.classe = classe
+        self.args = args
+        self.generation_time_limit = kwargs.get("generation_time_limit", 30)
+        self.processus = processus or coeurs_disponibles()
+        self.max_tours = max(1, max_tours)
+        self._stream = kwargs.get("stream")
+        # Les workers ne publient pas eux-mêmes (coûts partiels) ; la recherche locale
+        # d'un groupe reste séquentielle, c'est la décomposition qui parallélise
+        self._kwargs_groupes = {k: v for k, v in kwargs.items() if k not in ("stream", "warm_start")}
+        if issubclass(classe, OptimizedRepetitionScheduler):
+            self._kwargs_groupes["workers"] = 1
+        # Planificateur complet : données, solution fusionnée, export
+        self.planner = classe(*args, **kwargs)
+
+        self.composantes: List[List[str]] = []
+        self.groupes: List[List[str]] = []
+        self.tours: List[Dict] = []
+
+    # --- Réservation des créneaux ---
+
+    def _adequation(self, morceau: str, creneau: str):
+        """Plus c'est petit, mieux le morceau va sur ce créneau (absents, puis peut-être)."""
+        P = self.planner.probleme
+        absents, maybes = P.comptes_disponibilites()
+        p, s = P.morceau_id[morceau], P.creneau_id[creneau]
+        return int(absents[p, s]), int(maybes[p, s])
+
+    def _proprietaires(self, resultats: Dict[int, Dict[str, Optional[str]]]):
+        """créneau -> groupe qui le garde, et groupes qui ont perdu au moins un créneau."""
+        demandes = defaultdict(list)
+        for g, assignation in resultats.items():
+            for morceau, creneau in assignation.items():
+                if creneau:
+                    demandes[creneau].append((self._adequation(morceau, creneau), g, morceau))
+        proprietaires, perdants = {}, set()
+        for creneau, demandeurs in demandes.items():
+            _, gagnant, _ = min(demandeurs)
+            proprietaires[creneau] = gagnant
+            perdants |= {g for _, g, _ in demandeurs if g != gagnant}
+        return proprietaires, perdants
+
+    def _partager_libres(self, groupes: List[int], proprietaires: Dict[str, int]) -> Dict[int, Set[str]]:
+        """Dernier tour : chaque groupe perdant, à tour de rôle, prend le créneau libre qui lui va le mieux."""
+        libres = [c for c in self.planner.probleme.creneaux if c not in proprietaires]
+        parts = {g: set() for g in groupes}
+        besoin = {g: len(self.groupes[g]) - sum(1 for o in proprietaires.values() if o == g) for g in groupes}
+        actifs = [g for g in sorted(groupes, key=lambda g: -len(self.groupes[g])) if besoin[g] > 0]
+        while libres and actifs:
+            for g in list(actifs):
+                if not libres:
+                    break
+                meilleur = min(libres, key=lambda c: min(self._adequation(m, c) for m in self.groupes[g]))
+                libres.remove(meilleur)
+                parts[g].add(meilleur)
+                besoin[g] -= 1
+                if besoin[g] <= 0:
+                    actifs.remove(g)
+        return parts
+
+    def _sans_collision(self, resultats: Dict[int, Dict[str, Optional[str]]]) -> Dict[str, Optional[str]]:
+        """Fusion ; un créneau encore disputé reste au gagnant, les autres morceaux ne sont pas assignés."""
+        proprietaires, _ = self._proprietaires(resultats)
+        fusion = {}
+        for g, assignation in resultats.items():
+            for morceau, creneau in assignation.items():
+                fusion[morceau] = creneau if creneau and proprietaires.get(creneau) == g else None
+        return fusion
+
+    def _cout(self) -> Optional[float]:
+        if isinstance(self.planner, OptimizedRepetitionScheduler):
+            return self.planner._calculate_total_cost()
+        return self.planner.valeur_objectif
+
+    # --- Résolution ---
+
+    def _resoudre_tour(self, pool, a_resoudre: List[int], interdits: Dict[int, Set[str]], temps: int):
+        taches = [(self.classe, self.args, self._kwargs_groupes, self.groupes[g], interdits[g], temps)
+                  for g in a_resoudre]
+        if pool is None or len(taches) <= 1:
+            return dict(zip(a_resoudre, (_resoudre_groupe(*t) for t in taches)))
+        return dict(zip(a_resoudre, pool.map(_resoudre_groupe, *zip(*taches))))
+
+    def solve(self):
+        debut = time.time()
+        deadline = debut + self.generation_time_limit
+        self.composantes = composantes_connexes(self.planner.probleme)
+        self.groupes = regrouper(self.composantes, self.processus)
+        self.tours = []
+        print(f"🧩 Décomposition : {len(self.composantes)} composante(s) "
+              f"(la plus grosse : {len(self.composantes[0]) if self.composantes else 0} morceaux), "
+              f"{len(self.groupes)} groupe(s) de {[len(g) for g in self.groupes]} morceaux")
+
+        if len(self.groupes) < 2:
+            print("🧩 Une seule composante : résolution d'un bloc")
+            self.planner.generer_planning()
+            return
+
+        # un seul pool pour tous les tours : on ne repaie pas le lancement des processus
+        pool = None
+        if self.processus > 1:
+            pool = ProcessPoolExecutor(max_workers=min(self.processus, len(self.groupes)), mp_context=_MP_CONTEXTE)
+        try:
+            self._tours_de_reservation(pool, deadline)
+        finally:
+            if pool is not None:
+                pool.shutdown()
+        print(f"🧩 Fusion : {len(self.planner.solution)}/{len(self.planner.morceaux)} morceaux assignés, "
+              f"coût {self._cout()} en {time.time() - debut:.1f}s")
+
+    def _tours_de_reservation(self, pool, deadline: float):
+        resultats: Dict[int, Dict[str, Optional[str]]] = {}
+        proprietaires: Dict[str, int] = {}
+        a_resoudre = list(range(len(self.groupes)))
+        for tour in range(1, self.max_tours + 1):
+            # plus de temps ou plus de tours : on partage les créneaux libres, le tour suivant sera sans collision
+            dernier = tour == self.max_tours or time.time() >= deadline
+            interdits = {g: {c for c, o in proprietaires.items() if o != g} for g in a_resoudre}
+            if dernier and tour > 1:
+                parts = self._partager_libres(a_resoudre, proprietaires)
+                libres = set(self.planner.probleme.creneaux) - set(proprietaires)
+                for g in a_resoudre:
+                    interdits[g] |= libres - parts[g]
+            temps = int(max(1, round((deadline - time.time()) / (self.max_tours - tour + 1))))
+            debut_tour = time.time()
+            resultats.update(self._resoudre_tour(pool, a_resoudre, interdits, temps))
+            proprietaires, perdants = self._proprietaires(resultats)
+            self.tours.append({"tour": tour, "groupes": len(a_resoudre), "collisions": len(perdants),
+                               "duree": round(time.time() - debut_tour, 3)})
+            print(f"🧩 Tour {tour} : {len(a_resoudre)} groupe(s) résolus en {time.time() - debut_tour:.1f}s, "
+                  f"{len(perdants)} groupe(s) en collision")
+
+            fusion = self._sans_collision(resultats)
+            self.planner.adopter_solution(fusion)
+            if self._stream is not None:
+                self._stream.publier(self._cout(), fusion, "decomposition")
+            if not perdants or dernier or (self._stream is not None and self._stream.arret_demande()):
+                break
+            a_resoudre = sorted(perdants)
+
+    def generer_planning(self):
+        self.planner.load_data()
+        self.solve()
+
+    def export_planning(self, directory=".", base_filename="planning"):
+        return self.planner.export_planning(directory, base_filename)
+
+    def get_json_data(self):
+        donnees = self.planner.get_json_data()
+        donnees["decomposition"] = {
+            "composantes": [len(c) for c in self.composantes],
+            "groupes": [len(g) for g in self.groupes],
+            "tours": self.tours,
+        }
+        return donnees
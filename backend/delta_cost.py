@@ -0,0 +1,265 @@
+"""
+Description : Évaluation incrémentale des conflits pour OptimizedRepetitionScheduler
+Licence : On devrait peut-être mettre une licence hein
+Anno : 43
+
+Au lieu de rescanner tout self.assignment à chaque appel de calculate_conflicts,
+on garde des compteurs à jour à chaque déplacement d'un morceau :
+- occupation[creneau] : nombre de morceaux sur le créneau
+- charge[musicien][jour] : nombre de répétitions du musicien ce jour-là
+- presence[musicien][creneau] : nombre de répétitions du musicien sur ce créneau
+  (sert aussi pour les bonus de groupement sur les créneaux adjacents)
+Chaque modification incrémente aussi un numéro de génération par créneau et par
+(musicien, jour), utilisé par VersionedConflictCache pour savoir si une entrée est périmée.
+
+Les compteurs sont des tableaux NumPy indexés par les identifiants de
+CompiledProblem. Ils tiennent compte des doublons de _musicien_morceaux (un musicien
+noté sur deux instruments du même morceau compte deux fois), exactement comme
+le calcul complet.
+Usage (vérification) : python delta_cost.py (instances générées) ou python delta_cost.py repartitions.xlsx disponibilites.xlsx
+"""
+from typing import List, Optional, Set
+import numpy as np
+
+PENALITE_COLLISION = 100000000
+
+
+class DeltaCostEngine:
+    def __init__(self, scheduler):
+        self.scheduler = scheduler
+        self.probleme = probleme = scheduler.probleme
+        self.assignment = scheduler.assignment
+
+        n_morceaux = len(probleme.morceaux)
+        n_slots = len(probleme.creneaux)
+        n_mus = len(probleme.musiciens)
+        n_jours = len(probleme.jours)
+
+        # Versions Python des listes d'indices : plus rapides pour le calcul scalaire
+        self.musiciens_de = [mus.tolist() for mus in probleme.musiciens_de]
+        self.multiplicites_de = [mult.tolist() for mult in probleme.multiplicites_de]
+        self.creneau_jour = probleme.creneau_jour.tolist()
+        self.adjacents = [[a for a in adj if a >= 0] for adj in probleme.creneau_adjacents.tolist()]
+
+        # Générations : ne font qu'augmenter, jamais remises à zéro
+        self.epoque = 0
+        self.generation_creneau = np.zeros(n_slots, dtype=np.int64)
+        self.generation_jour = np.zeros((n_mus, n_jours), dtype=np.int64)
+
+        self._n = (n_morceaux, n_slots, n_mus, n_jours)
+        self.reinitialiser()
+
+    def reinitialiser(self):
+        """Reconstruit tous les compteurs depuis self.assignment."""
+        n_morceaux, n_slots, n_mus, n_jours = self._n
+        self.assignment = self.scheduler.assignment
+        self.epoque += 1
+        self.position = np.full(n_morceaux, -1, dtype=np.int64)
+        self.occupation = np.zeros(n_slots, dtype=np.int64)
+        self.morceaux_par_creneau: List[Set[int]] = [set() for _ in range(n_slots)]
+        # Empreinte de l'affectation (somme des hash des paires morceau/créneau) : revient à
+        # la même valeur après un mouvement annulé, contrairement aux générations
+        self.empreinte = 0
+        self.charge = np.zeros((n_mus, n_jours), dtype=np.int64)
+        self.presence = np.zeros((n_mus, n_slots), dtype=np.int64)
+
+        ids = self.probleme.creneau_id
+        for morceau, creneau in self.assignment.items():
+            if creneau:
+                self._ajouter(self.probleme.morceau_id[morceau], ids[creneau], 1)
+
+    def _ajouter(self, p: int, c: int, signe: int):
+        self.position[p] = c if signe > 0 else -1
+        self.occupation[c] += signe
+        if signe > 0:
+            self.morceaux_par_creneau[c].add(p)
+        else:
+            self.morceaux_par_creneau[c].discard(p)
+        self.generation_creneau[c] += 1
+        self.empreinte += signe * hash((p, c))
+
+        mus = self.probleme.musiciens_de[p]
+        mult = self.probleme.multiplicites_de[p]
+        jour = self.creneau_jour[c]
+        self.charge[mus, jour] += signe * mult
+        self.presence[mus, c] += signe * mult
+        self.generation_jour[mus, jour] += 1
+
+    def deplacer(self, morceau: str, creneau: Optional[str]) -> Set[str]:
+        """
+        Déplace un morceau (creneau=None pour le désassigner) et met les compteurs à jour
+        en O(musiciens du morceau). Retourne les morceaux dont le coût a pu changer.
+        """
+        ancien = self.assignment.get(morceau)
+        if ancien == creneau:
+            return set()
+
+        p = self.probleme.morceau_id[morceau]
+        touches = set(self.probleme.morceaux_lies[p].tolist())
+        if ancien:
+            c = self.probleme.creneau_id[ancien]
+            touches |= self.morceaux_par_creneau[c]
+            self._ajouter(p, c, -1)
+
+        self.assignment[morceau] = creneau
+        if creneau:
+            c = self.probleme.creneau_id[creneau]
+            touches |= self.morceaux_par_creneau[c]
+            self._ajouter(p, c, 1)
+
+        noms = self.probleme.morceaux
+        return {noms[q] for q in touches}
+
+    def version(self, morceau: str, creneau: str) -> int:
+        """
+        Version des données dont dépend cout(morceau, creneau) : occupation du créneau
+        et charge/présence des musiciens du morceau sur ce jour (les créneaux adjacents
+        sont du même jour). Les générations ne faisant qu'augmenter, leur somme change
+        dès que l'une d'elles change.
+        """
+        p = self.probleme.morceau_id[morceau]
+        c = self.probleme.creneau_id[creneau]
+        generation_jour = self.generation_jour[:, self.creneau_jour[c]]
+        return int(self.epoque + self.generation_creneau[c]
+                   + generation_jour[self.probleme.musiciens_de[p]].sum())
+
+    def couts_morceau(self, morceau: str) -> np.ndarray:
+        """
+        Coût du morceau sur tous les créneaux d'un coup (vectorisé sur musiciens x créneaux).
+        couts_morceau(m)[i] == cout(m, creneaux[i]).
+        """
+        s = self.scheduler
+        probleme = self.probleme
+        p = probleme.morceau_id[morceau]
+        mus = probleme.musiciens_de[p]
+        mult = probleme.multiplicites_de[p]
+        actuel = self.position[p]
+
+        couts = s.couts_statiques[p].copy()
+
+        # Conflit de créneau (le morceau lui-même ne compte pas)
+        occupation = self.occupation.copy()
+        charge = self.charge[mus][:, probleme.creneau_jour]
+        presence = self.presence[mus]
+        if actuel >= 0:
+            occupation[actuel] -= 1
+            meme_jour = probleme.creneau_jour == probleme.creneau_jour[actuel]
+            charge[:, meme_jour] -= mult[:, None]
+            presence = presence.copy()
+            presence[:, actuel] -= mult
+        couts += occupation * PENALITE_COLLISION
+
+        # Charge quotidienne
+        charge += presence > 0
+        couts += s.load_penalty * np.maximum(charge - s.max_load + 1, 0).sum(axis=0)
+
+        # Bonus de groupement (colonne de zéros pour les voisins absents, indice -1)
+        presence = np.concatenate([presence, np.zeros((len(mus), 1), dtype=presence.dtype)], axis=1)
+        adjacents = probleme.creneau_adjacents
+        bonus = s.group_bonus * (presence[:, adjacents[:, 0]] + presence[:, adjacents[:, 1]]).sum(axis=0)
+
+        return np.maximum(couts - bonus, 0)
+
+    def cout(self, morceau: str, creneau: str) -> int:
+        """Même valeur que le calcul complet de calculate_conflicts, sans parcourir l'assignation."""
+        s = self.scheduler
+        p = self.probleme.morceau_id[morceau]
+        c = self.probleme.creneau_id[creneau]
+        actuel = int(self.position[p])
+        jour = self.creneau_jour[c]
+        jour_actuel = self.creneau_jour[actuel] if actuel >= 0 else -1
+
+        # Disponibilités : précalculé (voir _precalculer_couts_statiques)
+        conflicts = int(s.couts_statiques[p, c])
+
+        # Conflit de créneau (le morceau lui-même ne compte pas)
+        autres = int(self.occupation[c]) - (1 if actuel == c else 0)
+        conflicts += autres * PENALITE_COLLISION
+
+        # Charge quotidienne et bonus de groupement
+        bonus = 0
+        charge, presence = self.charge, self.presence
+        adjacents = self.adjacents[c]
+        for musicien, k in zip(self.musiciens_de[p], self.multiplicites_de[p]):
+            charge_jour = int(charge[musicien, jour]) - (k if jour_actuel == jour else 0)
+            if presence[musicien, c] - (k if actuel == c else 0) > 0:
+                charge_jour += 1
+            if charge_jour >= s.max_load:
+                conflicts += s.load_penalty * (charge_jour - s.max_load + 1)
+
+            for adj in adjacents:
+                n = int(presence[musicien, adj]) - (k if actuel == adj else 0)
+                if n:
+                    bonus += s.group_bonus * n
+
+        return max(0, conflicts - bonus)
+
+    def verifier(self) -> List[tuple]:
+        """
+        Compare cout(), couts_morceau() et calculate_conflicts (qui passe par le cache)
+        au calcul complet sur tous les couples (morceau, créneau).
+        """
+        s = self.scheduler
+        ecarts = []
+        lignes = {morceau: self.couts_morceau(morceau) for morceau in s.morceaux}
+        for morceau in s.morceaux:
+            for creneau in s.creneaux:
+                attendu = s._calculer_conflits_complet(morceau, creneau)
+                obtenu = self.cout(morceau, creneau)
+                en_cache = s.calculate_conflicts(morceau, creneau)
+                vectorise = int(lignes[morceau][self.probleme.creneau_id[creneau]])
+                if not attendu == obtenu == en_cache == vectorise:
+                    ecarts.append((morceau, creneau, attendu, obtenu, en_cache, vectorise))
+        return ecarts
+
+
+def verifier_instance(repart_path: str, dispo_path: str, graine: int = 0, essais: int = 20, **options) -> int:
+    """
+    Déplacements aléatoires sur l'instance, vérifier() après chaque série (deux fois : la
+    seconde passe lit le cache) ; renvoie le nombre d'écarts trouvés.
+    """
+    import random
+    from scheduler import OptimizedRepetitionScheduler
+
+    planner = OptimizedRepetitionScheduler(repart_path, dispo_path, **options)
+    planner.load_data()
+    planner.build_model()
+    engine = planner._delta
+
+    rng = random.Random(graine)
+    choix = planner.creneaux + [None]
+    total_ecarts = 0
+    for _ in range(essais):
+        for _ in range(max(1, len(planner.morceaux) // 4)):
+            engine.deplacer(rng.choice(planner.morceaux), rng.choice(choix))
+        ecarts = engine.verifier() + engine.verifier()
+        total_ecarts += len(ecarts)
+        for e in ecarts[:5]:
+            print("Écart :", e)
+    return total_ecarts
+
+
+if __name__ == "__main__":
+    import sys
+    import tempfile
+
+    # python delta_cost.py : instances générées (benchmark.generer_instance), plusieurs modes
+    # python delta_cost.py repartitions.xlsx disponibilites.xlsx : un vrai couple de fichiers
+    if len(sys.argv) >= 3:
+        total = verifier_instance(sys.argv[1], sys.argv[2])
+    else:
+        from benchmark import DEBUT_SAISON, generer_instance
+
+        total = 0
+        with tempfile.TemporaryDirectory() as dossier:
+            for graine, (n_musiciens, n_morceaux, n_semaines) in enumerate([(12, 25, 1), (25, 40, 2)]):
+                repart_path, dispo_path = generer_instance(dossier, n_musiciens, n_morceaux, n_semaines,
+                                                           graine=graine, doublons=0.2)
+                special = f"LUN_{DEBUT_SAISON.day:02d}_16:00-18:00"  # premier lundi de la saison
+                for mode in ("fixed", "strict", "flexible"):
+                    ecarts = verifier_instance(repart_path, dispo_path, graine, essais=5, mode_absence=mode,
+                                               seuil_absence=1, creneaux_speciaux=[special])
+                    print(f"{n_musiciens}x{n_morceaux}x{n_semaines} {mode:<9}: {ecarts} écart(s)")
+                    total += ecarts
+    print("✅ Coûts identiques" if not total else f"❌ {total} écarts")
+    sys.exit(1 if total else 0)
@@ -0,0 +1,171 @@
+"""
+Description : Mode hybride : min-conflicts pour trouver vite une bonne solution, puis CP-SAT part d'elle
+Licence : On devrait peut-être mettre une licence hein
+Anno : 43
+
+Phase 1 : OptimizedRepetitionScheduler tourne `local_time_limit` secondes.
+Phase 2 : sa meilleure assignation devient l'indice de RepetitionScheduler. Elle est
+complétée en solution CP-SAT entière (completer_indices), et son objectif sert de
+borne supérieure (objectif <= valeur). CP-SAT cherche mieux avec le reste du temps, et
+prouve l'optimum s'il y arrive.
+À la fin, `phase` dit qui a fourni la solution retenue ("min_conflicts" si CP-SAT n'a
+rien trouvé de mieux) et ecart_optimalite() donne l'écart à la borne de CP-SAT.
+Les créneaux spéciaux ne sont connus que de la recherche locale : un morceau qu'elle y
+place au-delà du seuil normal n'est pas repris comme indice.
+En mode anytime, les coûts de la recherche locale ne sont pas publiés : ils ne sont pas
+à l'échelle de l'objectif CP-SAT (1280 contre 480 pour le même genre de planning). Sa
+solution est publiée une fois, évaluée par le modèle CP-SAT (objectif_local), puis
+viennent les solutions de CP-SAT.
+"""
+import time
+from typing import Dict, Optional
+
+from ortools.sat.python import cp_model
+
+from cpsat_profiles import PROFIL_DEFAUT
+from scheduler import OptimizedRepetitionScheduler
+from scheduler_repetition import RepetitionScheduler
+
+
+class _FluxSansPublication:
+    """Le stream vu par la recherche locale : l'arrêt demandé passe, les publications non."""
+
+    def __init__(self, stream):
+        self.stream = stream
+
+    def publier(self, cout, assignment, solveur):
+        pass
+
+    def arreter(self):
+        self.stream.arreter()
+
+    def arret_demande(self) -> bool:
+        return self.stream.arret_demande()
+
+
+class HybridScheduler(RepetitionScheduler):
+    def __init__(self,
+                 repartitions_file: str,
+                 disponibilites_file: str,
+                 maybe_penalty: int,
+                 max_load: int,
+                 load_penalty: int,
+                 group_bonus: int,
+                 mode_absence: str = "strict",
+                 seuil_absence: int = 0,
+                 generation_time_limit: int = 30,
+                 local_time_limit: Optional[int] = None,
+                 local_options: Optional[Dict] = None,
+                 stream=None,
+                 warm_start=None,
+                 profil: str = PROFIL_DEFAUT,
+                 workers: Optional[int] = None,
+                 parametres_cpsat: Optional[Dict] = None,
+                 symetries: bool = True):
+        """
+        Mêmes paramètres que RepetitionScheduler (profil, workers, parametres_cpsat et
+        symetries ne concernent que CP-SAT), plus :
+        - local_time_limit: secondes laissées à la recherche locale (par défaut un
+          cinquième de generation_time_limit, entre 1 et 10 s)
+        - local_options: paramètres en plus pour OptimizedRepetitionScheduler (engine,
+          workers, neighbourhoods, creneaux_speciaux...)
+        Le warm_start éventuel sert de point de départ à la recherche locale.
+        """
+        super().__init__(repartitions_file, disponibilites_file, maybe_penalty, max_load,
+                         load_penalty, group_bonus, mode_absence, seuil_absence,
+                         generation_time_limit, stream=stream, warm_start=warm_start,
+                         profil=profil, workers=workers, parametres_cpsat=parametres_cpsat,
+                         symetries=symetries)
+        if local_time_limit is None:
+            local_time_limit = min(10, max(1, generation_time_limit // 5))
+        self.local_time_limit = max(1, int(local_time_limit))
+        self.local_options = dict(local_options or {})
+        self._warm_start_initial = self.warm_start
+
+        self.phase: Optional[str] = None           # "min_conflicts" ou "cp-sat"
+        self.cout_local: Optional[int] = None      # coût de la recherche locale (son échelle à elle)
+        self.objectif_local: Optional[int] = None  # même solution, évaluée par le modèle CP-SAT
+        self.duree_locale = 0.0
+        self.duree_cpsat = 0.0
+
+    def _phase_locale(self) -> OptimizedRepetitionScheduler:
+        locale = OptimizedRepetitionScheduler(
+            self.repartitions_file, self.disponibilites_file,
+            self.maybe_penalty, self.max_load, self.load_penalty, self.group_bonus,
+            self.mode_absence, self.seuil_absence,
+            generation_time_limit=self.local_time_limit,
+            stream=_FluxSansPublication(self._stream) if self._stream is not None else None,
+            warm_start=self._warm_start_initial,
+            **self.local_options,
+        )
+        locale.generer_planning()
+        return locale
+
+    def build_model(self):
+        super().build_model()
+        self.objectif_local = self.objectif_indice
+        if self.objectif_local is not None:
+            # CP-SAT ne garde que les solutions au moins aussi bonnes que la recherche locale
+            self.model.Add(self.objectif <= self.objectif_local)
+            print(f"🔀 Solution locale = objectif CP-SAT {self.objectif_local}, utilisé comme borne supérieure")
+            if self._stream is not None:
+                self._stream.publier(self.objectif_local, self.warm_start, "min_conflicts")
+
+    def _adopter_solution_locale(self, locale: OptimizedRepetitionScheduler):
+        """Arrêt demandé pendant la recherche locale : on garde sa solution sans lancer CP-SAT."""
+        self.solution = dict(locale.solution)
+        self.musiciens_absents_force.clear()
+        for morceau, absents in locale.musiciens_absents_force.items():
+            self.musiciens_absents_force[morceau] = set(absents)
+        self.status = cp_model.FEASIBLE
+
+    def solve(self):
+        debut = time.time()
+        self.phase = None
+        self.objectif_local = None
+
+        print(f"🔀 Hybride, phase 1 : recherche locale ({self.local_time_limit}s)")
+        locale = self._phase_locale()
+        self.duree_locale = time.time() - debut
+        self.cout_local = locale._calculate_total_cost()
+        self.warm_start = dict(locale.assignment)
+
+        if self._stream is not None and self._stream.arret_demande():
+            self._adopter_solution_locale(locale)
+            self.phase = "min_conflicts"
+            return self.status, self.solution, len(self.morceaux) - len(self.solution), None
+
+        restant = max(1.0, self.generation_time_limit - self.duree_locale)
+        print(f"🔀 Hybride, phase 2 : CP-SAT ({restant:.0f}s) à partir du coût local {self.cout_local}")
+        debut_cpsat = time.time()
+        resultat = super().solve(temps_max=restant)
+        self.duree_cpsat = time.time() - debut_cpsat
+
+        if self.status not in (cp_model.OPTIMAL, cp_model.FEASIBLE):
+            # CP-SAT n'a rien rendu dans le temps : la recherche locale reste la réponse
+            self._adopter_solution_locale(locale)
+            self.phase = "min_conflicts"
+            resultat = (self.status, self.solution, len(self.morceaux) - len(self.solution), None)
+        elif self.objectif_local is not None and self.valeur_objectif >= self.objectif_local:
+            self.phase = "min_conflicts"
+        else:
+            self.phase = "cp-sat"
+        ecart = self.ecart_optimalite()
+        print(f"🔀 Solution retenue : {self.phase}"
+              + (f", écart à l'optimum {ecart:.1%}" if ecart is not None else ""))
+        return resultat
+
+    def get_json_data(self):
+        donnees = super().get_json_data()
+        donnees["hybride"] = {
+            "phase": self.phase,
+            "statut": self.solver.StatusName(self.status) if self.status is not None else None,
+            "cout_local": self.cout_local,
+            "objectif_local": self.objectif_local,
+            "objectif": self.valeur_objectif,
+            "borne": self.borne_objectif,
+            "ecart": self.ecart_optimalite(),
+            "duree_locale": round(self.duree_locale, 3),
+            "duree_cpsat": round(self.duree_cpsat, 3),
+        }
+        return donnees
@@ -0,0 +1,215 @@
+"""
+Description : Lecture rapide des classeurs de répartitions et de disponibilités, commune aux deux planificateurs
+Licence : On devrait peut-être mettre une licence hein
+Anno : 43
+
+load_data lisait les fichiers avec pd.read_excel puis parcourait chaque ligne avec
+iterrows(), et pour chaque musicien chaque en-tête de colonne repassait dans la regex
+de transformer_simple. Sur un export Doodle de 60 musiciens x 200 créneaux, la lecture
+coûtait plus cher qu'une résolution courte. Ici :
+- le fichier est lu une fois, en flux, sans DataFrame (voir input_formats.py : xlsx lu
+  directement dans son XML, mais aussi CSV, JSON et Parquet) ;
+- chaque texte de créneau passe une seule fois dans la regex (slot.depuis_entete, mémoïsé) ;
+- les réponses sont normalisées d'un coup sur toute la matrice musiciens x créneaux
+  (numpy.char : strip, lower), puis les dicts de disponibilités en sont tirés ligne par ligne.
+Les règles sont celles de l'ancien load_data, formats "Nom" (ancien) et cally (email en
+colonne 2) compris. Deux différences : une ligne sans nom dans l'ancien format est
+ignorée (elle donnait un musicien "Nan"), et une cellule vide ou absente compte comme
+manquante ("" et None, là où pandas reconnaissait aussi "NA", "null"...).
+"""
+from typing import Dict, List, Sequence, Set, Tuple
+
+import numpy as np
+
+from input_formats import lire_tableau
+from slot import JOURS_ENTETE, Slot, depuis_entete
+
+# Colonnes avant les instruments (répartitions) et avant les créneaux (disponibilités)
+COLONNES_INFOS_MORCEAU = 6
+COLONNES_INFOS_MUSICIEN = 2
+# Lignes d'en-tête du format cally, sous la ligne de titres
+LIGNES_ENTETE_CALLY = 4
+
+
+def manquant(valeur) -> bool:
+    return valeur is None or valeur == ""
+
+
+def lire_feuille(chemin: str) -> Tuple[List, List[tuple]]:
+    """Tableau du fichier (xlsx, CSV, JSON, Parquet...) : (en-têtes, lignes de valeurs), toutes de la même largeur."""
+    lignes = lire_tableau(chemin)
+    if not lignes:
+        return [], []
+    largeur = max(len(ligne) for ligne in lignes)
+    lignes = [tuple(ligne) + (None,) * (largeur - len(ligne)) for ligne in lignes]
+    # comme pandas : les lignes vides à la fin ne comptent pas
+    while len(lignes) > 1 and all(manquant(v) for v in lignes[-1]):
+        lignes.pop()
+    return list(lignes[0]), lignes[1:]
+
+
+def normaliser(bloc: Sequence[Sequence], defaut: str) -> np.ndarray:
+    """Matrice de cellules -> matrice de chaînes strip().lower(), `defaut` pour les cellules vides."""
+    cellules = np.empty((len(bloc), len(bloc[0]) if bloc else 0), dtype=object)
+    cellules[:] = bloc
+    vides = (cellules == None) | (cellules == "")  # noqa: E711 (comparaison élément par élément)
+    textes = np.char.lower(np.char.strip(cellules.astype(str)))
+    return np.where(vides, defaut, textes)
+
+
+def lire_lignes_repartitions(chemin: str, vides: bool = False) -> List[Tuple[str, List[str]]]:
+    """
+    (morceau, musiciens notés dans l'ordre, répétitions comprises) par ligne ; un morceau
+    sans musicien est ignoré, sauf avec vides=True (liste de musiciens vide).
+    """
+    entetes, lignes = lire_feuille(chemin)
+    if "Titre" not in entetes:
+        raise KeyError("Titre")
+    i_titre = entetes.index("Titre")
+    resultat = []
+    for ligne in lignes:
+        morceau = ligne[i_titre]
+        cellules = [c for c in ligne[COLONNES_INFOS_MORCEAU:] if not manquant(c)]
+        if manquant(morceau) or not (cellules or vides):
+            continue
+        noms = [nom.strip() for cellule in cellules for nom in str(cellule).split(',')]
+        resultat.append((morceau, [nom for nom in noms if nom]))
+    return resultat
+
+
+def repartitions_depuis(lignes: List[Tuple[str, List[str]]]) -> Tuple[List[str], Dict[str, Set[str]], Dict[str, List[str]]]:
+    """(morceaux, morceau -> musiciens, musicien -> morceaux) ; un musicien noté deux fois compte deux fois."""
+    morceaux: List[str] = []
+    repartition: Dict[str, Set[str]] = {}
+    musicien_morceaux: Dict[str, List[str]] = {}
+    for morceau, noms in lignes:
+        morceaux.append(morceau)
+        repartition[morceau] = set(noms)
+        for nom in noms:
+            musicien_morceaux.setdefault(nom, []).append(morceau)
+    return morceaux, repartition, musicien_morceaux
+
+
+def lire_repartitions(chemin: str) -> Tuple[List[str], Dict[str, Set[str]], Dict[str, List[str]]]:
+    return repartitions_depuis(lire_lignes_repartitions(chemin))
+
+
+def _lire_format_nom(entetes: List, lignes: List[tuple]) -> Dict:
+    """Ancien format : colonne "Nom", un créneau par en-tête, réponses gardées telles quelles (en minuscules)."""
+    i_nom = entetes.index("Nom")
+    colonnes, creneaux = [], []
+    for j, entete in enumerate(entetes[COLONNES_INFOS_MUSICIEN:], start=COLONNES_INFOS_MUSICIEN):
+        creneau = depuis_entete(str(entete)) if not manquant(entete) else None
+        if creneau:
+            colonnes.append(j)
+            creneaux.append(creneau)
+
+    lignes = [ligne for ligne in lignes if not manquant(ligne[i_nom]) and str(ligne[i_nom]).strip()]
+    noms = [str(ligne[i_nom]).strip().title() for ligne in lignes]
+    reponses = normaliser([[ligne[j] for j in colonnes] for ligne in lignes], "no")
+    return {"format": "nom", "creneaux": list(dict.fromkeys(creneaux)), "musiciens": set(),
+            "noms": noms, "colonnes": creneaux, "reponses": reponses}
+
+
+def creneaux_cally(lignes: List[tuple]) -> Tuple[List[Slot], List[str]]:
+    """Cellules qui annoncent un créneau (un "lun." dedans...) : (créneaux lus, textes illisibles)."""
+    creneaux, illisibles = [], []
+    for ligne in lignes:
+        for cellule in ligne[COLONNES_INFOS_MUSICIEN:]:
+            if manquant(cellule):
+                continue
+            texte = str(cellule)
+            if any(jour in texte for jour in JOURS_ENTETE):
+                creneau = depuis_entete(texte.replace('\n', ' ').replace('[93%]', '').strip())
+                if creneau:
+                    creneaux.append(creneau)
+                else:
+                    illisibles.append(texte)
+    return creneaux, illisibles
+
+
+def _lire_format_cally(lignes: List[tuple]) -> Dict:
+    """Format cally : créneaux dans les premières lignes, une ligne par musicien (email en colonne 2)."""
+    creneaux, _ = creneaux_cally(lignes)
+
+    lignes_musiciens, noms = [], []
+    for ligne in lignes[LIGNES_ENTETE_CALLY:]:
+        if len(ligne) < 2 or manquant(ligne[1]) or '@' not in str(ligne[1]):
+            continue
+        nom = str(ligne[0]).strip().title() if not manquant(ligne[0]) else ""
+        if nom and nom != 'Nan':
+            noms.append(nom)
+            lignes_musiciens.append(ligne)
+
+    # la n-ième colonne de réponses va au n-ième créneau lu, comme avant
+    largeur = len(lignes[0]) - COLONNES_INFOS_MUSICIEN if lignes else 0
+    n = max(0, min(largeur, len(creneaux)))
+    bloc = normaliser([ligne[COLONNES_INFOS_MUSICIEN:COLONNES_INFOS_MUSICIEN + n] for ligne in lignes_musiciens], "no")
+    reponses = np.where(np.isin(bloc, ("yes", "oui")), "yes",
+                        np.where(np.isin(bloc, ("maybe", "peut-être")), "maybe", "no"))
+    return {"format": "cally", "creneaux": creneaux, "musiciens": set(noms),
+            "noms": noms, "colonnes": creneaux[:n], "reponses": reponses}
+
+
+def lire_disponibilites(chemin: str) -> Dict:
+    """
+    Disponibilités des deux formats :
+    - "format" : "nom" ou "cally" ;
+    - "creneaux" : créneaux dans l'ordre de lecture (pas encore triés) ;
+    - "musiciens" : musiciens déclarés par le fichier (format cally seulement, comme avant) ;
+    - "reponses" : matrice musiciens x colonnes normalisée, "noms" et "colonnes" ses libellés ;
+    - "disponibilites" : musicien -> {créneau: réponse}, ce qu'attendent les planificateurs.
+    """
+    entetes, lignes = lire_feuille(chemin)
+    donnees = _lire_format_nom(entetes, lignes) if "Nom" in entetes else _lire_format_cally(lignes)
+    donnees["disponibilites"] = disponibilites_depuis(donnees["noms"], donnees["colonnes"], donnees["reponses"])
+    return donnees
+
+
+def disponibilites_depuis(noms: List[str], colonnes: List[str], reponses: np.ndarray) -> Dict[str, Dict[str, str]]:
+    """Matrice de réponses -> musicien -> {créneau: réponse} (une colonne en double : la dernière gagne)."""
+    return {nom: dict(zip(colonnes, ligne)) for nom, ligne in zip(noms, reponses.tolist())}
+
+
+def charger(scheduler, cache=None) -> str:
+    """
+    Partie lecture de load_data, la même pour les deux planificateurs : remplit morceaux,
+    repartition, musiciens, _musicien_morceaux, disponibilites et (format cally) creneaux.
+    Renvoie le format des disponibilités ; le tri des créneaux et le calendrier restent
+    dans load_data.
+    cache : ParseCache (voir parse_cache.py) ; un fichier déjà vu n'est pas relu.
+    """
+    lire_r = cache.repartitions if cache is not None else lire_repartitions
+    lire_d = cache.disponibilites if cache is not None else lire_disponibilites
+    if getattr(scheduler, 'repartitions_file', None):
+        morceaux, repartition, musicien_morceaux = lire_r(scheduler.repartitions_file)
+        scheduler.morceaux.extend(morceaux)
+        scheduler.repartition.update(repartition)
+        for nom, liste in musicien_morceaux.items():
+            scheduler.musiciens.add(nom)
+            scheduler._musicien_morceaux[nom].extend(liste)
+
+    donnees = lire_d(scheduler.disponibilites_file)
+    scheduler.disponibilites.update(donnees["disponibilites"])
+    if donnees["format"] == "cally":
+        scheduler.creneaux.extend(donnees["creneaux"])
+        scheduler.musiciens |= donnees["musiciens"]
+        # pas de morceaux : un seul "morceau" avec tout le monde
+        if not scheduler.morceaux and scheduler.musiciens:
+            morceau_default = "Session_Planning"
+            scheduler.morceaux.append(morceau_default)
+            scheduler.repartition[morceau_default] = scheduler.musiciens.copy()
+            for musicien in scheduler.musiciens:
+                scheduler._musicien_morceaux[musicien].append(morceau_default)
+    return donnees["format"]
+
+
+if __name__ == "__main__":
+    import sys
+    import time
+
+    for chemin in sys.argv[1:]:
+        debut = time.time()
+        donnees = lire_disponibilites(chemin)
+        print(f"{chemin} : format {donnees['format']}, {len(donnees['disponibilites'])} musiciens x "
+              f"{len(donnees['creneaux'])} créneaux en {time.time() - debut:.3f}s")
@@ -0,0 +1,242 @@
+"""
+Description : Lecture des tableaux d'entrée quel que soit leur format (xlsx, xls, CSV, JSON, Parquet)
+Licence : On devrait peut-être mettre une licence hein
+Anno : 43
+
+Chaque lecteur renvoie les lignes du tableau (la première = les en-têtes), comme une
+feuille Excel : ingestion.py applique ensuite les mêmes règles quel que soit le format.
+Le format est reconnu au contenu (octets magiques), pas à l'extension : les fichiers
+envoyés à /api/upload sont enregistrés sous leur nom d'origine, quel qu'il soit.
+- xlsx (zip "PK") : XML de la première feuille parcouru directement (zipfile + iterparse,
+  façon calamine, environ 4x plus rapide qu'openpyxl même en read_only, qui crée un objet
+  par cellule). Les dates y restent des nombres (numéros de série Excel) : aucune colonne
+  lue ici n'en contient. Si le classeur n'a pas la structure attendue, openpyxl read_only ;
+- xls (OLE2) : pd.read_excel, comme avant (il faut xlrd) ;
+- Parquet ("PAR1") : pd.read_parquet (pyarrow, dans requirements.txt) ;
+- JSON (commence par "[" ou "{") : liste d'objets (une ligne par objet, colonnes dans
+  l'ordre d'apparition des clés) ou liste de listes (en-têtes d'abord). Les
+  disponibilités au format de get_json_data() ({"SEMAINE_1": [{"Jour": "Lundi 04",
+  "Heures": "16:00-18:00", "Alice": "yes", ...}]}, ou la réponse complète de /api/upload)
+  sont retournées en tableau "Nom" : une ligne par musicien, une colonne par créneau ;
+- sinon CSV, séparateur deviné parmi , ; et tabulation, UTF-8 (ou cp1252 à défaut).
+lire_tableau(chemin, max_lignes) ne lit que le début du tableau : xlsx et CSV s'arrêtent
+de lire le fichier après max_lignes lignes (voir upload_validation.py).
+"""
+import csv
+import io
+import json
+import zipfile
+import xml.etree.ElementTree as ET
+from itertools import islice
+from typing import Callable, Dict, List, Optional
+
+import pandas as pd
+from openpyxl import load_workbook
+
+from warm_start import creneau_depuis_planning
+
+NS = "{http://schemas.openxmlformats.org/spreadsheetml/2006/main}"
+NS_ID = "{http://schemas.openxmlformats.org/officeDocument/2006/relationships}id"
+
+# Débuts de fichier reconnus ; le reste est JSON ou CSV (voir detecter_format)
+SIGNATURES = [
+    (b"PK\x03\x04", "xlsx"),
+    (b"\xd0\xcf\x11\xe0", "xls"),
+    (b"PAR1", "parquet"),
+]
+
+
+def detecter_format(chemin: str) -> str:
+    with open(chemin, "rb") as f:
+        debut = f.read(4096)
+    for signature, nom in SIGNATURES:
+        if debut.startswith(signature):
+            return nom
+    texte = debut.lstrip(b"\xef\xbb\xbf \t\r\n")
+    return "json" if texte[:1] in (b"[", b"{") else "csv"
+
+
+# --- xlsx ---
+
+def _colonne(reference: str) -> int:
+    """"AB12" -> 27 (colonnes comptées depuis 0)."""
+    n = 0
+    for lettre in reference:
+        if not lettre.isalpha():
+            break
+        n = n * 26 + ord(lettre.upper()) - 64
+    return n - 1
+
+
+def _texte(element) -> str:
+    """Texte d'une chaîne partagée ou en ligne, morceaux de texte enrichi compris (sans la phonétique)."""
+    morceaux = [element.find(NS + "t")] + [r.find(NS + "t") for r in element.findall(NS + "r")]
+    return "".join(t.text or "" for t in morceaux if t is not None)
+
+
+def _premiere_feuille(archive: zipfile.ZipFile) -> str:
+    """Chemin dans l'archive de la première feuille (celle que lisait pd.read_excel)."""
+    classeur = ET.fromstring(archive.read("xl/workbook.xml"))
+    feuille = classeur.find(f"{NS}sheets/{NS}sheet")
+    if feuille is None:
+        raise KeyError("sheet")
+    identifiant = feuille.get(NS_ID)
+    for relation in ET.fromstring(archive.read("xl/_rels/workbook.xml.rels")):
+        if relation.get("Id") == identifiant:
+            cible = relation.get("Target")
+            return cible.lstrip("/") if cible.startswith("/") else f"xl/{cible}"
+    raise KeyError(identifiant)
+
+
+def _lire_xml(chemin: str, max_lignes: Optional[int] = None) -> List[tuple]:
+    """Lignes de la première feuille, en parcourant son XML élément par élément (les max_lignes premières)."""
+    with zipfile.ZipFile(chemin) as archive:
+        partagees = []
+        if "xl/sharedStrings.xml" in archive.namelist():
+            for _, element in ET.iterparse(archive.open("xl/sharedStrings.xml")):
+                if element.tag == NS + "si":
+                    partagees.append(_texte(element))
+                    element.clear()
+
+        lignes, cellules = [], {}
+        for _, element in ET.iterparse(archive.open(_premiere_feuille(archive))):
+            if element.tag == NS + "c":
+                type_cellule, valeur = element.get("t"), element.find(NS + "v")
+                if type_cellule == "inlineStr":
+                    en_ligne = element.find(NS + "is")
+                    contenu = _texte(en_ligne) if en_ligne is not None else None
+                elif valeur is None or valeur.text is None:
+                    contenu = None
+                elif type_cellule == "s":
+                    contenu = partagees[int(valeur.text)]
+                elif type_cellule == "b":
+                    contenu = valeur.text == "1"
+                elif type_cellule in ("str", "e"):
+                    contenu = valeur.text
+                elif any(c in valeur.text for c in ".eE"):
+                    contenu = float(valeur.text)
+                else:
+                    contenu = int(valeur.text)
+                reference = element.get("r")
+                cellules[_colonne(reference) if reference else len(cellules)] = contenu
+            elif element.tag == NS + "row":
+                # lignes absentes du XML (vides) : on les remet pour garder les numéros de ligne
+                numero = int(element.get("r", len(lignes) + 1))
+                lignes.extend(() for _ in range(numero - 1 - len(lignes)))
+                largeur = max(cellules) + 1 if cellules else 0
+                lignes.append(tuple(cellules.get(j) for j in range(largeur)))
+                cellules = {}
+                element.clear()
+                if max_lignes is not None and len(lignes) >= max_lignes:
+                    break
+    return lignes[:max_lignes]
+
+
+def _lire_openpyxl(chemin: str, max_lignes: Optional[int] = None) -> List[tuple]:
+    classeur = load_workbook(chemin, read_only=True, data_only=True)
+    try:
+        feuille = classeur.worksheets[0]
+        # certains exports n'ont pas de dimensions fiables : on laisse openpyxl les recalculer
+        feuille.reset_dimensions()
+        return list(islice(feuille.iter_rows(values_only=True), max_lignes))
+    finally:
+        classeur.close()
+
+
+def _lire_xlsx(chemin: str, max_lignes: Optional[int] = None) -> List[tuple]:
+    try:
+        return _lire_xml(chemin, max_lignes)
+    except (KeyError, ET.ParseError):
+        return _lire_openpyxl(chemin, max_lignes)
+
+
+# --- Autres formats ---
+
+def _lignes_depuis_dataframe(df: pd.DataFrame) -> List[tuple]:
+    valeurs = df.astype(object).where(df.notna(), None)
+    return [tuple(df.columns)] + list(valeurs.itertuples(index=False, name=None))
+
+
+def _lire_xls(chemin: str) -> List[tuple]:
+    return _lignes_depuis_dataframe(pd.read_excel(chemin))
+
+
+def _lire_parquet(chemin: str) -> List[tuple]:
+    return _lignes_depuis_dataframe(pd.read_parquet(chemin))
+
+
+def _lire_csv(chemin: str, max_lignes: Optional[int] = None) -> List[tuple]:
+    with open(chemin, "rb") as f:
+        octets = f.read()
+    try:
+        texte = octets.decode("utf-8-sig")
+    except UnicodeDecodeError:
+        texte = octets.decode("cp1252")
+    try:
+        dialecte = csv.Sniffer().sniff(texte[:8192], delimiters=",;\t")
+    except csv.Error:
+        dialecte = csv.excel
+    lecteur = islice(csv.reader(io.StringIO(texte), dialecte), max_lignes)
+    return [tuple(v if v != "" else None for v in ligne) for ligne in lecteur]
+
+
+def _semaines_disponibilites(donnees) -> List[Dict]:
+    """Lignes créneau par créneau si c'est la sortie "disponibilites" de get_json_data(), [] sinon."""
+    if isinstance(donnees, dict) and isinstance(donnees.get("disponibilites"), dict):
+        donnees = donnees["disponibilites"]
+    if isinstance(donnees, dict):
+        donnees = [ligne for lignes in donnees.values() if isinstance(lignes, list) for ligne in lignes]
+    if isinstance(donnees, list) and donnees and all(isinstance(l, dict) and "Jour" in l and "Heures" in l
+                                                     for l in donnees):
+        return donnees
+    return []
+
+
+def _tableau_nom(lignes_creneaux: List[Dict]) -> List[tuple]:
+    """Créneaux en lignes -> tableau "Nom" (musiciens en lignes), en-têtes lisibles par slot.depuis_entete."""
+    colonnes, musiciens = [], {}
+    for ligne in lignes_creneaux:
+        creneau = creneau_depuis_planning(ligne["Jour"], ligne["Heures"])
+        if creneau is None:
+            continue
+        colonnes.append(f"{creneau.jour.lower()}. {creneau.numero:02d} {creneau.heures}")
+        for musicien, reponse in ligne.items():
+            if musicien not in ("Jour", "Heures"):
+                musiciens.setdefault(musicien, {})[len(colonnes) - 1] = reponse
+    return [("Nom", "Email", *colonnes)] + [(musicien, None, *(reponses.get(j) for j in range(len(colonnes))))
+                                          for musicien, reponses in musiciens.items()]
+
+
+def _lire_json(chemin: str) -> List[tuple]:
+    with open(chemin, encoding="utf-8-sig") as f:
+        donnees = json.load(f)
+    lignes_creneaux = _semaines_disponibilites(donnees)
+    if lignes_creneaux:
+        return _tableau_nom(lignes_creneaux)
+    if not isinstance(donnees, list):
+        raise ValueError("JSON attendu : liste d'objets, liste de listes ou disponibilités de get_json_data()")
+    if donnees and all(isinstance(ligne, list) for ligne in donnees):
+        return [tuple(ligne) for ligne in donnees]
+    entetes = list(dict.fromkeys(cle for ligne in donnees for cle in ligne))
+    return [tuple(entetes)] + [tuple(ligne.get(cle) for cle in entetes) for ligne in donnees]
+
+
+LECTEURS: Dict[str, Callable[[str], List[tuple]]] = {
+    "xlsx": _lire_xlsx,
+    "xls": _lire_xls,
+    "parquet": _lire_parquet,
+    "json": _lire_json,
+    "csv": _lire_csv,
+}
+
+
+# lecteurs qui savent s'arrêter après max_lignes lignes ; les autres lisent tout
+LECTEURS_PARTIELS = {"xlsx": _lire_xlsx, "csv": _lire_csv}
+
+
+def lire_tableau(chemin: str, max_lignes: Optional[int] = None) -> List[tuple]:
+    """Lignes du tableau (en-têtes d'abord), quel que soit le format du fichier ; les max_lignes premières."""
+    format_fichier = detecter_format(chemin)
+    if max_lignes is not None and format_fichier in LECTEURS_PARTIELS:
+        return LECTEURS_PARTIELS[format_fichier](chemin, max_lignes)
+    return LECTEURS[format_fichier](chemin)[:max_lignes]
@@ -0,0 +1,121 @@
+"""
+Description : Mode lexicographique : les critères un par un, du plus important au moins important
+Licence : On devrait peut-être mettre une licence hein
+Anno : 43
+
+Le mode normal minimise une somme pondérée : 1000 par morceau non assigné, 5000 x T en
+mode "auto", plus les absences, "peut-être", surcharges et groupements. Les gros poids
+ne servent qu'à imposer un ordre entre critères, et ils affaiblissent la propagation et
+les bornes de CP-SAT. Ici, on résout plusieurs fois le même modèle, chaque fois avec
+un seul critère sans poids :
+1. "non_assignes" : nombre de morceaux non assignés (on maximise les assignés) ;
+2. "plafond" (mode "auto" seulement) : T, le nombre max d'absents sur un créneau ;
+3. "absences" : total des musiciens absents forcés ;
+4. "peut_etre" : total des "peut-être" ;
+5. "charge_groupes" : load_penalty x surcharges - group_bonus x répétitions groupées.
+Après chaque étape, sa valeur devient une contrainte (critère <= valeur trouvée) et la
+solution devient l'indice complet de l'étape suivante, qui part donc d'elle. Le budget
+restant est partagé entre les étapes restantes : une étape prouvée optimale tôt laisse
+son temps aux suivantes. Une étape sans solution dans son temps garde la précédente.
+Le résultat est le vecteur des valeurs (ordre lexicographique) et la durée de chaque
+étape ; valeur_objectif reste l'objectif pondéré, pour comparer avec les autres modes.
+"""
+import time
+from typing import Dict, List, Optional, Tuple
+
+from ortools.sat.python import cp_model
+
+from scheduler_repetition import RepetitionScheduler
+
+
+class LexicographicScheduler(RepetitionScheduler):
+    def __init__(self, *args, **kwargs):
+        """Mêmes paramètres que RepetitionScheduler ; generation_time_limit couvre toutes les étapes."""
+        super().__init__(*args, **kwargs)
+        self.etapes: List[Dict] = []
+        self.valeurs_lex: Tuple[int, ...] = ()
+
+    def criteres(self) -> List[Tuple[str, object]]:
+        """Critères (nom, expression linéaire) dans l'ordre ; ceux qui ne dépendent de rien sont sautés."""
+        P = self.probleme
+        absents, maybes = P.comptes_disponibilites()
+        criteres = [("non_assignes", sum(self.non_assigne))]
+        if self.T is not None:
+            criteres.append(("plafond", self.T))
+        criteres.append(("absences", sum(int(absents[p, s]) * x for p, ligne in enumerate(self.x)
+                                         for s, x in ligne.items() if absents[p, s])))
+        criteres.append(("peut_etre", sum(int(maybes[p, s]) * x for p, ligne in enumerate(self.x)
+                                          for s, x in ligne.items() if maybes[p, s])))
+        criteres.append(("charge_groupes", self.load_penalty * sum(self.surcharges)
+                         - self.group_bonus * sum(self.blocs)))
+        return [(nom, expr) for nom, expr in criteres if not isinstance(expr, int)]
+
+    def _indices_depuis(self, solver):
+        """La solution de l'étape devient l'indice complet de la suivante."""
+        self.model.ClearHints()
+        for i in range(len(self.model.Proto().variables)):
+            var = self.model.GetIntVarFromProtoIndex(i)
+            self.model.AddHint(var, solver.Value(var))
+
+    def solve(self, temps_max: Optional[float] = None):
+        debut = time.time()
+        deadline = debut + (temps_max or self.generation_time_limit)
+        self.musiciens_absents_force.clear()
+        self.valeur_objectif = self.borne_objectif = None
+        self.build_model()
+        stats = self.statistiques_modele()
+        print(f"🧮 Modèle : {stats['variables']} variables, {stats['contraintes']} contraintes "
+              f"(construit en {stats['temps_construction']:.2f}s)")
+
+        criteres = self.criteres()
+        self.etapes = []
+        assignation, meilleur, status = None, None, cp_model.UNKNOWN
+        for i, (nom, expr) in enumerate(criteres):
+            temps = max(1.0, (deadline - time.time()) / (len(criteres) - i))
+            self.model.Minimize(expr)
+            self.solver = cp_model.CpSolver()
+            self.configurer_solveur(self.solver, temps)
+            debut_etape = time.time()
+            status = self._solve_anytime() if self._stream is not None else self.solver.Solve(self.model)
+            etape = {"critere": nom, "statut": self.solver.StatusName(status), "valeur": None, "borne": None,
+                     "duree": round(time.time() - debut_etape, 3)}
+            self.etapes.append(etape)
+
+            if status in (cp_model.OPTIMAL, cp_model.FEASIBLE):
+                valeur = int(self.solver.Value(expr))
+                etape["valeur"] = valeur
+                etape["borne"] = int(round(self.solver.BestObjectiveBound()))
+                assignation = self._lire_assignation(self.solver.BooleanValue)
+                meilleur = {"objectif": self.solver.Value(self.objectif),
+                            "penalite": sum(self.solver.Value(p) for p in self.penalties)}
+                # les étapes suivantes ne dégradent plus ce critère
+                self.model.Add(expr <= valeur)
+                self._indices_depuis(self.solver)
+            print(f"🥇 Étape {i + 1}/{len(criteres)} {nom} : {etape['valeur']} "
+                  f"(borne {etape['borne']}, {etape['statut']}) en {etape['duree']:.1f}s")
+            if self._stream is not None and self._stream.arret_demande():
+                break
+
+        self.valeurs_lex = tuple(e["valeur"] for e in self.etapes if e["valeur"] is not None)
+        if assignation is None:
+            self.status = status
+            print("⚠️ Aucune solution trouvée")
+            return status, self.solution, len(self.morceaux), 0
+
+        # optimum lexicographique prouvé seulement si chaque étape l'est
+        prouve = len(self.etapes) == len(criteres) and all(e["statut"] == "OPTIMAL" for e in self.etapes)
+        self.status = cp_model.OPTIMAL if prouve else cp_model.FEASIBLE
+        self.valeur_objectif = meilleur["objectif"]
+        num_unassigned = self._enregistrer_solution(assignation)
+        print(f"✅ {len(self.solution)} assignés, {num_unassigned} non-assignés, valeurs {self.valeurs_lex} "
+              f"(objectif pondéré {self.valeur_objectif}) en {time.time() - debut:.1f}s")
+        return self.status, self.solution, num_unassigned, meilleur["penalite"]
+
+    def get_json_data(self):
+        donnees = super().get_json_data()
+        donnees["lexicographique"] = {
+            "etapes": self.etapes,
+            "valeurs": list(self.valeurs_lex),
+            "objectif": self.valeur_objectif,
+        }
+        return donnees
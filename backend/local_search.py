@@ -0,0 +1,192 @@
+"""
+Description : Moteurs de recherche locale interchangeables pour OptimizedRepetitionScheduler
+Licence : On devrait peut-être mettre une licence hein
+Anno : 43
+
+Tous les moteurs utilisent le même modèle de coût (DeltaCostEngine via le planificateur) :
+- min_conflicts : l'algorithme historique (meilleur créneau pour un des 3 morceaux les plus en conflit)
+- tabu          : recherche tabou sur les mouvements (morceau, créneau), avec aspiration
+- annealing     : recuit simulé, mouvements aléatoires acceptés selon la température
+
+Le coût d'un mouvement est celui du morceau à sa nouvelle place (comme min-conflicts),
+"non assigné" coûtant COUT_NON_ASSIGNE. Les mouvements composés (planner._voisinages,
+voir neighbourhoods.py) sont jugés sur la variation du coût total.
+"""
+import math
+import random
+from typing import Dict, Optional
+
+COUT_NON_ASSIGNE = 500
+
+
+class LocalSearchEngine:
+    nom = "base"
+
+    def __init__(self, planner, rng: random.Random):
+        self.planner = planner
+        self.rng = rng
+
+    def demarrer(self):
+        """Appelé au début de chaque restart, après la construction de l'assignation."""
+
+    def step(self) -> bool:
+        """Une itération. Retourne True si l'assignation courante n'a plus aucun conflit."""
+        raise NotImplementedError
+
+    def _choisir_morceau_conflit(self, top: int = 3) -> Optional[str]:
+        figes = self.planner.morceaux_figes
+        morceaux_conflits = [(m, c) for m, c in self.planner.conflicts.items() if c > 0 and m not in figes]
+        if not morceaux_conflits:
+            return None
+        morceaux_conflits.sort(key=lambda x: x[1], reverse=True)
+        return self.rng.choice([m for m, _ in morceaux_conflits[:top]])
+
+    def _cout_actuel(self, morceau: str) -> int:
+        creneau = self.planner.assignment[morceau]
+        return self.planner.conflicts[morceau] if creneau else COUT_NON_ASSIGNE
+
+
+class MinConflictsEngine(LocalSearchEngine):
+    nom = "min_conflicts"
+
+    def step(self) -> bool:
+        return self.planner.min_conflicts_step()
+
+
+class TabuSearchEngine(LocalSearchEngine):
+    """
+    À chaque itération, on prend un morceau parmi les plus en conflit et on applique le
+    meilleur mouvement non tabou, même s'il dégrade : c'est ce qui permet de quitter les
+    plateaux où min-conflicts tourne en rond. Revenir sur l'ancien créneau est interdit
+    pendant `tenure` itérations, sauf si le mouvement donne un meilleur coût que tout ce
+    qu'on a vu (aspiration).
+    """
+    nom = "tabu"
+
+    def __init__(self, planner, rng, tenure: int = 10, top: int = 3):
+        super().__init__(planner, rng)
+        self.tenure = tenure
+        self.top = top
+
+    def demarrer(self):
+        self.iteration = 0
+        self.tabou: Dict[tuple, int] = {}  # (morceau, creneau) -> itération de fin d'interdiction
+        self.meilleur_cout = self.planner._cout_courant()
+
+    def step(self) -> bool:
+        planner = self.planner
+        morceau = self._choisir_morceau_conflit(self.top)
+        if morceau is None:
+            return True
+
+        self.iteration += 1
+        actuel = planner.assignment[morceau]
+        cout_actuel = self._cout_actuel(morceau)
+        total = planner._cout_courant()
+
+        couts = planner._delta.couts_morceau(morceau) if planner.creneaux else []
+        options = [(int(c), creneau) for c, creneau in zip(couts, planner.creneaux)]
+        options.append((COUT_NON_ASSIGNE, None))
+        options.sort(key=lambda o: o[0])
+
+        admissibles = [creneau for cout, creneau in options
+                       if creneau != actuel and (
+                           self.tabou.get((morceau, creneau), 0) <= self.iteration
+                           or total - cout_actuel + cout < self.meilleur_cout)]
+        if not admissibles:
+            return False
+        choix = admissibles[0]
+
+        # Quand le meilleur mouvement simple ne fait pas baisser le coût total, un mouvement
+        # composé qui le fait passe avant (c'est toujours mieux que tout ce qui a été vu
+        # depuis ce point, donc pas de test tabou) ; pas évalués sinon, ils coûtent cher
+        if planner._voisinages:
+            delta_simple = planner._voisinages.evaluateur.evaluer([(morceau, choix)])
+            delta_compose, mouvement = 0, None
+            if delta_simple >= 0:
+                delta_compose, mouvement = planner._voisinages.meilleur(self.rng, morceau)
+            if mouvement and delta_compose < 0:
+                if delta_compose < delta_simple:
+                    for m, _ in mouvement:
+                        self.tabou[(m, planner.assignment[m])] = self.iteration + self.tenure
+                    planner._voisinages.evaluateur.appliquer(mouvement)
+                    self.meilleur_cout = min(self.meilleur_cout, planner._cout_courant())
+                    return False
+
+        self.tabou[(morceau, actuel)] = self.iteration + self.tenure
+        touches = planner._delta.deplacer(morceau, choix)
+        planner._update_conflicts(touches)
+        self.meilleur_cout = min(self.meilleur_cout, planner._cout_courant())
+        return False
+
+
+class SimulatedAnnealingEngine(LocalSearchEngine):
+    """
+    Morceau tiré au hasard (un des plus en conflit une fois sur deux), créneau tiré au
+    hasard ; un mouvement qui dégrade de delta est accepté avec probabilité exp(-delta / T).
+    T part de t0 et est multiplié par `refroidissement` à chaque itération.
+    """
+    nom = "annealing"
+
+    def __init__(self, planner, rng, t0: float = 200.0, refroidissement: float = 0.999,
+                 t_min: float = 1.0, part_composes: float = 0.2):
+        super().__init__(planner, rng)
+        self.t0 = t0
+        self.refroidissement = refroidissement
+        self.t_min = t_min
+        self.part_composes = part_composes
+
+    def demarrer(self):
+        self.temperature = self.t0
+
+    def step(self) -> bool:
+        planner = self.planner
+        if not any(c > 0 for c in planner.conflicts.values()):
+            return True
+        if not planner.morceaux_mobiles:
+            # tout est figé (sous-problème de l'horizon glissant) : rien ne peut bouger, comme min-conflicts
+            return True
+
+        morceau = self._choisir_morceau_conflit() if self.rng.random() < 0.5 else None
+        if morceau is None:  # tirage au hasard, ou seuls des morceaux figés sont en conflit
+            morceau = self.rng.choice(planner.morceaux_mobiles)
+        if planner._voisinages and self.rng.random() < self.part_composes:
+            self._step_compose(morceau)
+            self.temperature = max(self.t_min, self.temperature * self.refroidissement)
+            return False
+
+        creneau = self.rng.choice(planner.creneaux + [None])
+        if creneau == planner.assignment[morceau]:
+            return False
+
+        nouveau = planner.calculate_conflicts(morceau, creneau) if creneau else COUT_NON_ASSIGNE
+        delta = nouveau - self._cout_actuel(morceau)
+        if delta <= 0 or self.rng.random() < math.exp(-delta / self.temperature):
+            touches = planner._delta.deplacer(morceau, creneau)
+            planner._update_conflicts(touches)
+
+        self.temperature = max(self.t_min, self.temperature * self.refroidissement)
+        return False
+
+    def _step_compose(self, morceau: str):
+        """Un mouvement composé tiré au hasard, accepté sur la variation du coût total."""
+        voisinages = self.planner._voisinages
+        mouvements = voisinages.proposer(self.rng, morceau)
+        if not mouvements:
+            return
+        delta, annulation = voisinages.evaluateur.appliquer(self.rng.choice(mouvements))
+        if delta > 0 and self.rng.random() >= math.exp(-delta / self.temperature):
+            voisinages.evaluateur.annuler(annulation)
+
+
+MOTEURS = {
+    MinConflictsEngine.nom: MinConflictsEngine,
+    TabuSearchEngine.nom: TabuSearchEngine,
+    SimulatedAnnealingEngine.nom: SimulatedAnnealingEngine,
+}
+
+
+def creer_moteur(nom: str, planner, rng: random.Random, **options) -> LocalSearchEngine:
+    if nom not in MOTEURS:
+        raise ValueError(f"Moteur de recherche inconnu : {nom} (choix : {', '.join(MOTEURS)})")
+    return MOTEURS[nom](planner, rng, **options)
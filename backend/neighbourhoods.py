@@ -0,0 +1,277 @@
+"""
+Description : Voisinages composés pour la recherche locale (échange, chaîne d'éjection, bloc de jour)
+Licence : On devrait peut-être mettre une licence hein
+Anno : 43
+
+Le seul mouvement historique est "un morceau vers un autre créneau (ou None)". Quand
+le planning est dense, presque tous les créneaux sont pris et ce mouvement se prend
+la pénalité de collision : deux morceaux qui devraient simplement échanger leurs
+créneaux ne le font jamais. Ici un mouvement est une liste de (morceau, créneau ou None)
+appliquée dans l'ordre :
+- swap  : deux morceaux échangent leurs créneaux
+- chain : chaîne d'éjection, le morceau prend un créneau occupé, l'occupant part
+          sur son meilleur créneau, etc. (le dernier maillon peut finir non assigné)
+- day   : tout le contenu de deux jours du calendrier est échangé, créneau par créneau
+
+EvaluateurMouvements donne la variation exacte du coût total (_cout_courant) en ne
+recalculant que les morceaux renvoyés par DeltaCostEngine.deplacer.
+"""
+import random
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from delta_cost import PENALITE_COLLISION
+
+Mouvement = List[Tuple[str, Optional[str]]]
+
+# Coût d'un morceau non assigné dans le coût total (voir _calculate_total_cost)
+COUT_NON_ASSIGNE_TOTAL = 1000
+
+
+class EvaluateurMouvements:
+    def __init__(self, planner):
+        self.planner = planner
+
+    def appliquer(self, mouvement: Mouvement) -> Tuple[int, tuple]:
+        """
+        Applique le mouvement, met self.conflicts à jour pour les morceaux touchés et
+        renvoie (variation du coût total, de quoi annuler).
+        """
+        planner = self.planner
+        retour = []
+        origine: Dict[str, Optional[str]] = {}
+        touches = set()
+        for morceau, creneau in mouvement:
+            ancien = planner.assignment[morceau]
+            origine.setdefault(morceau, ancien)
+            retour.append((morceau, ancien))
+            touches |= planner._delta.deplacer(morceau, creneau)
+
+        sauvegarde = {m: planner.conflicts[m] for m in touches}
+        avant = sum(sauvegarde[m] if origine.get(m, planner.assignment[m]) else COUT_NON_ASSIGNE_TOTAL
+                    for m in touches)
+        planner._update_conflicts(touches)
+        apres = sum(planner.conflicts[m] if planner.assignment[m] else COUT_NON_ASSIGNE_TOTAL
+                    for m in touches)
+        return apres - avant, (retour[::-1], sauvegarde)
+
+    def annuler(self, annulation: tuple):
+        retour, sauvegarde = annulation
+        for morceau, creneau in retour:
+            self.planner._delta.deplacer(morceau, creneau)
+        self.planner.conflicts.update(sauvegarde)
+
+    def evaluer(self, mouvement: Mouvement) -> int:
+        """Variation du coût total si on appliquait le mouvement (l'état est restauré)."""
+        delta, annulation = self.appliquer(mouvement)
+        self.annuler(annulation)
+        return delta
+
+
+class Voisinage:
+    nom = "base"
+
+    def proposer(self, planner, rng: random.Random, morceau: str) -> List[Mouvement]:
+        raise NotImplementedError
+
+    @staticmethod
+    def _creneaux_occupes_favoris(planner, morceau: str, k: int) -> List[int]:
+        """
+        Les k créneaux occupés (hors le sien) où le morceau serait le mieux côté
+        disponibilités, d'après couts_statiques : c'est là qu'un échange a des chances de payer.
+        """
+        P = planner.probleme
+        p = P.morceau_id[morceau]
+        actuel = planner._delta.position[p]
+        ordre = np.argsort(planner.couts_statiques[p], kind="stable")
+        occupes = planner._delta.occupation[ordre] > 0
+        return [int(c) for c in ordre[occupes] if c != actuel][:k]
+
+
+class EchangeVoisinage(Voisinage):
+    nom = "swap"
+
+    def __init__(self, candidats: int = 5):
+        self.candidats = candidats
+
+    def proposer(self, planner, rng, morceau):
+        P = planner.probleme
+        actuel = planner.assignment[morceau]
+        mouvements = []
+        for c in self._creneaux_occupes_favoris(planner, morceau, self.candidats):
+            for q in sorted(planner._delta.morceaux_par_creneau[c]):
+                mouvements.append([(morceau, P.creneaux[c]), (P.morceaux[q], actuel)])
+        return mouvements
+
+
+class ChaineVoisinage(Voisinage):
+    """
+    Le morceau prend un de ses créneaux favoris ; l'occupant éjecté va sur le créneau le
+    moins cher pour lui (collisions comprises, l'ancien créneau du morceau étant libéré),
+    et ainsi de suite sur au plus `longueur` maillons.
+    """
+    nom = "chain"
+
+    def __init__(self, candidats: int = 3, longueur: int = 3):
+        self.candidats = candidats
+        self.longueur = longueur
+
+    def proposer(self, planner, rng, morceau):
+        P = planner.probleme
+        delta = planner._delta
+        depart = delta.position[P.morceau_id[morceau]]
+        mouvements = []
+        for cible in self._creneaux_occupes_favoris(planner, morceau, self.candidats):
+            mouvement = [(morceau, P.creneaux[cible])]
+            pris = {cible}
+            ejectes = sorted(delta.morceaux_par_creneau[cible])
+            while ejectes:
+                q = ejectes.pop(0)
+                if len(mouvement) >= self.longueur:
+                    mouvement.append((P.morceaux[q], None))
+                    continue
+                couts = delta.couts_morceau(P.morceaux[q]).astype(np.float64)
+                if depart >= 0 and depart not in pris:
+                    couts[depart] = max(0, couts[depart] - PENALITE_COLLISION)
+                couts[list(pris)] = np.inf
+                c = int(couts.argmin())
+                if not np.isfinite(couts[c]):
+                    mouvement.append((P.morceaux[q], None))
+                    continue
+                mouvement.append((P.morceaux[q], P.creneaux[c]))
+                pris.add(c)
+                if c != depart:
+                    ejectes += sorted(delta.morceaux_par_creneau[c])
+            mouvements.append(mouvement)
+        return mouvements
+
+
+class BlocJourVoisinage(Voisinage):
+    """Échange le jour du morceau avec un autre jour qui a le même nombre de créneaux."""
+    nom = "day"
+
+    def __init__(self, candidats: int = 2):
+        self.candidats = candidats
+        self._blocs = None
+        self._creneaux = None
+
+    def _blocs_par_jour(self, planner) -> Dict[str, List[int]]:
+        # Un jour = une date du calendrier ("LUN_04"), créneaux dans l'ordre des heures
+        if self._blocs is None or self._creneaux is not planner.creneaux:
+            P = planner.probleme
+            self._blocs = {date: [P.creneau_id[c] for c in slots]
+                           for date, slots in planner.calendrier.creneaux_par_date.items()}
+            self._creneaux = planner.creneaux
+        return self._blocs
+
+    def proposer(self, planner, rng, morceau):
+        actuel = planner.assignment[morceau]
+        if not actuel:
+            return []
+        P = planner.probleme
+        blocs = self._blocs_par_jour(planner)
+        jour = planner.calendrier.date_de[actuel]
+        autres = [j for j, slots in blocs.items() if j != jour and len(slots) == len(blocs[jour])]
+        mouvements = []
+        for autre in rng.sample(autres, min(self.candidats, len(autres))):
+            mouvement = []
+            for c1, c2 in zip(blocs[jour], blocs[autre]):
+                occupants1 = sorted(planner._delta.morceaux_par_creneau[c1])
+                occupants2 = sorted(planner._delta.morceaux_par_creneau[c2])
+                mouvement += [(P.morceaux[q], P.creneaux[c2]) for q in occupants1]
+                mouvement += [(P.morceaux[q], P.creneaux[c1]) for q in occupants2]
+            if mouvement:
+                mouvements.append(mouvement)
+        return mouvements
+
+
+class Voisinages:
+    """Les voisinages actifs d'un planificateur et leur évaluateur commun."""
+
+    def __init__(self, planner, voisinages: List[Voisinage]):
+        self.planner = planner
+        self.voisinages = voisinages
+        self.evaluateur = EvaluateurMouvements(planner)
+        # morceau -> empreinte de l'affectation où aucun mouvement composé ne l'améliorait
+        self._sans_gain: Dict[str, int] = {}
+
+    def __bool__(self):
+        return bool(self.voisinages)
+
+    def proposer(self, rng: random.Random, morceau: str) -> List[Mouvement]:
+        mouvements = []
+        for voisinage in self.voisinages:
+            mouvements += voisinage.proposer(self.planner, rng, morceau)
+        return mouvements
+
+    def meilleur(self, rng: random.Random, morceau: str) -> Tuple[int, Optional[Mouvement]]:
+        """
+        Meilleur mouvement composé autour du morceau, avec sa variation de coût total.
+        Bloquée, la recherche locale redemande le même morceau dans la même affectation à
+        chaque étape : si rien ne l'améliorait la dernière fois, on ne réévalue pas (seuls
+        les jours tirés par "day" auraient pu changer).
+        """
+        empreinte = self.planner._delta.empreinte
+        if self._sans_gain.get(morceau) == empreinte:
+            return 0, None
+        meilleur_delta, meilleur_mouvement = 0, None
+        for mouvement in self.proposer(rng, morceau):
+            delta = self.evaluateur.evaluer(mouvement)
+            if meilleur_mouvement is None or delta < meilleur_delta:
+                meilleur_delta, meilleur_mouvement = delta, mouvement
+        if meilleur_delta >= 0:
+            self._sans_gain[morceau] = empreinte
+        return meilleur_delta, meilleur_mouvement
+
+
+VOISINAGES = {
+    EchangeVoisinage.nom: EchangeVoisinage,
+    ChaineVoisinage.nom: ChaineVoisinage,
+    BlocJourVoisinage.nom: BlocJourVoisinage,
+}
+
+
+def creer_voisinages(noms: List[str], planner) -> Voisinages:
+    inconnus = [nom for nom in noms if nom not in VOISINAGES]
+    if inconnus:
+        raise ValueError(f"Voisinage inconnu : {', '.join(inconnus)} (choix : {', '.join(VOISINAGES)})")
+    return Voisinages(planner, [VOISINAGES[nom]() for nom in noms])
+
+
+if __name__ == "__main__":
+    import sys
+    from scheduler import OptimizedRepetitionScheduler
+
+    if len(sys.argv) < 3:
+        print("Usage: python neighbourhoods.py repartitions.xlsx disponibilites.xlsx")
+        sys.exit(1)
+
+    # Vérifie que la variation annoncée est exactement celle du coût total recalculé,
+    # et que annuler() remet l'état à l'identique (empreinte comprise)
+    planner = OptimizedRepetitionScheduler(sys.argv[1], sys.argv[2], seed=0, neighbourhoods=list(VOISINAGES))
+    planner.load_data()
+    planner.build_model()
+    planner.initialize_assignment()
+    rng = random.Random(0)
+    voisinages = planner._voisinages
+    erreurs = essais = 0
+    for _ in range(200):
+        morceau = rng.choice(planner.morceaux)
+        for mouvement in voisinages.proposer(rng, morceau):
+            essais += 1
+            avant, assignation = planner._calculate_total_cost(), dict(planner.assignment)
+            empreinte = planner._delta.empreinte
+            delta, annulation = voisinages.evaluateur.appliquer(mouvement)
+            apres = planner._calculate_total_cost()
+            if apres - avant != delta or planner._cout_courant() != apres:
+                erreurs += 1
+                print("Écart :", mouvement, avant, apres, delta)
+            if rng.random() < 0.5:
+                voisinages.evaluateur.annuler(annulation)
+                if planner.assignment != assignation or planner._calculate_total_cost() != avant \
+                        or planner._delta.empreinte != empreinte:
+                    erreurs += 1
+                    print("Annulation incomplète :", mouvement)
+    print(f"✅ {essais} mouvements, variations exactes" if not erreurs else f"❌ {erreurs} erreurs")
+    sys.exit(1 if erreurs else 0)
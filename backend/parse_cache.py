@@ -0,0 +1,258 @@
+"""
+Description : Cache des classeurs déjà lus, par empreinte SHA-256 du contenu
+Licence : On devrait peut-être mettre une licence hein
+Anno : 43
+
+Chaque /api/upload réécrit les fichiers envoyés et les relit depuis le début, même quand
+c'est dix fois le même fichier pendant qu'on règle maybe_penalty ou max_load. Ici le
+résultat de la lecture (ingestion.py) est rangé sous le SHA-256 des octets du fichier :
+- en mémoire, un LRU de `max_entrees` fichiers ;
+- sur disque, dans `dossier`, deux fichiers par classeur : <sha>_<type>.npz (matrices :
+  incidence morceaux x musiciens, ou codes des réponses musiciens x créneaux) et
+  <sha>_<type>.json (en-tête : noms des lignes et colonnes, valeurs des codes, format).
+  Quand le dossier dépasse `max_octets`, les entrées les moins récemment utilisées partent.
+Le nom du fichier ne compte pas, seul le contenu : un même classeur renvoyé sous un autre
+nom est retrouvé, un fichier modifié ne l'est pas. Les entrées écrites par une autre
+VERSION de la lecture sont ignorées. Un succès reconstruit des objets neufs : deux
+planificateurs ne partagent jamais les mêmes dicts ou sets.
+Le cache par défaut (cache_par_defaut) est réglé par les variables d'environnement
+PARSE_CACHE_DIR et PARSE_CACHE_MB ; les processus de la décomposition en héritent.
+"""
+import hashlib
+import json
+import os
+import threading
+from collections import OrderedDict
+from typing import Dict, List, Optional, Set, Tuple
+
+import numpy as np
+
+from ingestion import (disponibilites_depuis, lire_disponibilites, lire_lignes_repartitions, lire_repartitions,
+                       repartitions_depuis)
+from slot import creneau
+
+# À changer quand les règles de lecture d'ingestion.py changent
+VERSION = 1
+
+
+def empreinte(chemin: str) -> str:
+    """SHA-256 des octets du fichier."""
+    h = hashlib.sha256()
+    with open(chemin, "rb") as f:
+        for bloc in iter(lambda: f.read(1 << 20), b""):
+            h.update(bloc)
+    return h.hexdigest()
+
+
+# --- Forme compacte (en-tête JSON + matrices) et retour aux objets des planificateurs ---
+
+def compacter_repartitions(lignes: List[Tuple[str, List[str]]]) -> Tuple[Dict, Dict]:
+    """Une ligne d'incidence par ligne du fichier : nombre de fois où chaque musicien y est noté."""
+    colonne: Dict[str, int] = {}  # musiciens dans l'ordre de première apparition
+    for _, noms in lignes:
+        for nom in noms:
+            colonne.setdefault(nom, len(colonne))
+    incidence = np.zeros((len(lignes), len(colonne)), dtype=np.int16)
+    for i, (_, noms) in enumerate(lignes):
+        for nom in noms:
+            incidence[i, colonne[nom]] += 1
+    return {"morceaux": [morceau for morceau, _ in lignes], "musiciens": list(colonne)}, {"incidence": incidence}
+
+
+def etendre_repartitions(entete: Dict, matrices: Dict) -> Tuple[List[str], Dict[str, Set[str]], Dict[str, List[str]]]:
+    musiciens = entete["musiciens"]
+    lignes = [(morceau, [musiciens[j] for j in np.flatnonzero(ligne) for _ in range(int(ligne[j]))])
+              for morceau, ligne in zip(entete["morceaux"], matrices["incidence"])]
+    return repartitions_depuis(lignes)
+
+
+def compacter_disponibilites(donnees: Dict) -> Tuple[Dict, Dict]:
+    """Les réponses deviennent des codes entiers, leurs textes vont dans l'en-tête."""
+    reponses = donnees["reponses"]
+    valeurs, codes = np.unique(reponses, return_inverse=True)
+    entete = {"format": donnees["format"], "creneaux": donnees["creneaux"],
+              "musiciens": sorted(donnees["musiciens"]), "noms": donnees["noms"],
+              "colonnes": donnees["colonnes"], "valeurs": valeurs.tolist()}
+    return entete, {"codes": codes.reshape(reponses.shape).astype(np.int32)}
+
+
+def etendre_disponibilites(entete: Dict, matrices: Dict) -> Dict:
+    valeurs = np.array(entete["valeurs"] or [""], dtype=str)
+    reponses = valeurs[matrices["codes"]]
+    # le JSON rend des str : on retrouve les Slot (mémoïsés) de la lecture
+    colonnes = list(map(creneau, entete["colonnes"]))
+    return {"format": entete["format"], "creneaux": list(map(creneau, entete["creneaux"])),
+            "musiciens": set(entete["musiciens"]), "noms": list(entete["noms"]),
+            "colonnes": colonnes, "reponses": reponses,
+            "disponibilites": disponibilites_depuis(entete["noms"], colonnes, reponses)}
+
+
+# type -> (lecture du fichier vers la forme compacte, retour aux objets des planificateurs)
+TYPES = {
+    "repartitions": (lambda chemin: compacter_repartitions(lire_lignes_repartitions(chemin)),
+                     etendre_repartitions),
+    "disponibilites": (lambda chemin: compacter_disponibilites(lire_disponibilites(chemin)),
+                       etendre_disponibilites),
+}
+
+
+class ParseCache:
+    def __init__(self, dossier: str, max_octets: int = 256 * 1024 * 1024, max_entrees: int = 16):
+        self.dossier = str(dossier)
+        self.max_octets = max_octets
+        self.max_entrees = max_entrees
+        os.makedirs(self.dossier, exist_ok=True)
+        self._memoire: "OrderedDict[Tuple[str, str], Tuple[Dict, Dict]]" = OrderedDict()
+        self._verrou = threading.Lock()
+        self.hits_memoire = 0
+        self.hits_disque = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def repartitions(self, chemin: str):
+        """Même résultat que ingestion.lire_repartitions."""
+        return self._obtenir(chemin, "repartitions")
+
+    def disponibilites(self, chemin: str) -> Dict:
+        """Même résultat que ingestion.lire_disponibilites."""
+        return self._obtenir(chemin, "disponibilites")
+
+    def _obtenir(self, chemin: str, type_fichier: str):
+        lire, etendre = TYPES[type_fichier]
+        cle = (empreinte(chemin), type_fichier)
+        with self._verrou:
+            entree = self._memoire.get(cle)
+            if entree is not None:
+                self._memoire.move_to_end(cle)
+                self.hits_memoire += 1
+        if entree is None:
+            entree = self._lire_disque(*cle)
+            if entree is not None:
+                self.hits_disque += 1
+            else:
+                self.misses += 1
+                entree = lire(chemin)
+                self._ecrire_disque(*cle, *entree)
+            self._memoriser(cle, entree)
+        return etendre(*entree)
+
+    def _memoriser(self, cle, entree):
+        with self._verrou:
+            self._memoire[cle] = entree
+            self._memoire.move_to_end(cle)
+            while len(self._memoire) > self.max_entrees:
+                self._memoire.popitem(last=False)
+
+    # --- Disque ---
+
+    def _chemins(self, sha: str, type_fichier: str) -> Tuple[str, str]:
+        base = os.path.join(self.dossier, f"{sha}_{type_fichier}")
+        return f"{base}.json", f"{base}.npz"
+
+    def _lire_disque(self, sha: str, type_fichier: str) -> Optional[Tuple[Dict, Dict]]:
+        chemin_json, chemin_npz = self._chemins(sha, type_fichier)
+        try:
+            with open(chemin_json, encoding="utf-8") as f:
+                entete = json.load(f)
+            if entete.get("version") != VERSION or entete.get("type") != type_fichier:
+                return None
+            with np.load(chemin_npz, allow_pickle=False) as npz:
+                matrices = {nom: npz[nom] for nom in npz.files}
+        except (OSError, ValueError, KeyError):
+            return None
+        # l'heure de modification sert d'heure de dernière utilisation pour l'éviction
+        os.utime(chemin_json)
+        return entete, matrices
+
+    def _ecrire_disque(self, sha: str, type_fichier: str, entete: Dict, matrices: Dict):
+        chemin_json, chemin_npz = self._chemins(sha, type_fichier)
+        try:
+            texte = json.dumps(dict(entete, version=VERSION, type=type_fichier, sha256=sha), ensure_ascii=False)
+        except TypeError:
+            return  # titres non sérialisables (dates...) : mémoire seulement
+        # écritures atomiques ; l'en-tête en dernier, c'est lui qui rend l'entrée visible
+        temporaire = f"{chemin_npz}.{os.getpid()}.tmp"
+        with open(temporaire, "wb") as f:
+            np.savez_compressed(f, **matrices)
+        os.replace(temporaire, chemin_npz)
+        temporaire = f"{chemin_json}.{os.getpid()}.tmp"
+        with open(temporaire, "w", encoding="utf-8") as f:
+            f.write(texte)
+        os.replace(temporaire, chemin_json)
+        self._evincer()
+
+    def _entrees_disque(self) -> List[Tuple[float, int, str]]:
+        """(dernière utilisation, octets, base) par entrée du dossier."""
+        entrees = []
+        for nom in os.listdir(self.dossier):
+            if not nom.endswith(".json"):
+                continue
+            base = os.path.join(self.dossier, nom[:-len(".json")])
+            try:
+                utilisation = os.path.getmtime(f"{base}.json")
+                octets = os.path.getsize(f"{base}.json") + os.path.getsize(f"{base}.npz")
+            except OSError:
+                continue
+            entrees.append((utilisation, octets, base))
+        return entrees
+
+    def _evincer(self):
+        entrees = sorted(self._entrees_disque())
+        total = sum(octets for _, octets, _ in entrees)
+        # on garde toujours au moins l'entrée qu'on vient d'écrire
+        for _, octets, base in entrees[:-1]:
+            if total <= self.max_octets:
+                break
+            for extension in (".json", ".npz"):
+                try:
+                    os.remove(base + extension)
+                except OSError:
+                    pass
+            total -= octets
+            self.evictions += 1
+
+    def stats(self) -> Dict[str, int]:
+        entrees = self._entrees_disque()
+        return {
+            "hits_memoire": self.hits_memoire,
+            "hits_disque": self.hits_disque,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "entrees_memoire": len(self._memoire),
+            "entrees_disque": len(entrees),
+            "octets_disque": sum(octets for _, octets, _ in entrees),
+        }
+
+
+_CACHE: Optional[ParseCache] = None
+
+
+def cache_par_defaut() -> Optional[ParseCache]:
+    """Cache du processus, dans PARSE_CACHE_DIR (limité à PARSE_CACHE_MB Mo) ; None si la variable n'est pas définie."""
+    global _CACHE
+    dossier = os.getenv("PARSE_CACHE_DIR")
+    if not dossier:
+        return None
+    if _CACHE is None or _CACHE.dossier != dossier:
+        _CACHE = ParseCache(dossier, max_octets=int(float(os.getenv("PARSE_CACHE_MB", 256)) * 1024 * 1024))
+    return _CACHE
+
+
+if __name__ == "__main__":
+    import sys
+    import tempfile
+    import time
+
+    # python parse_cache.py repartitions.xlsx disponibilites.xlsx : lecture, puis succès mémoire et disque
+    repart_path, dispo_path = sys.argv[1:3]
+    with tempfile.TemporaryDirectory() as dossier:
+        cache = ParseCache(dossier)
+        references = (lire_repartitions(repart_path), lire_disponibilites(dispo_path)["disponibilites"])
+        for essai in ("lecture", "mémoire", "disque"):
+            if essai == "disque":
+                cache = ParseCache(dossier)  # nouveau processus : mémoire vide
+            debut = time.perf_counter()
+            resultats = (cache.repartitions(repart_path), cache.disponibilites(dispo_path)["disponibilites"])
+            duree = time.perf_counter() - debut
+            print(f"{essai:<8} {duree * 1000:8.1f} ms  identique : {resultats == references}")
+        print(cache.stats())
@@ -0,0 +1,148 @@
+"""
+Description : Stratégies de construction des restarts pour OptimizedRepetitionScheduler
+Licence : On devrait peut-être mettre une licence hein
+Anno : 43
+
+- greedy : l'initialisation historique (morceaux triés par taille d'ensemble, meilleur créneau)
+- grasp  : construction gloutonne randomisée, on tire le créneau dans une liste restreinte
+           de candidats (RCL) proches du meilleur coût
+- ils    : recherche locale itérée, on repart de la meilleure solution connue et on
+           perturbe une partie des morceaux
+- warm_start : la solution précédente (planner.warm_start), utilisée pour le premier restart
+Toutes tirent leur hasard du random.Random passé en argument, jamais du module random.
+"""
+import random
+from typing import Dict, Optional
+import numpy as np
+
+# Au-delà de ce coût, un créneau n'est pas retenu à l'initialisation (même règle qu'initialize_assignment)
+COUT_MAX_INITIAL = 1000
+
+
+class RestartStrategy:
+    nom = "base"
+    # part de la meilleure solution des restarts précédents (en parallèle : ceux des lots déjà terminés)
+    depend_du_meilleur = False
+
+    def construire(self, planner, rng: random.Random,
+                   meilleure: Optional[Dict[str, Optional[str]]] = None):
+        """Construit l'assignation de départ du restart dans planner (assignation vide en entrée)."""
+        raise NotImplementedError
+
+
+class GreedyRestart(RestartStrategy):
+    nom = "greedy"
+
+    def construire(self, planner, rng, meilleure=None):
+        planner.initialize_assignment()
+
+
+class GraspRestart(RestartStrategy):
+    """
+    alpha = 0 : glouton pur ; alpha = 1 : n'importe quel créneau acceptable.
+    L'ordre des morceaux reste "gros ensembles d'abord", départagé au hasard.
+    """
+    nom = "grasp"
+
+    def __init__(self, alpha: float = 0.3):
+        self.alpha = alpha
+
+    def construire(self, planner, rng, meilleure=None):
+        if not planner.creneaux:
+            return planner._update_conflicts()
+
+        morceaux = sorted(planner.morceaux,
+                          key=lambda m: (-len(planner.repartition[m]), rng.random()))
+        for morceau in morceaux:
+            couts = planner._delta.couts_morceau(morceau)
+            cout_min = int(couts.min())
+            if cout_min >= COUT_MAX_INITIAL:
+                continue
+            limite = cout_min + self.alpha * (COUT_MAX_INITIAL - 1 - cout_min)
+            candidats = np.flatnonzero(couts <= limite).tolist()
+            planner._delta.deplacer(morceau, planner.creneaux[rng.choice(candidats)])
+
+        planner._update_conflicts()
+
+
+class IteratedLocalSearchRestart(RestartStrategy):
+    """
+    Repart de la meilleure assignation connue et déplace une fraction `force` des
+    morceaux (les plus en conflit d'abord, puis au hasard) : ils échangent au hasard leurs
+    créneaux entre eux et avec les créneaux libres.
+    Sans solution connue, se rabat sur GRASP.
+    """
+    nom = "ils"
+    depend_du_meilleur = True
+
+    def __init__(self, force: float = 0.2, alpha: float = 0.3):
+        self.force = force
+        self.repli = GraspRestart(alpha)
+
+    def construire(self, planner, rng, meilleure=None):
+        if not meilleure or not planner.creneaux:
+            return self.repli.construire(planner, rng)
+
+        for morceau, creneau in meilleure.items():
+            planner._delta.deplacer(morceau, creneau)
+        planner._update_conflicts()
+
+        n = max(1, int(len(planner.morceaux_mobiles) * self.force))
+        en_conflit = [m for m, c in sorted(planner.conflicts.items(), key=lambda x: -x[1])
+                      if c > 0 and m not in planner.morceaux_figes]
+        cibles = en_conflit[:n // 2]
+        restants = [m for m in planner.morceaux_mobiles if m not in cibles]
+        cibles += rng.sample(restants, min(len(restants), n - len(cibles)))
+
+        # les cibles se partagent au hasard leurs propres créneaux et les créneaux libres :
+        # pas de collision (PENALITE_COLLISION), dont la recherche locale met longtemps à
+        # sortir, et pas de morceau désassigné quand le planning est plein
+        occupes = {c for c in planner.assignment.values() if c}
+        libres = [c for c in planner.creneaux if c not in occupes]
+        places = [planner.assignment[m] for m in cibles if planner.assignment[m]]
+        places += rng.sample(libres, min(len(libres), len(cibles) - len(places)))
+        rng.shuffle(places)
+        for morceau in cibles:
+            planner._delta.deplacer(morceau, None)
+        for morceau, creneau in zip(cibles, places):
+            planner._delta.deplacer(morceau, creneau)
+        planner._update_conflicts()
+
+
+class WarmStartRestart(RestartStrategy):
+    """
+    Reprend planner.warm_start (morceau -> créneau) en ignorant les morceaux et créneaux
+    qui n'existent plus ; les morceaux restants sont placés comme l'initialisation gloutonne.
+    """
+    nom = "warm_start"
+
+    def construire(self, planner, rng, meilleure=None):
+        P = planner.probleme
+        for morceau, creneau in planner.warm_start.items():
+            if morceau in P.morceau_id and creneau in P.creneau_id:
+                planner._delta.deplacer(morceau, creneau)
+
+        if planner.creneaux:
+            restants = sorted((m for m in planner.morceaux if planner.assignment[m] is None
+                               and m not in planner.warm_start),
+                              key=lambda m: len(planner.repartition[m]), reverse=True)
+            for morceau in restants:
+                couts = planner._delta.couts_morceau(morceau)
+                idx = int(couts.argmin())
+                if couts[idx] < COUT_MAX_INITIAL:
+                    planner._delta.deplacer(morceau, planner.creneaux[idx])
+
+        planner._update_conflicts()
+
+
+STRATEGIES = {
+    GreedyRestart.nom: GreedyRestart,
+    GraspRestart.nom: GraspRestart,
+    IteratedLocalSearchRestart.nom: IteratedLocalSearchRestart,
+}
+
+
+def creer_strategie(nom: str, **options) -> RestartStrategy:
+    if nom not in STRATEGIES:
+        raise ValueError(f"Stratégie de restart inconnue : {nom} (choix : {', '.join(STRATEGIES)})")
+    return STRATEGIES[nom](**options)
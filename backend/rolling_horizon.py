@@ -0,0 +1,159 @@
+"""
+Description : Résolution semaine par semaine (horizon glissant) pour les longues saisons
+Licence : On devrait peut-être mettre une licence hein
+Anno : 43
+
+Le modèle d'un bloc grossit avec le nombre de semaines, et le temps de résolution bien
+plus vite. Ici on résout une fenêtre de `semaines` semaines à la fois :
+1. les morceaux pas encore placés peuvent aller sur les créneaux de la fenêtre ;
+2. ceux placés dans les `pas` premières semaines de la fenêtre sont figés, les autres
+   (chevauchement) sont remis en jeu avec la fenêtre suivante, en partant de leur place ;
+3. la dernière fenêtre fige tout ce qu'elle a placé.
+Les morceaux figés d'une fenêtre précédente qui tombent sur un jour de la fenêtre
+restent dans le sous-problème à leur créneau (voir restreindre(figes=...)) : la charge
+journalière et les répétitions groupées continuent de les compter. Le sous-problème
+ne garde que les jours touchés par la fenêtre : sa taille, donc la mémoire et le temps
+par fenêtre, ne dépendent plus de la longueur de la saison.
+Le budget total est réparti entre les fenêtres restantes (ou `temps_fenetre` secondes
+chacune). Un morceau qui ne trouve de place dans aucune fenêtre reste non assigné.
+"""
+import copy
+import time
+from typing import Dict, List, Optional
+
+from scheduler import OptimizedRepetitionScheduler
+
+
+def semaine_de(planner, creneau: str) -> int:
+    """Numéro de semaine du créneau (1 si le calendrier n'a pas de semaines)."""
+    return planner.calendrier.semaine_de.get(creneau, 1)
+
+
+def fenetres(semaines: List[int], taille: int, chevauchement: int) -> List[Dict]:
+    """[{"semaines": [...], "figees": [...]}] : semaines résolues, et celles dont on fige le résultat."""
+    taille = max(1, taille)
+    pas = max(1, taille - max(0, chevauchement))
+    resultat = []
+    for debut in range(0, len(semaines), pas):
+        fenetre = semaines[debut:debut + taille]
+        derniere = debut + taille >= len(semaines)
+        resultat.append({"semaines": fenetre, "figees": fenetre if derniere else semaines[debut:debut + pas]})
+        if derniere:
+            break
+    return resultat
+
+
+class RollingHorizonScheduler:
+    def __init__(self, classe, *args, semaines: int = 1, chevauchement: int = 0,
+                 temps_fenetre: Optional[int] = None, **kwargs):
+        """
+        classe : OptimizedRepetitionScheduler ou RepetitionScheduler, construit avec *args et
+        **kwargs (generation_time_limit en mot-clé : c'est le budget total).
+        semaines : taille d'une fenêtre ; chevauchement : semaines re-résolues par la fenêtre
+        suivante (0 = fenêtres disjointes) ; temps_fenetre : secondes par fenêtre, au lieu
+        de répartir le budget.
+        """
+        self.classe = classe
+        self.args = args
+        self.generation_time_limit = kwargs.get("generation_time_limit", 30)
+        self.semaines = max(1, semaines)
+        self.chevauchement = max(0, min(chevauchement, self.semaines - 1))
+        self.temps_fenetre = temps_fenetre
+        self._stream = kwargs.get("stream")
+        # Les fenêtres ne publient pas elles-mêmes : leur coût ne porte que sur une partie de la saison
+        self._kwargs_fenetres = {k: v for k, v in kwargs.items() if k not in ("stream", "warm_start")}
+        # Planificateur complet : données, solution finale, export
+        self.planner = classe(*args, **kwargs)
+        self.fenetres: List[Dict] = []
+
+    def _sous_probleme(self, base, restants: List[str], figes: Dict[str, str], semaines_fenetre: List[int],
+                       indices: Dict[str, str], temps: int):
+        """Planificateur de la fenêtre : morceaux restants, jours de la fenêtre, contexte figé."""
+        P = self.planner
+        dans_fenetre = {c for c in P.creneaux if semaine_de(P, c) in semaines_fenetre}
+        jours = [slots for slots in P.creneaux_par_jour.values() if dans_fenetre.intersection(slots)]
+        gardes = {c for slots in jours for c in slots}
+        contexte = {m: c for m, c in figes.items() if c in gardes}
+
+        planner = copy.deepcopy(base)
+        planner.generation_time_limit = temps
+        if isinstance(planner, OptimizedRepetitionScheduler):
+            planner.max_restarts = temps
+        planner.restreindre(restants, gardes - dans_fenetre, figes=contexte, creneaux=list(gardes))
+        indices = {m: c for m, c in indices.items() if c in dans_fenetre}
+        planner.warm_start = dict(contexte, **indices) if indices else None
+        return planner, contexte
+
+    def solve(self):
+        debut = time.time()
+        deadline = debut + self.generation_time_limit
+        P = self.planner
+        plan = fenetres(P.weeks or [1], self.semaines, self.chevauchement)
+        print(f"🗓️ Horizon glissant : {len(P.weeks)} semaine(s), {len(plan)} fenêtre(s) de "
+              f"{self.semaines} semaine(s), chevauchement {self.chevauchement}")
+
+        # données lues une seule fois, copiées pour chaque fenêtre
+        base = self.classe(*self.args, **self._kwargs_fenetres)
+        base.load_data()
+        figes: Dict[str, str] = {}
+        indices = dict(P.warm_start or {})
+        self.fenetres = []
+        for i, fenetre in enumerate(plan):
+            restants = [m for m in P.morceaux if m not in figes]
+            if not restants:
+                break
+            temps = self.temps_fenetre or int(max(1, round((deadline - time.time()) / (len(plan) - i))))
+            debut_fenetre = time.time()
+            planner, contexte = self._sous_probleme(base, restants, figes, fenetre["semaines"], indices, temps)
+            if isinstance(planner, OptimizedRepetitionScheduler):
+                planner.build_model()
+            planner.solve()
+
+            nouveaux, chevauchement = 0, {}
+            for morceau in restants:
+                creneau = planner.solution.get(morceau)
+                if creneau and semaine_de(P, creneau) in fenetre["figees"]:
+                    figes[morceau] = creneau
+                    nouveaux += 1
+                elif creneau:
+                    chevauchement[morceau] = creneau  # point de départ de la fenêtre suivante
+            # les anciens indices qui tombent sur un créneau maintenant pris ne servent plus
+            pris = set(figes.values())
+            indices = {m: c for m, c in indices.items() if m not in figes and c not in pris}
+            indices.update(chevauchement)
+            self.fenetres.append({"semaines": fenetre["semaines"], "morceaux": len(restants),
+                                  "contexte": len(contexte), "figes": nouveaux,
+                                  "creneaux": len(planner.creneaux), "duree": round(time.time() - debut_fenetre, 3)})
+            print(f"🗓️ Fenêtre {i + 1}/{len(plan)} (semaines {fenetre['semaines']}) : {nouveaux} morceau(x) "
+                  f"figé(s) sur {len(restants)}, {len(contexte)} en contexte, en {time.time() - debut_fenetre:.1f}s")
+
+            if self._stream is not None:
+                P.adopter_solution(figes)
+                self._stream.publier(self._cout(), figes, "rolling_horizon")
+                if self._stream.arret_demande():
+                    break
+
+        P.adopter_solution(figes)
+        print(f"🗓️ Horizon glissant : {len(P.solution)}/{len(P.morceaux)} morceaux assignés, "
+              f"coût {self._cout()} en {time.time() - debut:.1f}s")
+
+    def _cout(self) -> Optional[float]:
+        if isinstance(self.planner, OptimizedRepetitionScheduler):
+            return self.planner._calculate_total_cost()
+        return self.planner.valeur_objectif
+
+    def generer_planning(self):
+        self.planner.load_data()
+        self.solve()
+
+    def export_planning(self, directory=".", base_filename="planning"):
+        return self.planner.export_planning(directory, base_filename)
+
+    def get_json_data(self):
+        donnees = self.planner.get_json_data()
+        donnees["horizon_glissant"] = {
+            "semaines": self.semaines,
+            "chevauchement": self.chevauchement,
+            "fenetres": self.fenetres,
+        }
+        return donnees
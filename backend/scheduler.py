@@ -5,12 +5,31 @@ Anno : 43
 Auteur : Mateo Bauvir
 Modifié : Ajout de jours spéciaux avec tolérance d'absences
 """
+import multiprocessing
+import os
+import numpy as np
 import pandas as pd
 import random
 import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
 from collections import defaultdict, Counter
 from typing import Dict, List, Set, Tuple, Optional
-import re
+from calendar_index import CalendarIndex
+from ingestion import charger
+from parse_cache import cache_par_defaut
+from slot import creneau, depuis_texte
+from compiled_problem import CompiledProblem, DISPO_NON
+from delta_cost import DeltaCostEngine, PENALITE_COLLISION
+from conflict_cache import VersionedConflictCache
+from restart_strategies import creer_strategie, GreedyRestart, WarmStartRestart
+from local_search import creer_moteur
+from neighbourhoods import creer_voisinages
+from warm_start import charger_solution
+
+# "spawn" plutôt que fork pour les restarts parallèles : le serveur Flask tourne avec des threads
+_MP_CONTEXTE = multiprocessing.get_context("spawn")
+# Secondes gardées avant la limite de temps pour rapatrier les résultats des workers
+_MARGE_PARALLELE = 0.5
 
 class OptimizedRepetitionScheduler:
     def __init__(self,
@@ -24,12 +43,47 @@ class OptimizedRepetitionScheduler:
                  seuil_absence: int = 2,
                  generation_time_limit: int = 30,
                  creneaux_speciaux: Optional[List[str]] = None,
-                 seuil_absence_creneau_special: int = 5):
+                 seuil_absence_creneau_special: int = 5,
+                 cache_size: int = 200000,
+                 workers: int = 1,
+                 seeds: Optional[List[int]] = None,
+                 seed: Optional[int] = None,
+                 restart_strategy: str = "ils",
+                 engine: str = "min_conflicts",
+                 neighbourhoods: Optional[List[str]] = None,
+                 stagnation_iterations: Optional[int] = None,
+                 stagnation_seconds: Optional[float] = None,
+                 gap_tolerance: float = 0.0,
+                 stream=None,
+                 warm_start=None):
         """
         Paramètres additionnels:
         - creneaux_speciaux: Liste des créneaux où on tolère plus d'absences 
           Format: ["LUN_04_16:00-18:00", "MER_12_14:00-16:00"]
         - seuil_absence_creneau_special: Nombre d'absences tolérées pour ces créneaux spéciaux
+        - cache_size: nombre max d'entrées (morceau, créneau) gardées dans le cache des conflits
+        - workers: nombre de processus pour lancer les restarts en parallèle (1 = séquentiel)
+        - seeds: graines des restarts (une par restart). Même graines => même résultat
+          tant que la limite de temps n'est pas atteinte. Par défaut tirées à partir de seed
+        - seed: graine du générateur privé (None = tirée au hasard, gardée dans self.seed)
+        - restart_strategy: construction des restarts après le premier (toujours glouton) :
+          "greedy", "grasp" (liste restreinte de candidats) ou "ils" (perturbation de la
+          meilleure solution connue ; en parallèle, la meilleure connue du worker)
+        - engine: moteur de recherche locale, "min_conflicts", "tabu" ou "annealing"
+        - neighbourhoods: mouvements composés essayés en plus du déplacement d'un morceau,
+          parmi "swap", "chain" et "day", tentés quand le déplacement simple ne fait plus baisser
+          le coût (aucun par défaut = déplacement simple uniquement, le plus rapide)
+        - stagnation_iterations: un restart s'arrête après ce nombre d'itérations sans améliorer
+          son meilleur coût (None = jusqu'à max_iterations)
+        - stagnation_seconds: la résolution s'arrête quand le meilleur coût global n'a pas
+          bougé depuis ce nombre de secondes (None = jusqu'à la limite de temps)
+        - gap_tolerance: écart relatif (meilleur - borne inférieure) / meilleur en dessous
+          duquel on s'arrête. 0 = seulement quand la borne est atteinte (optimum prouvé)
+        - stream: IncumbentStream (voir anytime.py) qui reçoit chaque amélioration du meilleur
+          coût global ; stream.arreter() termine la recherche avec la meilleure solution connue
+        - warm_start: solution précédente (dict morceau -> créneau ou planning JSON, voir
+          warm_start.py ; un fichier exporté se lit avec charger_fichier_solution) ; le premier
+          restart part d'elle au lieu du glouton
         """
         
         self.repartitions_file = repartitions_file
@@ -41,6 +95,27 @@ class OptimizedRepetitionScheduler:
         self.mode_absence = mode_absence
         self.seuil_absence = seuil_absence
         self.generation_time_limit = generation_time_limit
+        self.cache_size = cache_size
+        self.workers = max(1, workers)
+        self.seeds = seeds
+        self.seed = seed if seed is not None else random.SystemRandom().randrange(2**32)
+        self._rng = random.Random(self.seed)
+        self.restart_strategy = restart_strategy
+        self._strategie = creer_strategie(restart_strategy)
+        self.historique_restarts: List[Dict] = []
+        self.engine = engine
+        self._moteur = creer_moteur(engine, self, self._rng)
+        self.neighbourhoods = list(neighbourhoods or [])
+        self._voisinages = creer_voisinages(self.neighbourhoods, self)
+        self.stagnation_iterations = stagnation_iterations
+        self.stagnation_seconds = stagnation_seconds
+        self.gap_tolerance = gap_tolerance
+        # Meilleur coût global au cours du temps [(secondes depuis le début, coût)] et raison de l'arrêt
+        self.trace_convergence: List[Tuple[float, int]] = []
+        self.arret: Optional[str] = None
+        self._stream = stream
+        self.warm_start: Optional[Dict[str, Optional[str]]] = \
+            charger_solution(warm_start) if warm_start is not None else None
         
         # NOUVEAUX PARAMÈTRES
         self.creneaux_speciaux = self._normaliser_creneaux_speciaux(creneaux_speciaux or [])
@@ -51,10 +126,9 @@ class OptimizedRepetitionScheduler:
         self.creneaux: List[str] = []
         self.weeks = []
         self.repartition: Dict[str, Set[str]] = {}
-        self.repartitions_df = None
-        self.disponibilites_df = None
         self.disponibilites: Dict[str, Dict[str, str]] = {}
-        self.creneaux_par_jour: Dict[str, List[str]] = defaultdict(list)
+        self.creneaux_par_jour: Dict[str, List[str]] = defaultdict(list)  # par date : {"LUN_04": [...]}
+        self.calendrier: Optional[CalendarIndex] = None  # dates, créneaux consécutifs, semaines (load_data)
         self.slot_index: Dict[str, int] = {}
         self.musiciens_absents_force: Dict[str, Set[str]] = defaultdict(set)
         self.absent_participants: Dict[str, Dict[str, List]] = defaultdict(lambda: defaultdict(list))
@@ -66,11 +140,26 @@ class OptimizedRepetitionScheduler:
         self.assigned = 0
         self.notassigned = []
         
-        self._conflict_cache: Dict[Tuple[str, str], int] = {}
+        self._conflict_cache = VersionedConflictCache(cache_size)
+        self.cache_stats: Dict[str, float] = {}
         self._musicien_morceaux: Dict[str, List[str]] = defaultdict(list)
+        self.probleme: Optional[CompiledProblem] = None
+        # Matrices morceaux x créneaux indépendantes de l'assignation (voir _precalculer_couts_statiques)
+        self.absents_matrice = None
+        self.maybe_matrice = None
+        self.couts_statiques = None
+        # Créneaux réservés à d'autres morceaux (décomposition, voir restreindre)
+        self.creneaux_interdits: Set[str] = set()
+        # Morceaux déjà placés par une fenêtre précédente (rolling horizon, voir restreindre)
+        self.morceaux_figes: Dict[str, str] = {}
+        self.morceaux_mobiles: List[str] = []  # les autres, ceux que la recherche locale déplace (build_model)
+        self._delta: Optional[DeltaCostEngine] = None
         
         self.max_iterations = 10000
         self.max_restarts = generation_time_limit
+        # Aucun coût ne peut descendre sous cette borne (un restart qui l'atteint est imbattable),
+        # calculée dans _calculer_borne_inferieure
+        self.borne_inferieure = 0
     
     def _normaliser_creneaux_speciaux(self, creneaux: List[str]) -> Set[str]:
         """
@@ -79,49 +168,13 @@ class OptimizedRepetitionScheduler:
         - "LUN_04_16:00-18:00" (format complet)
         - "LUN_04_16_18" (format simplifié)
         - "Lundi 04 16:00-18:00"
+        (lecture : slot.depuis_texte ; les heures sont réécrites sur deux chiffres)
         """
-        DAY_CODES = {
-            'lundi': 'LUN', 'lun': 'LUN',
-            'mardi': 'MAR', 'mar': 'MAR',
-            'mercredi': 'MER', 'mer': 'MER',
-            'jeudi': 'JEU', 'jeu': 'JEU',
-            'vendredi': 'VEN', 'ven': 'VEN',
-            'samedi': 'SAM', 'sam': 'SAM',
-            'dimanche': 'DIM', 'dim': 'DIM'
-        }
-        
         normalises = set()
-        for creneau in creneaux:
-            creneau_clean = creneau.strip().lower()
-            
-            # Format standard "LUN_04_16:00-18:00"
-            if '_' in creneau_clean:
-                parts = creneau_clean.split('_')
-                if len(parts) >= 3:
-                    jour_code = parts[0].upper()
-                    date = f"{int(parts[1]):02d}"
-                    
-                    # Reconstruction de l'horaire
-                    if ':' in parts[2]:
-                        # Format "16:00-18:00"
-                        horaire = parts[2]
-                    else:
-                        # Format simplifié "16_18" -> "16:00-18:00"
-                        if len(parts) == 4:
-                            horaire = f"{int(parts[2]):02d}:00-{int(parts[3]):02d}:00"
-                        else:
-                            continue
-                    
-                    normalises.add(f"{jour_code}_{date}_{horaire}")
-            else:
-                # Format "Lundi 04 16:00-18:00"
-                import re
-                match = re.match(r'(\w+)\s+(\d+)\s+([\d:]+\-[\d:]+)', creneau_clean)
-                if match:
-                    jour_nom, date, horaire = match.groups()
-                    if jour_nom in DAY_CODES:
-                        jour_code = DAY_CODES[jour_nom]
-                        normalises.add(f"{jour_code}_{int(date):02d}_{horaire}")
+        for texte in creneaux:
+            slot = depuis_texte(texte)
+            if slot is not None:
+                normalises.add(slot)
         
         return normalises
     
@@ -132,163 +185,120 @@ class OptimizedRepetitionScheduler:
         """
         return creneau in self.creneaux_speciaux
         
-    def transformer_simple(self, texte: str) -> Optional[Dict]:
-        """Transforme un texte de créneau en dictionnaire structuré."""
-        t = texte.strip().replace("\n", " ").replace("\r", " ")
-        m = re.search(r"(\w+\.)\s+(\d+).*?(\d{1,2}):(\d{2})\s*-\s*(\d{1,2}):(\d{2})", t)
-        if not m:
-            return None
-        
-        jour_txt, jour_chiffre, H1, M1, H2, M2 = m.groups()
-        jours = {
-            'lun.': 'LUN', 'mar.': 'MAR', 'mer.': 'MER',
-            'jeu.': 'JEU', 'ven.': 'VEN', 'sam.': 'SAM', 'dim.': 'DIM'
-        }
-        jour = jours.get(jour_txt.lower(), jour_txt.upper().rstrip('.'))
-        
-        return {
-            'jour': jour,
-            'date': int(jour_chiffre),
-            'h1': int(H1), 'm1': int(M1),
-            'h2': int(H2), 'm2': int(M2)
-        }
-    
     def load_data(self):
-        """Charge les données depuis les fichiers Excel."""
-        
-        if hasattr(self, 'repartitions_file') and self.repartitions_file:
-            self.repartitions_df = pd.read_excel(self.repartitions_file)
-            instrument_cols = self.repartitions_df.columns[6:]
-                    
-            for _, row in self.repartitions_df.iterrows():
-                morceau = row['Titre']
-                if pd.isna(morceau):
-                    continue
-                                
-                has_musicians = any(not pd.isna(row[c]) for c in instrument_cols)
-                if not has_musicians:
-                    continue
-                                
-                self.morceaux.append(morceau)
-                self.repartition[morceau] = set()
-                            
-                for col in instrument_cols:
-                    cellule = row[col]
-                    if pd.isna(cellule):
-                        continue
-                                        
-                    for nom in str(cellule).split(','):
-                        nom = nom.strip()
-                        if nom:
-                            self.musiciens.add(nom)
-                            self.repartition[morceau].add(nom)
-                            self._musicien_morceaux[nom].append(morceau)
-        
-        self.disponibilites_df = pd.read_excel(self.disponibilites_file)
-        all_dates = set()
-        
-        if 'Nom' in self.disponibilites_df.columns:
-            dispo_cols = self.disponibilites_df.columns[2:]
-            
-            for _, row in self.disponibilites_df.iterrows():
-                musicien = str(row['Nom']).strip().title()
-                if pd.isna(musicien) or not musicien:
-                    continue
-                                
-                self.disponibilites[musicien] = {}
-                            
-                for col in dispo_cols:
-                    info = self.transformer_simple(str(col))
-                    if not info:
-                        continue
-                                        
-                    d = info['date']
-                    j = info['jour']
-                    h1, m1, h2, m2 = info['h1'], info['m1'], info['h2'], info['m2']
-                    all_dates.add(d)
-                    start = f"{h1:02d}:{m1:02d}"
-                    end = f"{h2:02d}:{m2:02d}"
-                    slot = f"{j}_{d:02d}_{start}-{end}"
-                                    
-                    val = str(row[col]).strip().lower() if not pd.isna(row[col]) else "no"
-                    self.disponibilites[musicien][slot] = val
-        else:
-            for idx, row in self.disponibilites_df.iterrows():
-                for col_idx, col in enumerate(self.disponibilites_df.columns[2:], start=2):
-                    cell_value = str(row[col]) if not pd.isna(row[col]) else ""
-                    if cell_value and cell_value != "nan":
-                        if any(day in cell_value for day in ['lun.', 'mar.', 'mer.', 'jeu.', 'ven.', 'sam.', 'dim.']):
-                            clean_text = cell_value.replace('\n', ' ').replace('[93%]', '').strip()
-                            info = self.transformer_simple(clean_text)
-                            if info:
-                                d = info['date']
-                                j = info['jour']
-                                h1, m1, h2, m2 = info['h1'], info['m1'], info['h2'], info['m2']
-                                all_dates.add(d)
-                                start = f"{h1:02d}:{m1:02d}"
-                                end = f"{h2:02d}:{m2:02d}"
-                                slot = f"{j}_{d:02d}_{start}-{end}"
-                                self.creneaux.append(slot)
-            
-            for idx, row in self.disponibilites_df.iterrows():
-                if idx <= 3:
-                    continue
-                    
-                first_col = str(row.iloc[0]).strip() if not pd.isna(row.iloc[0]) else ""
-                
-                if len(row) > 1 and not pd.isna(row.iloc[1]) and '@' in str(row.iloc[1]):
-                    musicien = first_col.title()
-                    if musicien and musicien != 'Nan':
-                        self.musiciens.add(musicien)
-                        self.disponibilites[musicien] = {}
-                        
-                        for col_idx in range(2, len(row)):
-                            if col_idx - 2 < len(self.creneaux):
-                                slot = self.creneaux[col_idx - 2]
-                                val = str(row.iloc[col_idx]).strip().lower() if not pd.isna(row.iloc[col_idx]) else "no"
-                                
-                                if val in ['yes', 'oui']:
-                                    self.disponibilites[musicien][slot] = "yes"
-                                elif val in ['maybe', 'peut-être']:
-                                    self.disponibilites[musicien][slot] = "maybe"  
-                                else:
-                                    self.disponibilites[musicien][slot] = "no"
-            
-            if not self.morceaux and self.musiciens:
-                morceau_default = "Session_Planning"
-                self.morceaux.append(morceau_default)
-                self.repartition[morceau_default] = self.musiciens.copy()
-                
-                for musicien in self.musiciens:
-                    self._musicien_morceaux[musicien].append(morceau_default)
-        
+        """Charge les données depuis les fichiers Excel (lecture : voir ingestion.py, cache : parse_cache.py)."""
+        format_dispo = charger(self, cache_par_defaut())
+
         if self.disponibilites:
             premier = next(iter(self.disponibilites.values()))
                             
-            def _key(s):
-                _, dd, plage = s.split("_")
-                start, _ = plage.split("-")
-                h, m = start.split(":")
-                return (int(dd), int(h), int(m))
-            
-            if 'Nom' in self.disponibilites_df.columns:
-                self.creneaux = sorted(premier.keys(), key=_key)
-            else:
-                self.creneaux = sorted(self.creneaux, key=_key)
-                
+            # Créneaux dans l'ordre des colonnes : le calendrier en tire l'ordre chronologique
+            # (changements de mois compris) ; un "jour" de la charge et des groupements est
+            # une date (tous les lundis ne font pas qu'un)
+            self.calendrier = CalendarIndex(premier if format_dispo == "nom" else self.creneaux)
+            self.creneaux = list(self.calendrier.creneaux)
             self.slot_index = {slot: i for i, slot in enumerate(self.creneaux)}
-                            
-            for slot in self.creneaux:
-                jour = slot.split("_")[0]
-                self.creneaux_par_jour[jour].append(slot)
-                    
-            dates_sorted = sorted(all_dates)
-            if dates_sorted:
-                base = dates_sorted[0]
-                self.date2week = {d: ((d - base) // 7) + 1 for d in dates_sorted}
-                self.weeks = sorted(set(self.date2week.values()))
-            else:
-                self.weeks = []
+            self.creneaux_par_jour = defaultdict(list, self.calendrier.creneaux_par_date)
+            self.date2week = self.calendrier.date2week
+            self.weeks = self.calendrier.semaines
+        else:
+            self.calendrier = CalendarIndex([])
+        
+        self.probleme = CompiledProblem.depuis_scheduler(self)
+        self._precalculer_couts_statiques()
+        self._calculer_borne_inferieure()
+    
+    def _precalculer_couts_statiques(self):
+        """
+        Partie disponibilités de calculate_conflicts (absents, peut-être, seuils des
+        créneaux spéciaux) pour tous les couples morceau x créneau en une fois :
+        elle ne dépend pas de l'assignation courante.
+        """
+        self.absents_matrice, self.maybe_matrice = self.probleme.comptes_disponibilites()
+        est_special = np.array([self._est_creneau_special(c) for c in self.probleme.creneaux], dtype=bool)
+        
+        if self.mode_absence == "strict":
+            cout_absent = np.where(est_special, 100, 10000)
+        else:
+            cout_absent = np.full(len(est_special), 100)
+        couts = self.absents_matrice * cout_absent + self.maybe_matrice * self.maybe_penalty
+        
+        if self.mode_absence != "strict":
+            seuil_actif = np.where(est_special, self.seuil_absence_creneau_special, self.seuil_absence)
+            couts += np.maximum(self.absents_matrice - seuil_actif, 0) * 10000
+        figes = [(self.probleme.morceau_id[m], self.probleme.creneau_id[c]) for m, c in self.morceaux_figes.items()]
+        cout_fige = [couts[p, c] for p, c in figes]
+        if self.creneaux_interdits:
+            interdits = [self.probleme.creneau_id[c] for c in self.creneaux_interdits if c in self.probleme.creneau_id]
+            couts[:, interdits] += PENALITE_COLLISION
+        # un morceau figé ne peut que rester à sa place, même si elle est interdite aux autres
+        for (p, c), cout in zip(figes, cout_fige):
+            couts[p] = PENALITE_COLLISION
+            couts[p, c] = cout
+        self.couts_statiques = couts
+    
+    def restreindre(self, morceaux: List[str], creneaux_interdits=(), figes: Optional[Dict[str, str]] = None,
+                    creneaux: Optional[List[str]] = None):
+        """
+        Après load_data : ne garde que ces morceaux, et les créneaux interdits coûtent
+        autant qu'une collision (sous-problème d'une décomposition, voir decomposition.py).
+        - figes : morceau -> créneau déjà décidés (fenêtre précédente de rolling_horizon.py).
+          Ils restent dans le problème pour compter dans la charge et les groupements, mais
+          tout autre créneau leur coûte une collision.
+        - creneaux : ne garder que ces créneaux (les voisins restent ceux du calendrier :
+          seuls des créneaux consécutifs dans le temps comptent comme voisins).
+        """
+        self.morceaux_figes = dict(figes or {})
+        garder = set(morceaux) | set(self.morceaux_figes)
+        self.morceaux = [m for m in self.morceaux if m in garder]
+        for musicien, liste in self._musicien_morceaux.items():
+            self._musicien_morceaux[musicien] = [m for m in liste if m in garder]
+        if creneaux is not None:
+            gardes = set(creneaux)
+            self.creneaux = [c for c in self.creneaux if c in gardes]
+            self.slot_index = {slot: i for i, slot in enumerate(self.creneaux)}
+            self.calendrier = self.calendrier.sous_calendrier(self.creneaux)
+            self.creneaux_par_jour = defaultdict(list, self.calendrier.creneaux_par_date)
+        self.creneaux_interdits = set(creneaux_interdits)
+        self.probleme = CompiledProblem.depuis_scheduler(self)
+        self._precalculer_couts_statiques()
+        self._calculer_borne_inferieure()
+    
+    def _calculer_borne_inferieure(self):
+        """
+        Borne inférieure du coût total à partir des seuls coûts statiques.
+        Sans collision, un créneau voisin porte au plus un morceau : le bonus d'un morceau est
+        au plus group_bonus x (nombre de voisins) x somme sur ses musiciens de leur plus
+        grande multiplicité, et la charge coûte au moins 0. Un morceau coûte donc au moins
+        max(0, statique - bonus maximal) sur un créneau, 1000 s'il reste non assigné, et
+        chaque créneau ne prend qu'un morceau : la borne est l'affectation optimale
+        morceaux -> créneaux avec ces coûts (une solution avec collision coûte 1e8 de toute façon).
+        """
+        from ortools.graph.python import linear_sum_assignment
+        
+        P = self.probleme
+        n, m = len(P.morceaux), len(P.creneaux)
+        if not n or not m:
+            self.borne_inferieure = 1000 * n
+            return
+        multiplicite_max = P.incidence.max(axis=0).astype(np.int64)
+        bonus_musiciens = (P.incidence > 0).astype(np.int64) @ multiplicite_max
+        n_voisins = (P.creneau_adjacents >= 0).sum(axis=1)
+        bonus_max = self.group_bonus * np.outer(bonus_musiciens, n_voisins)
+        couts = np.minimum(np.maximum(self.couts_statiques - bonus_max, 0), 1000)
+        
+        # Problème carré : morceaux + m lignes fictives, créneaux + une colonne "non assigné"
+        # par morceau (coût 1000) ; les lignes fictives prennent les places restantes gratuitement
+        morceaux, creneaux = np.divmod(np.arange(n * m), m)
+        fictives, colonnes = np.divmod(np.arange(m * (m + n)), m + n)
+        affectation = linear_sum_assignment.SimpleLinearSumAssignment()
+        affectation.add_arcs_with_cost(morceaux, creneaux, couts.ravel())
+        affectation.add_arcs_with_cost(np.arange(n), m + np.arange(n), np.full(n, 1000))
+        affectation.add_arcs_with_cost(n + fictives, colonnes, np.zeros(m * (m + n), dtype=np.int64))
+        if affectation.solve() == affectation.OPTIMAL:
+            self.borne_inferieure = int(affectation.optimal_cost())
+        else:
+            self.borne_inferieure = int(couts.min(axis=1).sum())
     
     def build_model(self):
         """Construit le modèle CSP"""
@@ -300,13 +310,26 @@ class OptimizedRepetitionScheduler:
         for morceau in self.morceaux:
             self.assignment[morceau] = None
             self.conflicts[morceau] = 0
+        self._delta = DeltaCostEngine(self)
+        self.morceaux_mobiles = [m for m in self.morceaux if m not in self.morceaux_figes]
     
     def calculate_conflicts(self, morceau: str, creneau: str) -> int:
         """Calcule le nombre de conflits pour assigner un morceau à un créneau."""
         cache_key = (morceau, creneau)
-        if cache_key in self._conflict_cache:
-            return self._conflict_cache[cache_key]
+        version = self._delta.version(morceau, creneau)
+        conflicts = self._conflict_cache.get(cache_key, version)
+        if conflicts is not None:
+            return conflicts
         
+        conflicts = self._delta.cout(morceau, creneau)
+        self._conflict_cache.put(cache_key, version, conflicts)
+        return conflicts
+    
+    def _calculer_conflits_complet(self, morceau: str, creneau: str) -> int:
+        """
+        Calcul de référence, en parcourant toute l'assignation.
+        Sert à vérifier DeltaCostEngine (voir delta_cost.py).
+        """
         conflicts = 0
         musiciens_morceau = self.repartition[morceau]
         
@@ -340,7 +363,7 @@ class OptimizedRepetitionScheduler:
                 conflicts += 100000000
         
         # 3. Conflits de charge quotidienne
-        jour = creneau.split("_")[0]
+        jour = self.calendrier.date_de[creneau]
         for musicien in musiciens_morceau:
             charge_jour = self._get_daily_load(musicien, jour, exclude_morceau=morceau)
             
@@ -352,42 +375,28 @@ class OptimizedRepetitionScheduler:
         
         # 4. Bonus pour groupements
         bonus = self._calculate_grouping_bonus(morceau, creneau)
-        conflicts = max(0, conflicts - bonus)
-        
-        self._conflict_cache[cache_key] = conflicts
-        return conflicts
+        return max(0, conflicts - bonus)
     
     def _get_daily_load(self, musicien: str, jour: str, exclude_morceau: str = None) -> int:
-        """Calcule la charge quotidienne d'un musicien."""
+        """Calcule la charge quotidienne d'un musicien (jour = date "LUN_04" du calendrier)."""
         charge = 0
+        date_de = self.calendrier.date_de
         for morceau in self._musicien_morceaux[musicien]:
             if morceau == exclude_morceau:
                 continue
             creneau = self.assignment.get(morceau)
-            if creneau and creneau.startswith(jour + "_"):
+            if creneau and date_de.get(creneau) == jour:
                 charge += 1
         return charge
     
     def _calculate_grouping_bonus(self, morceau: str, creneau: str) -> int:
-        """Calcule le bonus de groupement pour un morceau/créneau."""
+        """Calcule le bonus de groupement pour un morceau/créneau (créneaux consécutifs dans le temps)."""
         bonus = 0
-        jour = creneau.split("_")[0]
-        slots_jour = self.creneaux_par_jour[jour]
-        
-        if creneau not in slots_jour:
-            return 0
-            
-        creneau_idx = slots_jour.index(creneau)
-        
         for musicien in self.repartition[morceau]:
-            for offset in [-1, 1]:
-                adj_idx = creneau_idx + offset
-                if 0 <= adj_idx < len(slots_jour):
-                    adj_slot = slots_jour[adj_idx]
-                    
-                    for autre_morceau in self._musicien_morceaux[musicien]:
-                        if autre_morceau != morceau and self.assignment.get(autre_morceau) == adj_slot:
-                            bonus += self.group_bonus
+            for adj_slot in self.calendrier.voisins(creneau):
+                for autre_morceau in self._musicien_morceaux[musicien]:
+                    if autre_morceau != morceau and self.assignment.get(autre_morceau) == adj_slot:
+                        bonus += self.group_bonus
         
         return bonus
     
@@ -399,27 +408,29 @@ class OptimizedRepetitionScheduler:
                                key=lambda m: len(self.repartition[m]), 
                                reverse=True)
         
+        if not self.creneaux:
+            return self._update_conflicts()
+        
         for morceau in morceaux_tries:
-            best_creneau = None
-            min_conflicts = float('inf')
+            couts = self._delta.couts_morceau(morceau)
+            idx = int(couts.argmin())
             
-            for creneau in self.creneaux:
-                conflicts = self.calculate_conflicts(morceau, creneau)
-                if conflicts < min_conflicts:
-                    min_conflicts = conflicts
-                    best_creneau = creneau
-            
-            if best_creneau and min_conflicts < 1000:
-                self.assignment[morceau] = best_creneau
+            if couts[idx] < 1000:
+                self._delta.deplacer(morceau, self.creneaux[idx])
             
         self._update_conflicts()
     
-    def _update_conflicts(self):
-        """Met à jour le compteur de conflits pour tous les morceaux."""
-        self._conflict_cache.clear()
-        self.conflicts = {}
+    def _update_conflicts(self, morceaux=None):
+        """
+        Met à jour le compteur de conflits.
+        Sans argument, recalcule tous les morceaux ; sinon seulement ceux donnés
+        (ceux renvoyés par DeltaCostEngine.deplacer).
+        """
+        if morceaux is None:
+            self.conflicts = {}
+            morceaux = self.morceaux
         
-        for morceau in self.morceaux:
+        for morceau in morceaux:
             creneau = self.assignment.get(morceau)
             if creneau:
                 self.conflicts[morceau] = self.calculate_conflicts(morceau, creneau)
@@ -428,78 +439,90 @@ class OptimizedRepetitionScheduler:
     
     def min_conflicts_step(self) -> bool:
         """Effectue une étape de l'algorithme min-conflicts."""
-        morceaux_conflits = [(m, c) for m, c in self.conflicts.items() if c > 0]
+        # les morceaux figés (rolling horizon) ne bougent pas, même en conflit
+        morceaux_conflits = [(m, c) for m, c in self.conflicts.items() if c > 0 and m not in self.morceaux_figes]
         if not morceaux_conflits:
             return True
         
         morceaux_conflits.sort(key=lambda x: x[1], reverse=True)
         
         top_conflicted = morceaux_conflits[:min(3, len(morceaux_conflits))]
-        morceau = random.choice([m for m, _ in top_conflicted])
+        morceau = self._rng.choice([m for m, _ in top_conflicted])
         
+        # Le coût d'un morceau ne dépend pas de sa propre position : on évalue
+        # tous les créneaux d'un coup, l'option "non assigné" coûte 500
         best_creneau = None
-        min_conflicts = float('inf')
-        
-        options = self.creneaux + [None]
+        if self.creneaux:
+            couts = self._delta.couts_morceau(morceau)
+            idx = int(couts.argmin())
+            if couts[idx] <= 500:
+                best_creneau = self.creneaux[idx]
         
-        for creneau in options:
-            old_creneau = self.assignment[morceau]
-            self.assignment[morceau] = creneau
-            if creneau:
-                conflicts = self.calculate_conflicts(morceau, creneau)
-            else:
-                conflicts = 500
-            
-            if conflicts < min_conflicts:
-                min_conflicts = conflicts
-                best_creneau = creneau
-            
-            self.assignment[morceau] = old_creneau
+        # Mouvement composé (échange, chaîne, jour) seulement quand le déplacement simple ne
+        # fait pas baisser le coût total (min-conflicts est bloqué), et s'il fait mieux que lui.
+        # Les évaluer coûte cher (chaque candidat est appliqué puis annulé) : tentés à chaque
+        # étape, ils divisaient par 100 le nombre d'étapes par seconde
+        if self._voisinages:
+            delta_simple = 0
+            if best_creneau != self.assignment[morceau]:
+                delta_simple = self._voisinages.evaluateur.evaluer([(morceau, best_creneau)])
+            if delta_simple >= 0:
+                delta_compose, mouvement = self._voisinages.meilleur(self._rng, morceau)
+                if mouvement and delta_compose < min(0, delta_simple):
+                    self._voisinages.evaluateur.appliquer(mouvement)
+                    return False
         
         if best_creneau != self.assignment[morceau]:
-            self.assignment[morceau] = best_creneau
-            self._update_conflicts()
+            touches = self._delta.deplacer(morceau, best_creneau)
+            self._update_conflicts(touches)
         
         return False
     
     def solve(self):
         start_time = time.time()
+        deadline = start_time + self.generation_time_limit
         
-        best_solution = None
-        best_cost = float('inf')
+        if self.seeds is not None:
+            graines = list(self.seeds)
+        else:
+            generateur = random.Random(self.seed)
+            graines = [generateur.randrange(2**32) for _ in range(self.max_restarts)]
+        # [meilleur coût, rang de la graine, date de la dernière amélioration du coût]
+        incumbent = _MP_CONTEXTE.Array('d', [float('inf'), float('inf'), start_time])
+        print(f"📉 Borne inférieure : {self.borne_inferieure}")
         
-        for restart in range(self.max_restarts):
-            print(f"Restart {restart + 1}/{self.max_restarts}")
-            
-            if time.time() - start_time > self.generation_time_limit:
-                print("Limite de temps atteinte")
-                break
+        if self.workers > 1 and len(graines) > 1:
+            resultats = self._restarts_paralleles(graines, deadline, incumbent)
+        else:
+            resultats = self._restarts_sequentiels(graines, deadline, incumbent)
         
-            self.initialize_assignment()
-            
-            for iteration in range(self.max_iterations):
-                if time.time() - start_time > self.generation_time_limit:
-                    break
-                
-                if self.min_conflicts_step():
-                    print(f"Solution parfaite trouvée en {iteration} itérations!")
-                    self.status = "OPTIMAL"
-                    self._finalize_solution()
-                    return
-                            
-            current_cost = self._calculate_total_cost()
-            if current_cost < best_cost:
-                best_cost = current_cost
-                best_solution = dict(self.assignment)
-        
-        if best_solution:
-            self.assignment = best_solution
-            self.status = "FEASIBLE"
-            print(f"Meilleure solution trouvée avec un coût de {best_cost}")
+        self.historique_restarts = sorted(
+            ({k: r[k] for k in ("index", "graine", "strategie", "cout_initial", "cout", "iterations", "duree", "arret")}
+             for r in resultats), key=lambda r: r["index"])
+        self.trace_convergence = self._fusionner_traces(resultats, start_time)
+        
+        # Départage déterministe : coût puis ordre de la graine
+        best = min(resultats, key=lambda r: (r["cout"], r["index"])) if resultats else None
+        
+        if best:
+            self.assignment.update(best["assignment"])
+            self._delta.reinitialiser()
+            self._update_conflicts()
+            if best["parfait"]:
+                print(f"Solution parfaite trouvée en {best['iterations']} itérations!")
+                self.status = "OPTIMAL"
+            else:
+                self.status = "FEASIBLE"
+                print(f"Meilleure solution trouvée avec un coût de {best['cout']}")
         else:
             self.status = "INFEASIBLE"
             print("Aucune solution trouvée")
         
+        self.arret = self._raison_arret(best, resultats, len(graines), deadline)
+        if best:
+            print(f"📉 Arrêt : {self.arret}, écart à la borne {best['cout'] - self.borne_inferieure} "
+                  f"({self.ecart_relatif(best['cout']):.1%})")
+        
         self._finalize_solution()
         
         duration = time.time() - start_time
@@ -510,6 +533,13 @@ class OptimizedRepetitionScheduler:
         print(f"✅ {self.assigned} morceaux assignés sur {len(self.morceaux)}")
         print(f"✅ Conflits totaux: {total_conflicts}")
         
+        self.cache_stats = self._conflict_cache.stats()
+        if self.workers > 1:
+            self.cache_stats = self._cumuler_stats_cache(resultats)
+        print(f"🗃️ Cache conflits : {self.cache_stats['hits']} hits, {self.cache_stats['misses']} misses "
+              f"({self.cache_stats['hit_rate']:.0%}), {self.cache_stats['invalidations']} invalidations, "
+              f"{self.cache_stats['evictions']} évictions")
+        
         # NOUVEAU: Afficher les créneaux spéciaux utilisés
         if self.creneaux_speciaux:
             creneaux_utilises = [c for c in self.assignment.values() 
@@ -517,6 +547,270 @@ class OptimizedRepetitionScheduler:
             if creneaux_utilises:
                 print(f"🌟 Créneaux spéciaux : {self.creneaux_speciaux}, seuil={self.seuil_absence_creneau_special}")
     
+    def _vider_assignation(self):
+        """Remet tous les morceaux à None (départ d'un restart indépendant)."""
+        for morceau in self.morceaux:
+            self.assignment[morceau] = None
+        self._delta.reinitialiser()
+        self.conflicts = {morceau: 0 for morceau in self.morceaux}
+    
+    def ecart_relatif(self, cout: float) -> float:
+        """(coût - borne inférieure) / coût, 0 quand la borne est atteinte."""
+        return (cout - self.borne_inferieure) / cout if cout > 0 else 0.0
+    
+    def _ecart_ferme(self, cout: float) -> bool:
+        return cout <= self.borne_inferieure or self.ecart_relatif(cout) <= self.gap_tolerance
+    
+    def _incumbent_imbattable(self, incumbent, index: int) -> bool:
+        """
+        Un restart peut s'arrêter quand le meilleur coût partagé atteint la borne inférieure
+        et vient d'une graine de rang inférieur (elle gagnerait de toute façon le départage)
+        ou de lui-même (il ne peut plus rien gagner).
+        Ne dépend pas de l'ordre d'exécution, le résultat reste déterministe (avec
+        gap_tolerance > 0, on accepte de s'arrêter avant d'avoir prouvé l'optimum).
+        """
+        with incumbent.get_lock():
+            cout, rang = incumbent[0], incumbent[1]
+        return self._ecart_ferme(cout) and rang <= index
+    
+    def _arret_demande(self) -> bool:
+        """L'utilisateur a accepté la solution courante (mode anytime)."""
+        return self._stream is not None and self._stream.arret_demande()
+    
+    def _stagnation_globale(self, incumbent) -> bool:
+        """Le meilleur coût, tous restarts confondus, n'a pas bougé depuis stagnation_seconds."""
+        if not self.stagnation_seconds:
+            return False
+        with incumbent.get_lock():
+            derniere_amelioration = incumbent[2]
+        return time.time() - derniere_amelioration > self.stagnation_seconds
+    
+    def _publier_incumbent(self, incumbent, cout: int, index: int):
+        """Met à jour le meilleur coût partagé ; une amélioration stricte part aussi dans le stream."""
+        with incumbent.get_lock():
+            ameliore = cout < incumbent[0]
+            if ameliore:
+                incumbent[2] = time.time()
+            if (cout, index) < (incumbent[0], incumbent[1]):
+                incumbent[0] = cout
+                incumbent[1] = index
+        if ameliore and self._stream is not None:
+            self._stream.publier(cout, self.assignment, self.engine)
+    
+    @staticmethod
+    def _fusionner_traces(resultats: List[Dict], debut: float) -> List[Tuple[float, int]]:
+        """Meilleur coût global au cours du temps, à partir des améliorations de chaque restart."""
+        points = sorted(p for r in resultats for p in r["trace"])
+        trace = []
+        for t, cout in points:
+            if not trace or cout < trace[-1][1]:
+                trace.append((round(max(0.0, t - debut), 3), cout))
+        return trace
+    
+    def _raison_arret(self, best: Optional[Dict], resultats: List[Dict], n_graines: int,
+                      deadline: float) -> str:
+        if best is None:
+            return "temps"
+        if best["parfait"]:
+            return "parfait"
+        if self._ecart_ferme(best["cout"]):
+            return "borne"
+        if self._arret_demande():
+            return "accepte"
+        if any(r["arret"] == "stagnation_globale" for r in resultats) or \
+                (len(resultats) < n_graines and time.time() <= deadline):
+            return "stagnation"
+        if time.time() > deadline or any(r["arret"] == "temps" for r in resultats):
+            return "temps"
+        return "restarts"
+    
+    def _executer_restart(self, index: int, graine: int, deadline: float, incumbent,
+                          meilleure: Optional[Dict[str, Optional[str]]] = None) -> Optional[Dict]:
+        """
+        Un restart complet (construction + min-conflicts) à partir d'une graine donnée.
+        Le premier restart part de la solution précédente s'il y en a une (warm_start),
+        sinon de l'initialisation gloutonne ; les suivants de la stratégie choisie
+        (meilleure = point de départ pour "ils").
+        """
+        if time.time() > deadline or self._incumbent_imbattable(incumbent, index) \
+                or self._stagnation_globale(incumbent) or self._arret_demande():
+            return None
+        
+        debut = time.time()
+        self._rng.seed(graine)
+        self._vider_assignation()
+        if index > 0:
+            strategie = self._strategie
+        elif self.warm_start:
+            strategie = WarmStartRestart()
+        else:
+            strategie = GreedyRestart()
+        strategie.construire(self, self._rng, meilleure)
+        cout_initial = self._calculate_total_cost()
+        
+        # Tabou et recuit acceptent des mouvements qui dégradent : on garde le meilleur état vu
+        self._moteur.demarrer()
+        meilleur_cout, meilleure_assignation = self._cout_courant(), dict(self.assignment)
+        # Chaque amélioration est publiée tout de suite : la stagnation globale se mesure
+        # sur le meilleur coût réellement atteint, pas seulement en fin de restart
+        self._publier_incumbent(incumbent, meilleur_cout, index)
+        trace = [(time.time(), meilleur_cout)]
+        parfait = False
+        arret = "iterations"
+        iteration = derniere_amelioration = 0
+        for iteration in range(self.max_iterations):
+            if time.time() > deadline:
+                arret = "temps"
+                break
+            if iteration % 200 == 0:
+                if self._incumbent_imbattable(incumbent, index):
+                    arret = "borne"
+                    break
+                if self._stagnation_globale(incumbent):
+                    arret = "stagnation_globale"
+                    break
+                if self._arret_demande():
+                    arret = "accepte"
+                    break
+            if self._moteur.step():
+                parfait = True
+                arret = "parfait"
+                meilleur_cout = self._cout_courant()
+                trace.append((time.time(), meilleur_cout))
+                break
+            cout = self._cout_courant()
+            if cout < meilleur_cout:
+                meilleur_cout, meilleure_assignation = cout, dict(self.assignment)
+                derniere_amelioration = iteration
+                trace.append((time.time(), cout))
+                self._publier_incumbent(incumbent, cout, index)
+            elif self.stagnation_iterations and iteration - derniere_amelioration >= self.stagnation_iterations:
+                arret = "stagnation"
+                break
+        
+        if not parfait and self._cout_courant() > meilleur_cout:
+            for morceau, creneau in meilleure_assignation.items():
+                self._delta.deplacer(morceau, creneau)
+            self._update_conflicts()
+        
+        cout = self._calculate_total_cost()
+        self._publier_incumbent(incumbent, cout, index)
+        return {
+            "index": index,
+            "graine": graine,
+            "strategie": strategie.nom,
+            "moteur": self.engine,
+            "cout_initial": cout_initial,
+            "duree": round(time.time() - debut, 3),
+            "cout": cout,
+            "parfait": parfait,
+            "iterations": iteration,
+            "assignment": dict(self.assignment),
+            "trace": trace,
+            "arret": arret,
+            "pid": os.getpid(),
+            "cache": self._conflict_cache.stats(),
+        }
+    
+    def _restarts_sequentiels(self, graines: List[int], deadline: float, incumbent) -> List[Dict]:
+        resultats = []
+        for index, graine in enumerate(graines):
+            print(f"Restart {index + 1}/{len(graines)}")
+            if time.time() > deadline:
+                print("Limite de temps atteinte")
+                break
+            if self._stagnation_globale(incumbent):
+                print(f"Pas d'amélioration depuis {self.stagnation_seconds}s, arrêt")
+                break
+            if self._arret_demande():
+                print("Solution acceptée par l'utilisateur, arrêt")
+                break
+            meilleure = min(resultats, key=lambda r: (r["cout"], r["index"]))["assignment"] if resultats else None
+            resultat = self._executer_restart(index, graine, deadline, incumbent, meilleure)
+            if resultat:
+                print(f"   {resultat['strategie']} : coût initial {resultat['cout_initial']} -> {resultat['cout']}")
+                resultats.append(resultat)
+                if resultat["parfait"]:
+                    break
+        return resultats
+    
+    def _restarts_paralleles(self, graines: List[int], deadline: float, incumbent) -> List[Dict]:
+        """
+        Portefeuille de restarts répartis sur self.workers processus. Chaque restart ne dépend
+        que de sa graine et de son point de départ ; le meilleur coût est partagé via
+        incumbent pour couper les restarts qui ne peuvent plus gagner.
+        Avec "ils", le point de départ est la meilleure solution des restarts précédents :
+        pour qu'il ne dépende pas du processus qui a pris la tâche, les restarts partent par
+        lots (le restart 0 seul, puis self.workers à la fois) et chaque lot part du meilleur
+        des lots déjà terminés, choisi ici, comme en séquentiel.
+        Le démarrage des processus compte dans la limite de temps (deadline est une date) ;
+        les workers s'arrêtent _MARGE_PARALLELE secondes avant, le temps de renvoyer leurs
+        résultats, et on n'attend pas que les processus spawn se terminent (près d'une
+        seconde pour décharger pandas et ortools) : ils n'ont plus rien à faire.
+        """
+        taille = min(self.workers, len(graines))
+        if self._strategie.depend_du_meilleur:
+            lots = [range(0, 1)] + [range(i, min(i + taille, len(graines))) for i in range(1, len(graines), taille)]
+        else:
+            lots = [range(len(graines))]
+        deadline_workers = deadline - _MARGE_PARALLELE
+        resultats = []
+        pool = ProcessPoolExecutor(max_workers=taille,
+                                   mp_context=_MP_CONTEXTE,
+                                   initializer=_init_worker_restarts,
+                                   initargs=(self, incumbent))
+        try:
+            for lot in lots:
+                if time.time() > deadline_workers or any(r["parfait"] for r in resultats):
+                    break
+                meilleure = min(resultats, key=lambda r: (r["cout"], r["index"]))["assignment"] if resultats else None
+                futures = [pool.submit(_worker_restart, index, graines[index], deadline_workers, meilleure)
+                           for index in lot]
+                for future in as_completed(futures):
+                    resultat = future.result()
+                    if resultat:
+                        print(f"Restart {resultat['index'] + 1}/{len(graines)} (pid {resultat['pid']}) : "
+                              f"{resultat['strategie']}, coût initial {resultat['cout_initial']} -> {resultat['cout']}")
+                        resultats.append(resultat)
+        finally:
+            pool.shutdown(wait=False, cancel_futures=True)
+        return resultats
+    
+    @staticmethod
+    def _cumuler_stats_cache(resultats: List[Dict]) -> Dict[str, float]:
+        """Les stats du cache sont cumulatives par processus : on garde la dernière de chaque worker."""
+        par_pid = {}
+        for r in resultats:
+            if r["pid"] not in par_pid or r["cache"]["hits"] + r["cache"]["misses"] > \
+                    par_pid[r["pid"]]["hits"] + par_pid[r["pid"]]["misses"]:
+                par_pid[r["pid"]] = r["cache"]
+        stats = {k: sum(c[k] for c in par_pid.values())
+                 for k in ("hits", "misses", "invalidations", "evictions", "size")}
+        total = stats["hits"] + stats["misses"]
+        stats["hit_rate"] = stats["hits"] / total if total else 0.0
+        return stats
+    
+    def __getstate__(self):
+        # Pour l'envoi aux workers : les defaultdict(lambda) et le moteur ne sont pas picklables,
+        # ils sont reconstruits de l'autre côté (build_model)
+        etat = self.__dict__.copy()
+        etat["absent_participants"] = {}
+        etat["_delta"] = None
+        etat["_conflict_cache"] = None
+        return etat
+    
+    def __setstate__(self, etat):
+        self.__dict__.update(etat)
+        self.absent_participants = defaultdict(lambda: defaultdict(list))
+        self._conflict_cache = VersionedConflictCache(self.cache_size)
+    
+    def _cout_courant(self) -> int:
+        """Même valeur que _calculate_total_cost, lue dans self.conflicts (tenu à jour par le moteur delta)."""
+        total = 0
+        for morceau, creneau in self.assignment.items():
+            total += self.conflicts[morceau] if creneau else 1000
+        return total
+    
     def _calculate_total_cost(self) -> int:
         """Calcule le coût total de la solution actuelle."""
         total = 0
@@ -532,14 +826,27 @@ class OptimizedRepetitionScheduler:
         self.solution = {}
         self.musiciens_absents_force.clear()
         
+        P = self.probleme
         for morceau, creneau in self.assignment.items():
             if creneau:
                 self.solution[morceau] = creneau
                 
-                for musicien in self.repartition[morceau]:
-                    dispo = self.disponibilites.get(musicien, {}).get(creneau, "no")
-                    if dispo in ["non", "no"]:
-                        self.musiciens_absents_force[morceau].add(musicien)
+                p, c = P.morceau_id[morceau], P.creneau_id[creneau]
+                if self.absents_matrice[p, c]:
+                    musiciens_ids = P.musiciens_de[p]
+                    absents = musiciens_ids[P.disponibilite[musiciens_ids, c] == DISPO_NON]
+                    self.musiciens_absents_force[morceau].update(P.musiciens[i] for i in absents)
+    
+    def adopter_solution(self, assignation: Dict[str, Optional[str]]):
+        """Prend une assignation calculée ailleurs (décomposition) comme solution finale."""
+        self.build_model()
+        for morceau in self.morceaux:
+            self.assignment[morceau] = assignation.get(morceau)
+        self._delta.reinitialiser()
+        self._update_conflicts()
+        self._finalize_solution()
+        self.assigned = len(self.solution)
+        self.status = "FEASIBLE" if self.solution else "INFEASIBLE"
     
     def generer_planning(self):
         """Interface compatible avec l'ancien code."""
@@ -555,23 +862,10 @@ class OptimizedRepetitionScheduler:
         filename = f"{base_filename}_maybe{self.maybe_penalty}_load{self.max_load}_abs{self.seuil_absence}_timeout{self.generation_time_limit}.xlsx"
         path = os.path.join(directory, filename)
         
-        DAY_ORDER = {"Lundi":1, "Mardi":2, "Mercredi":3, "Jeudi":4,"Vendredi":5,"Samedi":6,"Dimanche":7, 
-                    "LUN":1, "MAR":2, "MER":3, "JEU":4, "VEN":5, "SAM":6, "DIM":7}
-        DAY_NAMES = {"LUN":"Lundi", "MAR":"Mardi", "MER":"Mercredi", "JEU":"Jeudi", 
-                    "VEN":"Vendredi", "SAM":"Samedi", "DIM":"Dimanche"}
 
         def slot_sort_key(slot):
-            jour, heures = format_slot(slot)
-            reel_jour = jour.split(" ")[0]
-            return (DAY_ORDER[reel_jour], heures)
-
-        def format_slot(slot: str) -> tuple[str,str]:
-            try:
-                jour_code, date_num, periode = slot.split("_")
-            except ValueError:
-                return slot, ""
-            jour_aff = DAY_NAMES.get(jour_code, jour_code)
-            return f"{jour_aff} {date_num}", periode
+            # ordre chronologique du calendrier (date puis heure), pas seulement le jour de la semaine
+            return self.calendrier.ordre.get(slot, len(self.creneaux))
 
         planning_rows = []
         for morceau in self.morceaux:
@@ -585,7 +879,7 @@ class OptimizedRepetitionScheduler:
                     })
             else:
                 slot = self.solution[morceau]
-                jour, heures = format_slot(slot)
+                jour, heures = creneau(slot).affichage
                 planning_rows.append({
                     "Morceau": morceau,
                     "Jour": jour,
@@ -595,10 +889,10 @@ class OptimizedRepetitionScheduler:
         df_planning = pd.DataFrame(planning_rows)
         
         if not df_planning.empty:
-            df_planning["jour_order"] = df_planning["Jour"].apply(
-                lambda x: DAY_ORDER.get(x.split(" ")[0], 99) if x != "Non assigné" else 100
+            df_planning["jour_order"] = df_planning["Morceau"].map(
+                lambda m: slot_sort_key(self.solution[m]) if m in self.solution else len(self.creneaux)
             )
-            df_planning.sort_values(["jour_order", "Heures"], inplace=True)
+            df_planning.sort_values("jour_order", kind="stable", inplace=True)
             df_planning.drop("jour_order", axis=1, inplace=True)
 
         musiciens = sorted(self.musiciens)
@@ -606,13 +900,11 @@ class OptimizedRepetitionScheduler:
         repart_dfs = {}
 
         for w in self.weeks:
-            week_slots = [s for s in self.creneaux
-                        if self.date2week[int(s.split("_")[1])] == w]
-            week_slots = sorted(week_slots, key=slot_sort_key)
+            week_slots = self.calendrier.creneaux_de_semaine(w)
 
             dispo_rows = []
             for slot in week_slots:
-                jour, heures = format_slot(slot)
+                jour, heures = creneau(slot).affichage
                 row = {"Jour": jour, "Heures": heures}
                 for m in musiciens:
                     row[m] = self.disponibilites.get(m, {}).get(slot, "no")
@@ -622,7 +914,7 @@ class OptimizedRepetitionScheduler:
 
             repart_rows = []
             for slot in week_slots:
-                jour, heures = format_slot(slot)
+                jour, heures = creneau(slot).affichage
                 piece = next((p for p,s in self.solution.items() if s==slot), None)
                 row = {"Jour": jour, "Heures": heures, "Morceau": piece or ""}
                 for m in musiciens:
@@ -709,21 +1001,6 @@ class OptimizedRepetitionScheduler:
         return path
 
     def get_json_data(self):
-        DAY_ORDER = {"Lundi":1, "Mardi":2, "Mercredi":3, "Jeudi":4,"Vendredi":5,"Samedi":6,"Dimanche":7, "LUN":1, "MAR":2, "MER":3, "JEU":4, "VEN":5, "SAM":6, "DIM":7}
-        DAY_NAMES = {"LUN":"Lundi", "MAR":"Mardi", "MER":"Mercredi", "JEU":"Jeudi", "VEN":"Vendredi", "SAM":"Samedi", "DIM":"Dimanche"}
-
-        def slot_sort_key(slot):
-            jour, heures = format_slot(slot)
-            reel_jour = jour.split(" ")[0]
-            return (DAY_ORDER[reel_jour], heures)
-
-        def format_slot(slot: str) -> tuple[str,str]:
-            try:
-                jour_code, date_num, periode = slot.split("_")
-            except ValueError:
-                return slot, ""
-            jour_aff = DAY_NAMES.get(jour_code, jour_code)
-            return f"{jour_aff} {date_num}", periode
 
         planning = []
         for morceau in self.morceaux:
@@ -736,11 +1013,13 @@ class OptimizedRepetitionScheduler:
                 })
             else:
                 slot = self.solution[morceau]
-                jour, heures = format_slot(slot)
+                jour, heures = creneau(slot).affichage
                 planning.append({
                     "Morceau": morceau,
                     "Jour":     jour,
                     "Heures":   heures,
+                    # semaine du calendrier (les mois comptés), pour les onglets du front
+                    "Semaine":  self.calendrier.semaine_de.get(slot),
                     "Participants": ", ".join(self.repartition.get(morceau, []))
                 })
 
@@ -749,22 +1028,20 @@ class OptimizedRepetitionScheduler:
         repart_output  = {}
 
         for w in self.weeks:
-            week_slots = [s for s in self.creneaux
-                        if self.date2week[int(s.split("_")[1])] == w]
-            week_slots = sorted(week_slots, key=slot_sort_key)
+            week_slots = self.calendrier.creneaux_de_semaine(w)
 
             dispo_rows  = []
             repart_rows = []
 
             for slot in week_slots:
-                jour, heures = format_slot(slot)
+                jour, heures = creneau(slot).affichage
                 row = {"Jour": jour, "Heures": heures}
                 for m in musiciens:
                     row[m] = self.disponibilites.get(m, {}).get(slot, "no")
                 dispo_rows.append(row)
 
             for slot in week_slots:
-                jour, heures = format_slot(slot)
+                jour, heures = creneau(slot).affichage
                 piece = next((p for p,s in self.solution.items() if s==slot), None)
                 row = {"Jour": jour, "Heures": heures, "Morceau": piece or ""}
                 for m in musiciens:
@@ -790,5 +1067,30 @@ class OptimizedRepetitionScheduler:
             "repartition":     repart_output,
             "assigned": self.assigned,
             "total": len(self.morceaux),
-            "notassigned": self.notassigned
-        }
\ No newline at end of file
+            "notassigned": self.notassigned,
+            "restarts": self.historique_restarts,
+            "seed": self.seed,
+            "convergence": {
+                "trace": self.trace_convergence,
+                "borne_inferieure": self.borne_inferieure,
+                "ecart": self.ecart_relatif(self.trace_convergence[-1][1]) if self.trace_convergence else None,
+                "arret": self.arret,
+            }
+        }
+
+
+# --- Workers pour les restarts parallèles (fonctions de module pour être picklables) ---
+_PLANNER_WORKER: Optional[OptimizedRepetitionScheduler] = None
+_INCUMBENT_WORKER = None
+
+
+def _init_worker_restarts(planner: OptimizedRepetitionScheduler, incumbent):
+    global _PLANNER_WORKER, _INCUMBENT_WORKER
+    planner.build_model()
+    _PLANNER_WORKER = planner
+    _INCUMBENT_WORKER = incumbent
+
+
+def _worker_restart(index: int, graine: int, deadline: float,
+                    meilleure: Optional[Dict[str, Optional[str]]] = None) -> Optional[Dict]:
+    return _PLANNER_WORKER._executer_restart(index, graine, deadline, _INCUMBENT_WORKER, meilleure)
@@ -5,12 +5,40 @@ Anno : 43
 Auteur : Mateo Bauvir
 """
 
+import numpy as np
 import pandas as pd
 from ortools.sat.python import cp_model
-import re
 from collections import defaultdict
+from typing import Dict, Optional
+import threading
 import time
 
+from calendar_index import CalendarIndex
+from compiled_problem import CompiledProblem, DISPO_NON
+from cpsat_profiles import PROFIL_DEFAUT, appliquer_profil, parametres_profil
+from ingestion import charger
+from parse_cache import cache_par_defaut
+from slot import creneau
+from symmetry import canonicaliser, classes_jours, classes_morceaux, poids_lex
+from warm_start import charger_solution
+
+
+class _IncumbentCallback(cp_model.CpSolverSolutionCallback):
+    """Publie chaque solution trouvée par CP-SAT dans le stream (mode anytime)."""
+
+    def __init__(self, scheduler, stream):
+        super().__init__()
+        self.scheduler = scheduler
+        self.stream = stream
+
+    def on_solution_callback(self):
+        assignment = self.scheduler._lire_assignation(self.BooleanValue)
+        # objectif pondéré, même quand le solveur minimise une autre expression (mode lexicographique)
+        self.stream.publier(self.Value(self.scheduler.objectif), assignment, "cp-sat")
+        if self.stream.arret_demande():
+            self.StopSearch()
+
+
 class RepetitionScheduler:
     def __init__(self,
                  repartitions_file: str,
@@ -21,16 +49,29 @@ class RepetitionScheduler:
                  group_bonus: int,
                  mode_absence: str = "strict",
                  seuil_absence: int = 0,
-                 generation_time_limit: int = 30):
+                 generation_time_limit: int = 30,
+                 stream=None,
+                 warm_start=None,
+                 profil: str = PROFIL_DEFAUT,
+                 workers: Optional[int] = None,
+                 parametres_cpsat: Optional[Dict] = None,
+                 symetries: bool = True):
         """
         Args:
             repartitions_file: Fichier Excel des répartitions donc avec les morceaux et participants
             disponibilites_file: Fichier Excel (avec Cally normalement) avec les disponibilités de chacun
+            stream: IncumbentStream (voir anytime.py) qui reçoit chaque solution de CP-SAT ;
+                stream.arreter() interrompt la recherche avec la meilleure solution trouvée
+            warm_start: solution précédente (dict morceau -> créneau ou planning JSON, voir
+                warm_start.py ; un fichier exporté se lit avec charger_fichier_solution),
+                donnée à CP-SAT comme indice (AddHint)
+            profil: réglages de CP-SAT, "fast", "balanced" ou "prove-optimal" (voir cpsat_profiles.py)
+            workers: threads de CP-SAT, None = selon les cœurs disponibles (quota cgroup compris)
+            parametres_cpsat: SatParameters en plus, par nom (ex. {"symmetry_level": 0})
+            symetries: casse les symétries entre morceaux et jours interchangeables (voir symmetry.py)
         """
         self.repartitions_file = repartitions_file
         self.disponibilites_file = disponibilites_file
-        self.repartitions_df = pd.read_excel(repartitions_file)
-        self.disponibilites_df = pd.read_excel(disponibilites_file)
 
         self.musiciens = set()          # Liste des musiciens : ["Adèle", "Antoine", "Bastien...lol...bonhomme qui sourit à pleine dents"]
         self.musiciens_absents_force = defaultdict(set)  # morceau -> {musiciens absents mais contraints}
@@ -45,7 +86,11 @@ class RepetitionScheduler:
         
         self.creneaux = []              # Liste des créneaux : ["V_2_8-10", "S_1_14-16"]
         self.slot_index = {}            # transfo des créneaux en index {"V_1_8-10": 0, "V_1_10-14": 1, ...}  
-        self.creneaux_par_jour = defaultdict(list)  # Créneaux par jour : {"LUN_0": ["LUN_0_8-10", "LUN_0_10-12"], ...}
+        self.creneaux_par_jour = defaultdict(list)  # Créneaux par date : {"LUN_04": ["LUN_04_08:00-10:00", ...], ...}
+        self.calendrier = None          # CalendarIndex : dates, créneaux consécutifs, semaines (load_data)
+        self.weeks = []
+        self._musicien_morceaux = defaultdict(list)  # musicien -> [morceaux]
+        self.probleme = None            # CompiledProblem (indices entiers + matrices), construit dans load_data
         
         # Modele COP
         self.model = cp_model.CpModel()
@@ -53,9 +98,20 @@ class RepetitionScheduler:
         self.status = None  # Statut de la résolution
 
         # Variables de décision
-        self.assignments = {}  # morceau -> index du créneau
+        self.x = []            # x[p][s] : morceau d'indice p au créneau d'indice s
+        self.non_assigne = []  # non_assigne[p] : morceau d'indice p sans créneau
+        self.temps_construction = 0.0
+        self.domaines = []             # p -> créneaux possibles (presolve_disponibilites)
+        self.couts_fixes = None        # pénalités "peut-être" morceaux x créneaux
+        self.morceaux_sans_creneau = []
 
         self.penalties = [] # Liste des pénalités en foncton des critères d'optimisation
+        self.surcharges = []  # BoolVars (musicien, date) surchargés, aussi dans penalties
+        self.blocs = []       # BoolVars des répétitions groupées, aussi dans penalties
+        self.objectif = None          # expression minimisée (define_objective)
+        self.objectif_indice = None   # objectif de la solution donnée en indice (warm start)
+        self.valeur_objectif = None   # objectif de la solution retenue
+        self.borne_objectif = None    # meilleure borne inférieure prouvée par CP-SAT
         self.solution = {}
 
         # Parmètre de pénalités
@@ -67,363 +123,230 @@ class RepetitionScheduler:
         self.seuil_absence = seuil_absence
         self.T             = None
         self.generation_time_limit = generation_time_limit  # limite de temps laissé à la génération du planning
+        self._stream = stream
+        self.warm_start = charger_solution(warm_start) if warm_start is not None else None
+        self.profil = profil
+        self.workers = workers
+        self.parametres_cpsat = dict(parametres_cpsat or {})
+        parametres_profil(profil, workers, self.parametres_cpsat)  # erreur tout de suite si mal configuré
+        self.symetries = symetries
+        self.creneaux_interdits = set()  # créneaux réservés à d'autres morceaux (restreindre)
+        self.morceaux_figes = {}         # morceau -> créneau fixé par une fenêtre précédente (restreindre)
+        self.classes_morceaux = []  # [[p, ...]] morceaux interchangeables (build_model)
+        self.classes_jours = []     # [[[s, ...] par jour]] jours interchangeables
 
-    def transformer_simple(self, texte: str) -> Optional[Dict]:
-        """Transforme un texte de créneau en dictionnaire structuré."""
-        t = texte.strip().replace("\n", " ").replace("\r", " ")
-        m = re.search(r"(\w+\.)\s+(\d+).*?(\d{1,2}):(\d{2})\s*-\s*(\d{1,2}):(\d{2})", t)
-        if not m:
-            return None
-        
-        jour_txt, jour_chiffre, H1, M1, H2, M2 = m.groups()
-        jours = {
-            'lun.': 'LUN', 'mar.': 'MAR', 'mer.': 'MER',
-            'jeu.': 'JEU', 'ven.': 'VEN', 'sam.': 'SAM', 'dim.': 'DIM'
-        }
-        jour = jours.get(jour_txt.lower(), jour_txt.upper().rstrip('.'))
-        
-        return {
-            'jour': jour,
-            'date': int(jour_chiffre),
-            'h1': int(H1), 'm1': int(M1),
-            'h2': int(H2), 'm2': int(M2)
-        }
-    
     def load_data(self):
-        """Charge les données depuis les fichiers Excel."""
-        # print("Chargement des données...")
-        
-        # Charger les répartitions si le fichier existe
-        if hasattr(self, 'repartitions_file') and self.repartitions_file:
-            self.repartitions_df = pd.read_excel(self.repartitions_file)
-            instrument_cols = self.repartitions_df.columns[6:]
-                    
-            for _, row in self.repartitions_df.iterrows():
-                morceau = row['Titre']
-                if pd.isna(morceau):
-                    continue
-                                
-                has_musicians = any(not pd.isna(row[c]) for c in instrument_cols)
-                if not has_musicians:
-                    continue
-                                
-                self.morceaux.append(morceau)
-                self.repartition[morceau] = set()
-                            
-                for col in instrument_cols:
-                    cellule = row[col]
-                    if pd.isna(cellule):
-                        continue
-                                        
-                    for nom in str(cellule).split(','):
-                        nom = nom.strip()
-                        if nom:
-                            self.musiciens.add(nom)
-                            self.repartition[morceau].add(nom)
-                            self._musicien_morceaux[nom].append(morceau)
-        
-        # Charger les disponibilités
-        self.disponibilites_df = pd.read_excel(self.disponibilites_file)
-        all_dates = set()
-        
-        # Détecter c'est quel format
-        if 'Nom' in self.disponibilites_df.columns:
-            # ANCIEN FORMAT (que j'utilisais pour tester au début)
-            dispo_cols = self.disponibilites_df.columns[2:]
-            
-            for _, row in self.disponibilites_df.iterrows():
-                musicien = str(row['Nom']).strip().title()
-                if pd.isna(musicien) or not musicien:
-                    continue
-                                
-                self.disponibilites[musicien] = {}
-                            
-                for col in dispo_cols:
-                    info = self.transformer_simple(str(col))
-                    if not info:
-                        continue
-                                        
-                    d = info['date']
-                    j = info['jour']
-                    h1, m1, h2, m2 = info['h1'], info['m1'], info['h2'], info['m2']
-                    all_dates.add(d)
-                    start = f"{h1:02d}:{m1:02d}"
-                    end = f"{h2:02d}:{m2:02d}"
-                    slot = f"{j}_{d:02d}_{start}-{end}"
-                                    
-                    val = str(row[col]).strip().lower() if not pd.isna(row[col]) else "no"
-                    self.disponibilites[musicien][slot] = val
-        else:
-            # le format de cally
-            for idx, row in self.disponibilites_df.iterrows():
-                for col_idx, col in enumerate(self.disponibilites_df.columns[2:], start=2):  # Skip les 2 premières colonnes
-                    cell_value = str(row[col]) if not pd.isna(row[col]) else ""
-                    if cell_value and cell_value != "nan":
-                        if any(day in cell_value for day in ['lun.', 'mar.', 'mer.', 'jeu.', 'ven.', 'sam.', 'dim.']):
-                            clean_text = cell_value.replace('\n', ' ').replace('[93%]', '').strip()
-                            info = self.transformer_simple(clean_text)
-                            if info:
-                                d = info['date']
-                                j = info['jour']
-                                h1, m1, h2, m2 = info['h1'], info['m1'], info['h2'], info['m2']
-                                all_dates.add(d)
-                                start = f"{h1:02d}:{m1:02d}"
-                                end = f"{h2:02d}:{m2:02d}"
-                                slot = f"{j}_{d:02d}_{start}-{end}"
-                                self.creneaux.append(slot)
-            
-            # Deuxième étape: traiter les réponses des musiciens
-            for idx, row in self.disponibilites_df.iterrows():
-                if idx <= 3:  # Skip les lignes d'en-tête et de créneaux
-                    continue
-                    
-                first_col = str(row.iloc[0]).strip() if not pd.isna(row.iloc[0]) else ""
-                
-                # Vérifier si c'est une ligne de musicien (contient un email dans la 2ème colonne)
-                if len(row) > 1 and not pd.isna(row.iloc[1]) and '@' in str(row.iloc[1]):
-                    musicien = first_col.title()
-                    if musicien and musicien != 'Nan':
-                        self.musiciens.add(musicien)
-                        self.disponibilites[musicien] = {}
-                        
-                        
-                        # Parcourir les réponses (à partir de la colonne 2)
-                        for col_idx in range(2, len(row)):
-                            if col_idx - 2 < len(self.creneaux):  # Vérifier qu'on a un créneau correspondant
-                                slot = self.creneaux[col_idx - 2]
-                                val = str(row.iloc[col_idx]).strip().lower() if not pd.isna(row.iloc[col_idx]) else "no"
-                                
-                                if val in ['yes', 'oui']:
-                                    self.disponibilites[musicien][slot] = "yes"
-                                elif val in ['maybe', 'peut-être']:
-                                    self.disponibilites[musicien][slot] = "maybe"  
-                                else:
-                                    self.disponibilites[musicien][slot] = "no"
-            
-            # Si pas de morceaux définis, créer un morceau par défaut pour le nouveau format
-            if not self.morceaux and self.musiciens:
-                morceau_default = "Session_Planning"
-                self.morceaux.append(morceau_default)
-                self.repartition[morceau_default] = self.musiciens.copy()
-                
-                for musicien in self.musiciens:
-                    self._musicien_morceaux[musicien].append(morceau_default)
-        
+        """Charge les données depuis les fichiers Excel (lecture : voir ingestion.py, cache : parse_cache.py)."""
+        format_dispo = charger(self, cache_par_defaut())
+
         # Finalisation commune aux deux formats
         if self.disponibilites:
             premier = next(iter(self.disponibilites.values()))
                             
-            def _key(s):
-                _, dd, plage = s.split("_")
-                start, _ = plage.split("-")
-                h, m = start.split(":")
-                return (int(dd), int(h), int(m))
-            
-            # Pour l'ancien format, les créneaux sont extraits des disponibilités
-            if 'Nom' in self.disponibilites_df.columns:
-                self.creneaux = sorted(premier.keys(), key=_key)
-            else:
-                # Pour le nouveau format, les créneaux sont déjà extraits, on les trie juste
-                self.creneaux = sorted(self.creneaux, key=_key)
-                
+            # Pour l'ancien format, les créneaux sont extraits des disponibilités ; pour le
+            # nouveau, ils sont déjà extraits. Dans les deux cas dans l'ordre des colonnes,
+            # que le calendrier trie chronologiquement (changements de mois compris) en
+            # regroupant par date (tous les lundis de la saison ne font pas un seul jour)
+            self.calendrier = CalendarIndex(premier if format_dispo == "nom" else self.creneaux)
+            self.creneaux = list(self.calendrier.creneaux)
             self.slot_index = {slot: i for i, slot in enumerate(self.creneaux)}
-                            
-            # Regroupement par jour
-            for slot in self.creneaux:
-                jour = slot.split("_")[0]
-                self.creneaux_par_jour[jour].append(slot)
-                    
-            dates_sorted = sorted(all_dates)
-            if dates_sorted:
-                base = dates_sorted[0]
-                self.date2week = {d: ((d - base) // 7) + 1 for d in dates_sorted}
-                self.weeks = sorted(set(self.date2week.values()))
-            else:
-                self.weeks = []
-                    
+            self.creneaux_par_jour = defaultdict(list, self.calendrier.creneaux_par_date)
+            self.date2week = self.calendrier.date2week
+            self.weeks = self.calendrier.semaines
+        else:
+            self.calendrier = CalendarIndex([])
 
+        self.probleme = CompiledProblem.depuis_scheduler(self)
 
-    def define_variables(self):
+
+    def restreindre(self, morceaux, creneaux_interdits=(), figes=None, creneaux=None):
+        """
+        Après load_data : ne garde que ces morceaux et leur retire les créneaux interdits
+        (sous-problème d'une décomposition, voir decomposition.py).
+        - figes : morceau -> créneau déjà décidés (fenêtre précédente de rolling_horizon.py),
+          gardés dans le modèle à leur créneau pour la charge et les groupements
+        - creneaux : ne garder que ces créneaux
+        Les symétries sont coupées s'il y a des morceaux figés : l'ordre imposé aux
+        morceaux et aux jours interchangeables pourrait contredire leur place. Les créneaux
+        interdits, eux, séparent simplement les classes de jours (voir symmetry.py).
         """
-        - self.is_assigned[morceau] = BoolVar: 1 si on affecte le morceau à un slot
-        - self.assignments[morceau] = IntVar en [0..N], N == len(self.creneaux) => 
-            valeurs 0..N-1 = index de créneau, N = “pas affecté”
+        self.morceaux_figes = dict(figes or {})
+        garder = set(morceaux) | set(self.morceaux_figes)
+        self.morceaux = [m for m in self.morceaux if m in garder]
+        for musicien, liste in self._musicien_morceaux.items():
+            self._musicien_morceaux[musicien] = [m for m in liste if m in garder]
+        if creneaux is not None:
+            gardes = set(creneaux)
+            self.creneaux = [c for c in self.creneaux if c in gardes]
+            self.slot_index = {slot: i for i, slot in enumerate(self.creneaux)}
+            self.calendrier = self.calendrier.sous_calendrier(self.creneaux)
+            self.creneaux_par_jour = defaultdict(list, self.calendrier.creneaux_par_date)
+        self.creneaux_interdits = set(creneaux_interdits)
+        if self.morceaux_figes:
+            self.symetries = False
+        self.probleme = CompiledProblem.depuis_scheduler(self)
+
+    def _plafond_absences(self) -> Optional[int]:
+        """Nombre max d'absents ("non") connu avant la résolution, None si pas de plafond fixe."""
+        if self.mode_absence == "fixed":
+            return self.seuil_absence
+        if self.mode_absence == "strict":
+            return 0
+        return None
+
+    def presolve_disponibilites(self):
+        """
+        Avant de créer le modèle, à partir des seules disponibilités :
+        - self.domaines[p] : créneaux possibles du morceau p (absents <= plafond du mode)
+        - self.couts_fixes[p, s] : pénalité "peut-être" du morceau p au créneau s
+        - self.morceaux_sans_creneau : morceaux dont le domaine est vide, signalés tout de
+          suite (ils resteront non assignés) au lieu de laisser le solveur le découvrir
         """
-        self.is_assigned = {}
-        self.assignments = {}
+        P = self.probleme
+        absents, maybes = P.comptes_disponibilites()
+        plafond = self._plafond_absences()
 
-        domain_max = len(self.creneaux)  # valeur hors plage = “pas assigné”
-        for morceau in self.morceaux:
-            b = self.model.NewBoolVar(f"is_assigned_{morceau}")
-            self.is_assigned[morceau] = b
-            v = self.model.NewIntVar(0, domain_max, f"assignment_{morceau}")
-            self.assignments[morceau] = v
-            self.model.Add(v < domain_max).OnlyEnforceIf(b)
-            self.model.Add(v == domain_max).OnlyEnforceIf(b.Not())
+        if plafond is None:
+            possibles = np.ones(absents.shape, dtype=bool)
+        else:
+            possibles = absents <= plafond
+        interdits = [P.creneau_id[c] for c in self.creneaux_interdits if c in P.creneau_id]
+        possibles[:, interdits] = False
+        for morceau, creneau in self.morceaux_figes.items():
+            p = P.morceau_id[morceau]
+            possibles[p] = False
+            possibles[p, P.creneau_id[creneau]] = True
+        self.domaines = [np.flatnonzero(ligne).tolist() for ligne in possibles]
+        self.couts_fixes = self.maybe_penalty * maybes
+
+        self.morceaux_sans_creneau = [P.morceaux[p] for p, domaine in enumerate(self.domaines) if not domaine]
+        if P.creneaux and self.morceaux_sans_creneau:
+            print(f"⚠️ {len(self.morceaux_sans_creneau)} morceau(x) sans aucun créneau possible "
+                  f"(plus de {plafond} absent(s) partout) :")
+            for morceau in self.morceaux_sans_creneau:
+                p = P.morceau_id[morceau]
+                print(f"   - {morceau} : au mieux {absents[p].min()} absent(s)")
+        n_paires = sum(len(d) for d in self.domaines)
+        print(f"🔎 Presolve disponibilités : {n_paires}/{absents.size} couples (morceau, créneau) gardés")
 
+    def define_variables(self):
+        """
+        - self.x[p][s] = BoolVar: 1 si le morceau d'indice p est joué au créneau d'indice s,
+          seulement pour les créneaux de son domaine (dict s -> BoolVar)
+        - self.non_assigne[p] = BoolVar: 1 si le morceau n'a aucun créneau
+        Chaque morceau prend exactement une valeur parmi ses créneaux et "non assigné".
+        Toutes les contraintes et pénalités sont des sommes linéaires sur x.
+        """
+        P = self.probleme
+        self.x = []
+        self.non_assigne = []
+        self.morceaux_du_creneau = [[] for _ in P.creneaux]  # s -> [p] ayant s dans leur domaine
+        for p, morceau in enumerate(P.morceaux):
+            ligne = {s: self.model.NewBoolVar(f"x_{p}_{s}") for s in self.domaines[p]}
+            non_assigne = self.model.NewBoolVar(f"non_assigne_{p}")
+            self.model.AddExactlyOne(list(ligne.values()) + [non_assigne])
+            if morceau in self.morceaux_figes:
+                self.model.Add(non_assigne == 0)
+            self.x.append(ligne)
+            self.non_assigne.append(non_assigne)
+            for s in ligne:
+                self.morceaux_du_creneau[s].append(p)
+
+    def _presence(self, musicien_id: int, slot_idx: int):
+        """Somme linéaire : le musicien répète au créneau (au plus 1 grâce à add_slot_constraints)."""
+        x = self.x
+        return sum(x[p][slot_idx] for p in self._morceaux_ids_du_musicien[musicien_id] if slot_idx in x[p])
 
 
     # 1st constraint : dipsonibilité "oui" "non" "peut-être"
     def add_disponibility_constraints(self):
+        """
+        Le nombre d'absents ("non") d'un morceau sur un créneau ne dépend pas de
+        l'assignation : c'est une constante de CompiledProblem.comptes_disponibilites().
+        - "fixed" : au plus seuil_absence absents (0 = ancienne version, "non" interdit)
+        - "strict" : aucun "non"
+        - "auto" : au plus T absents, T minimisé dans l'objectif
+        - "flexible" : pas de plafond
+        Les plafonds fixes sont déjà appliqués par presolve_disponibilites (x n'existe que
+        sur le domaine) ; chaque "peut-être" coûte maybe_penalty (couts_fixes).
+        """
+        P = self.probleme
+        absents, _ = P.comptes_disponibilites()
+
         # si mode == "auto", on crée T = maxi d’absents autorisés sur un slot
         if self.mode_absence == "auto":
             # bornes 0…(nombre total de musiciens)
             total_mus = sum(len(mus) for mus in self.repartition.values())
             self.T = self.model.NewIntVar(0, total_mus, "T_max_abs")
 
-        if self.mode_absence == "fixed" and self.seuil_absence == 0: # ancienne version
-            for morceau, musiciens in self.repartition.items():
-                for musicien in musiciens:
-                    for slot in self.creneaux:
-                        slot_idx = self.slot_index[slot]
-                        is_dispo = self.disponibilites[musicien].get(slot, "non").lower()
-
-                        is_here = self.model.NewBoolVar(f"{morceau}_{slot}_is_here")
-                        self.model.Add(self.assignments[morceau] == slot_idx).OnlyEnforceIf(is_here)
-                        self.model.Add(self.assignments[morceau] != slot_idx).OnlyEnforceIf(is_here.Not())
-
-                        # Si dispo == non -> contrainte dure (seulement si le morceau est assigné)
-                        if is_dispo == "non":
-                            self.model.Add(self.assignments[morceau] != slot_idx).OnlyEnforceIf(self.is_assigned[morceau])
-
-                        # Si dispo == peut-être -> pénalité
-                        if is_dispo == "peut-être":
-                            penalty = self.model.NewIntVar(0, self.maybe_penalty, f"penalty_{morceau}_{slot}_{musicien}")
-                            self.model.Add(penalty == self.maybe_penalty).OnlyEnforceIf(is_here)
-                            self.model.Add(penalty == 0).OnlyEnforceIf(is_here.Not())
-                            self.penalties.append(penalty)
-        else:
-            for morceau, musiciens in self.repartition.items():
-                for slot in self.creneaux:
-                    slot_idx = self.slot_index[slot]
-                    is_here = self.model.NewBoolVar(f"{morceau}_{slot}_is_here")
-                    self.model.Add(self.assignments[morceau] == slot_idx).OnlyEnforceIf(is_here)
-                    self.model.Add(self.assignments[morceau] != slot_idx).OnlyEnforceIf(is_here.Not())
-                    
-                    absent_flags = []
-                    for musicien in musiciens:
-                        dispo = self.disponibilites[musicien].get(slot,"non").lower()
-                        if dispo == "oui":
-                            continue
-                        absent = self.model.NewBoolVar(f"{morceau}_{slot}_{musicien}_absent")
-                        self.model.Add(is_here == 1).OnlyEnforceIf(absent)
-                        self.model.Add(is_here == 0).OnlyEnforceIf(absent.Not())
-                        absent_flags.append(absent)
-                        # pénalités "non" / "peut-être"
-                        if dispo == "non":
-                            pen = self.model.NewIntVar(0,1, f"pen_non_{morceau}_{slot}_{musicien}")
-                            self.model.Add(pen == 1).OnlyEnforceIf(absent)
-                            self.model.Add(pen == 0).OnlyEnforceIf(absent.Not())
-                        else:
-                            pen = self.model.NewIntVar(0,self.maybe_penalty,
-                                                        f"pen_maybe_{morceau}_{slot}_{musicien}")
-                            self.model.Add(pen == self.maybe_penalty).OnlyEnforceIf(absent)
-                            self.model.Add(pen == 0).OnlyEnforceIf(absent.Not())
-                            self.penalties.append(pen)
-                            self.absent_participants.setdefault(morceau, {})\
-                                                    .setdefault(slot, []).append((musicien, absent))
-
-                    if not absent_flags:
-                        continue
-
-                    elif self.mode_absence == "fixed":
-                        sum_abs = self.model.NewIntVar(0, len(absent_flags),
-                                                    f"{morceau}_{slot}_sum_abs")
-                        self.model.Add(sum_abs == sum(absent_flags)).OnlyEnforceIf(is_here)
-                        self.model.Add(sum_abs <= self.seuil_absence).OnlyEnforceIf(is_here)
-
-                    else:
-                        sum_abs = self.model.NewIntVar(0, len(absent_flags),
-                                                    f"{morceau}_{slot}_sum_abs")
-                        self.model.Add(sum_abs == sum(absent_flags)).OnlyEnforceIf(is_here)
-                        self.model.Add(sum_abs <= self.T).OnlyEnforceIf(is_here)
+        for p, ligne in enumerate(self.x):
+            for s, x in ligne.items():
+                if self.mode_absence == "auto" and absents[p, s]:
+                    self.model.Add(self.T >= int(absents[p, s])).OnlyEnforceIf(x)
+                if self.couts_fixes[p, s]:
+                    self.penalties.append(int(self.couts_fixes[p, s]) * x)
 
 
     # 2nd: Un créneau n'accueille qu'un morceau
     def add_slot_constraints(self):
-        for slot in self.creneaux:
-            slot_idx = self.slot_index[slot]
-            is_assigned = []
-            for morceau in self.morceaux:
-                is_at_slot = self.model.NewBoolVar(f"{morceau}_is_at_{slot}")
-                self.model.Add(self.assignments[morceau] == slot_idx).OnlyEnforceIf(is_at_slot)
-                self.model.Add(self.assignments[morceau] != slot_idx).OnlyEnforceIf(is_at_slot.Not())
-                is_assigned.append(is_at_slot)
-            self.model.Add(sum(is_assigned) <= 1)
+        for s, morceaux in enumerate(self.morceaux_du_creneau):
+            if len(morceaux) > 1:
+                self.model.AddAtMostOne(self.x[p][s] for p in morceaux)
+
+    def _morceaux_du_musicien(self, musicien):
+        """Morceaux joués par un musicien, lus dans la matrice d'incidence."""
+        P = self.probleme
+        musicien_id = P.musicien_id.get(musicien)
+        if musicien_id is None:
+            return []
+        return [P.morceaux[p] for p in np.flatnonzero(P.incidence[:, musicien_id])]
 
     # 3rd: Eviter les journées trop chargées
     def add_daily_load_constraints(self):
-        for musicien in self.musiciens:
+        """Pénalité load_penalty par (musicien, date) où il répète plus de max_load créneaux."""
+        P = self.probleme
+        for musicien_id, musicien in enumerate(P.musiciens):
+            if not self._morceaux_ids_du_musicien[musicien_id]:
+                continue
             for jour, slots in self.creneaux_par_jour.items():
-                morceaux_du_musicien = [m for m in self.morceaux if musicien in self.repartition[m]]
-                occupied_slots = []
-                for slot in slots:
-                    present = self.model.NewBoolVar(f"{musicien}_present_{jour}_{slot}")
-                    clauses = []
-                    for morceau in morceaux_du_musicien:
-                        is_at_slot = self.model.NewBoolVar(f"{morceau}_is_at_{slot}")
-                        self.model.Add(self.assignments[morceau] == self.slot_index[slot]).OnlyEnforceIf(is_at_slot)
-                        self.model.Add(self.assignments[morceau] != self.slot_index[slot]).OnlyEnforceIf(is_at_slot.Not())
-                        clauses.append(is_at_slot)
-                    if clauses:
-                        self.model.AddMaxEquality(present,clauses)
-                    else:
-                        self.model.Add(present == 0)
-                    occupied_slots.append(present)
-                    nb_slots = self.model.NewIntVar(0, len(slots), f"nb_slots_{musicien}_{jour}")
-                    self.model.Add(nb_slots == sum(occupied_slots))
-                    # Pénalité si le musicien est surchargé
-                    is_overloaded = self.model.NewBoolVar(f"{musicien}_overloaded_{jour}")
-                    self.model.Add(nb_slots > self.max_load).OnlyEnforceIf(is_overloaded)
-                    self.model.Add(nb_slots <= self.max_load).OnlyEnforceIf(is_overloaded.Not())
-                    penalty = self.model.NewIntVar(0, self.load_penalty, f"penalty_{musicien}_{jour}")
-                    self.model.Add(penalty == self.load_penalty).OnlyEnforceIf(is_overloaded)
-                    self.model.Add(penalty == 0).OnlyEnforceIf(is_overloaded.Not())
-                    self.penalties.append(penalty)
+                if len(slots) <= self.max_load:
+                    continue
+                nb_slots = sum(self._presence(musicien_id, self.slot_index[slot]) for slot in slots)
+                if isinstance(nb_slots, int):
+                    continue
+                is_overloaded = self.model.NewBoolVar(f"{musicien}_overloaded_{jour}")
+                self.model.Add(nb_slots <= self.max_load + (len(slots) - self.max_load) * is_overloaded)
+                self.penalties.append(self.load_penalty * is_overloaded)
+                self.surcharges.append(is_overloaded)
 
     # 4th: Pénalités pour les répétitions groupées
     def add_penalites_repetitions_groupees(self):
-        for musicien in self.musiciens:
-            for jour, slots in self.creneaux_par_jour.items():
-                morceaux_joues = [m for m in self.morceaux if musicien in self.repartition[m]]
-                
-                presence = []
-                for slot in slots:
-                    slot_idx = self.slot_index[slot]
-                    var = self.model.NewBoolVar(f"{musicien}_{slot}_present")
-                    
-                    clauses = []
-                    for morceau in morceaux_joues:
-                        is_here = self.model.NewBoolVar(f"{morceau}_{slot}_is_at")
-                        self.model.Add(self.assignments[morceau] == slot_idx).OnlyEnforceIf(is_here)
-                        self.model.Add(self.assignments[morceau] != slot_idx).OnlyEnforceIf(is_here.Not())
-                        clauses.append(is_here)
-                    
-                    if clauses:
-                        self.model.AddMaxEquality(var, clauses)
-                    else:
-                        self.model.Add(var == 0)
-                    
-                    presence.append(var)
-                for i in range(len(presence) - 1):
-                    bloc = self.model.NewBoolVar(f"{musicien}_{jour}_bloc_{i}")
-                    self.model.AddBoolAnd([presence[i], presence[i + 1]]).OnlyEnforceIf(bloc)
-                    self.model.AddBoolOr([presence[i].Not(), presence[i + 1].Not()]).OnlyEnforceIf(bloc.Not())
-
-                    reward = self.model.NewIntVar(-self.group_bonus, 0, f"reward_bloc_{musicien}_{jour}_{i}")
-                    self.model.Add(reward == -self.group_bonus).OnlyEnforceIf(bloc)
-                    self.model.Add(reward == 0).OnlyEnforceIf(bloc.Not())
-                    self.penalties.append(reward)  
+        """
+        Bonus group_bonus par paire de créneaux consécutifs (même date, le second commence
+        quand le premier finit, voir calendar_index.py) où le musicien répète deux fois.
+        """
+        P = self.probleme
+        paires = [(self.slot_index[c], self.slot_index[s]) for c, s in self.calendrier.suivant.items() if s]
+        for musicien_id, musicien in enumerate(P.musiciens):
+            if not self._morceaux_ids_du_musicien[musicien_id]:
+                continue
+            for i, j in paires:
+                avant = self._presence(musicien_id, i)
+                apres = self._presence(musicien_id, j)
+                if isinstance(avant, int) or isinstance(apres, int):
+                    continue  # aucun morceau du musicien possible sur un des deux créneaux
+                # on minimise : bloc ne vaut 1 que si les deux présences le permettent
+                bloc = self.model.NewBoolVar(f"{musicien}_bloc_{i}")
+                self.model.Add(bloc <= avant)
+                self.model.Add(bloc <= apres)
+                self.penalties.append(-self.group_bonus * bloc)
+                self.blocs.append(bloc)
 
     def define_objective(self):
         penalty_not_assigned_weight = 1000
         # 1) penalty pour non‐assignés
-        for morceau in self.morceaux:
-            p = self.model.NewIntVar(0, penalty_not_assigned_weight,
-                                     f"penalite_non_assigne_{morceau}")
-            self.model.Add(p == penalty_not_assigned_weight).OnlyEnforceIf(self.is_assigned[morceau].Not())
-            self.model.Add(p == 0).OnlyEnforceIf(self.is_assigned[morceau])
-            self.penalties.append(p)
+        for non_assigne in self.non_assigne:
+            self.penalties.append(penalty_not_assigned_weight * non_assigne)
 
         # 2) si mode "auto", on minimise ensuite T
         objective = sum(self.penalties)
@@ -432,12 +355,21 @@ class RepetitionScheduler:
             objective = objective + self.T * W2
 
         # 3) on inclut toutes les pénalités "non"/"peut-être"
+        self.objectif = objective
         self.model.Minimize(objective)
 
     def build_model(self):
+        debut = time.time()
         # 1) (re)création du modèle
         self.model = cp_model.CpModel()
-        # 2) définir les variables
+        self.penalties = []
+        self.surcharges, self.blocs = [], []
+        self.T = None
+        P = self.probleme
+        self._morceaux_ids_du_musicien = [np.flatnonzero(P.incidence[:, m]).tolist()
+                                          for m in range(len(P.musiciens))]
+        # 2) domaines à partir des disponibilités, puis variables
+        self.presolve_disponibilites()
         self.define_variables()
 
         # 3) ajouter toutes les contraintes
@@ -448,28 +380,203 @@ class RepetitionScheduler:
 
         # 4) définir l'objectif
         self.define_objective()
+        if self.symetries:
+            self.add_symmetry_breaking()
+
+        # 5) solution précédente comme point de départ, complétée en solution entière
+        self.objectif_indice = None
+        if self.warm_start:
+            self.add_hints()
+            # pas plus d'un quart du budget : les fenêtres de rolling_horizon.py n'ont que quelques secondes
+            self.objectif_indice = self.completer_indices(min(5.0, max(1.0, self.generation_time_limit / 4)))
+        self.temps_construction = time.time() - debut
+
+    def add_symmetry_breaking(self):
+        """
+        Un seul représentant par orbite de symétrie (le même que symmetry.canonicaliser) :
+        - dans une classe de morceaux, les créneaux sont croissants dans l'ordre des morceaux
+          (non assigné = après tous les créneaux) ; deux morceaux ne partagent jamais un
+          créneau, donc <= suffit ;
+        - dans une classe de jours, l'occupation de chaque jour, lue comme un nombre binaire,
+          est >= celle du jour suivant de la classe (ordre lexicographique).
+        """
+        P = self.probleme
+        self.classes_morceaux = classes_morceaux(P)
+        interdits = {P.creneau_id[c] for c in self.creneaux_interdits if c in P.creneau_id}
+        self.classes_jours = classes_jours(P, self.creneaux_par_jour, interdits)
+        apres_tout = len(P.creneaux)
+
+        def position(p):
+            return sum(s * x for s, x in self.x[p].items()) + apres_tout * self.non_assigne[p]
+
+        for morceaux in self.classes_morceaux:
+            for p1, p2 in zip(morceaux, morceaux[1:]):
+                self.model.Add(position(p1) <= position(p2))
+
+        def occupation(s):
+            return sum(self.x[p][s] for p in self.morceaux_du_creneau[s])
+
+        for jours in self.classes_jours:
+            poids = poids_lex(len(jours[0]))
+            for jour1, jour2 in zip(jours, jours[1:]):
+                self.model.Add(sum(int(w) * occupation(s) for w, s in zip(poids, jour1))
+                               >= sum(int(w) * occupation(s) for w, s in zip(poids, jour2)))
+
+        n_morceaux = sum(len(c) for c in self.classes_morceaux)
+        n_jours = sum(len(c) for c in self.classes_jours)
+        print(f"🪞 Symétries : {len(self.classes_morceaux)} classe(s) de morceaux identiques ({n_morceaux} morceaux), "
+              f"{len(self.classes_jours)} classe(s) de jours identiques ({n_jours} jours)")
+
+    def add_hints(self) -> int:
+        """
+        Indices pour CP-SAT à partir de self.warm_start : x = 1 sur le créneau précédent,
+        0 ailleurs. Les morceaux dont l'ancien créneau n'est plus dans le domaine (une
+        disponibilité a changé) ou qui n'existent plus ne reçoivent pas d'indice.
+        Retourne le nombre de morceaux indiqués.
+        """
+        P = self.probleme
+        indices = {}
+        for morceau, creneau in self.warm_start.items():
+            p = P.morceau_id.get(morceau)
+            if p is None:
+                continue
+            s = P.creneau_id.get(creneau) if creneau else None
+            if creneau and s not in self.x[p]:
+                continue
+            indices[p] = s
+        if self.symetries:
+            # la solution précédente, ramenée sur le représentant gardé par add_symmetry_breaking
+            indices = canonicaliser(indices, self.classes_morceaux, self.classes_jours)
+
+        n_indices = 0
+        for p, s in indices.items():
+            if s is not None and s not in self.x[p]:
+                continue
+            for autre, x in self.x[p].items():
+                self.model.AddHint(x, autre == s)
+            self.model.AddHint(self.non_assigne[p], s is None)
+            n_indices += 1
+        print(f"💡 Warm start : {n_indices}/{len(P.morceaux)} morceaux repris de la solution précédente")
+        return n_indices
+
+    def completer_indices(self, temps_max: float = 5.0) -> Optional[int]:
+        """
+        Les indices de add_hints ne portent que sur x et non_assigne. On résout le modèle
+        avec ces valeurs fixées pour obtenir une solution complète (surcharges, blocs, T),
+        qui remplace les indices partiels : CP-SAT la prend telle quelle comme première
+        solution. Retourne son objectif, None si les indices ne donnent pas de solution
+        (on garde alors les indices partiels, que CP-SAT suit sans garantie).
+        Pas de repair_hint : avec ortools 9.15, StopSearch() pendant la réparation fait
+        planter le processus (arrêt du mode anytime).
+        """
+        solver = cp_model.CpSolver()
+        solver.parameters.fix_variables_to_their_hinted_value = True
+        solver.parameters.max_time_in_seconds = temps_max
+        solver.parameters.num_search_workers = 1
+        status = solver.Solve(self.model)
+        if status not in (cp_model.OPTIMAL, cp_model.FEASIBLE):
+            print(f"💡 Indices incomplétables ({solver.StatusName(status)}), on les garde partiels")
+            return None
 
+        self.model.ClearHints()
+        for i in range(len(self.model.Proto().variables)):
+            var = self.model.GetIntVarFromProtoIndex(i)
+            self.model.AddHint(var, solver.Value(var))
+        return int(round(solver.ObjectiveValue()))
 
-    def solve(self):
+    def ecart_optimalite(self) -> Optional[float]:
+        """(objectif - borne) / |objectif| de la dernière résolution, 0 si l'optimum est prouvé."""
+        if self.valeur_objectif is None or self.borne_objectif is None:
+            return None
+        if self.valeur_objectif == self.borne_objectif:
+            return 0.0
+        return (self.valeur_objectif - self.borne_objectif) / max(1.0, abs(self.valeur_objectif))
+
+    def statistiques_modele(self, presolve: bool = False) -> Dict[str, float]:
+        """
+        Taille du modèle construit (variables, contraintes, temps de construction) ;
+        avec presolve=True, lance aussi le presolve seul de CP-SAT et mesure son temps.
+        """
+        proto = self.model.Proto()
+        stats = {
+            "variables": len(proto.variables),
+            "contraintes": len(proto.constraints),
+            "termes_objectif": len(proto.objective.vars),
+            "classes_morceaux": len(self.classes_morceaux),
+            "classes_jours": len(self.classes_jours),
+            "temps_construction": round(self.temps_construction, 3),
+        }
+        if presolve:
+            solver = cp_model.CpSolver()
+            solver.parameters.stop_after_presolve = True
+            solver.parameters.num_search_workers = 1
+            debut = time.time()
+            solver.Solve(self.model)
+            stats["temps_presolve"] = round(time.time() - debut, 3)
+        return stats
+
+    def configurer_solveur(self, solver, temps_max: float) -> Dict:
+        """Limite de temps et paramètres du profil (threads compris) ; renvoie les paramètres appliqués."""
+        solver.parameters.max_time_in_seconds = temps_max
+        parametres = appliquer_profil(solver, self.profil, self.workers, self.parametres_cpsat)
+        print(f"⚙️ CP-SAT : profil {self.profil}, {parametres['num_workers']} worker(s)")
+        return parametres
+
+    def __getstate__(self):
+        # Pour les copies (rolling_horizon.py) : le modèle et le solveur ne se copient pas,
+        # ils sont recréés par build_model et solve
+        etat = self.__dict__.copy()
+        etat["model"] = etat["solver"] = None
+        etat["x"], etat["non_assigne"], etat["penalties"] = [], [], []
+        etat["surcharges"], etat["blocs"] = [], []
+        etat["objectif"] = etat["T"] = None
+        return etat
+
+    def __setstate__(self, etat):
+        self.__dict__.update(etat)
+        self.model = cp_model.CpModel()
+        self.solver = cp_model.CpSolver()
+
+    def _lire_assignation(self, valeur) -> Dict[str, Optional[str]]:
+        """Assignation morceau -> créneau (ou None) à partir d'une fonction valeur(var)."""
+        P = self.probleme
+        assignation = {}
+        for p, morceau in enumerate(P.morceaux):
+            assignation[morceau] = None
+            for s, x in self.x[p].items():
+                if valeur(x):
+                    assignation[morceau] = P.creneaux[s]
+                    break
+        return assignation
+
+
+    def solve(self, temps_max: Optional[float] = None):
         """
         Construit le modèle (via build_model), résout, et extrait :
         - status
         - solution dict morceau->slot
         - num_unassigned
         - total_penalty
+        temps_max remplace generation_time_limit (utilisé par le mode hybride, qui a déjà
+        consommé une partie du temps).
         """
 
         self.solver = cp_model.CpSolver()
-        self.solver.parameters.max_time_in_seconds = self.generation_time_limit
-        self.solver.parameters.num_search_workers = 8 # specifier le nbr de threads pour chercher la solution
+        self.configurer_solveur(self.solver, temps_max or self.generation_time_limit)
 
-        self.penalties = []
         self.musiciens_absents_force.clear()
+        self.valeur_objectif = self.borne_objectif = None
         self.build_model()
+        stats = self.statistiques_modele()
+        print(f"🧮 Modèle : {stats['variables']} variables, {stats['contraintes']} contraintes "
+              f"(construit en {stats['temps_construction']:.2f}s)")
 
         # --- Solve ---
         start = time.time()
-        status = self.solver.Solve(self.model)
+        if self._stream is not None:
+            status = self._solve_anytime()
+        else:
+            status = self.solver.Solve(self.model)
         duration = time.time() - start
         print(f"Solve status = {self.solver.StatusName(status)} en {duration:.1f}s")
         self.status = status  # stocker le statut pour l'export
@@ -481,30 +588,75 @@ class RepetitionScheduler:
         if status in (cp_model.OPTIMAL, cp_model.FEASIBLE):
             # récupérer la pénalité
             total_penalty = sum(self.solver.Value(p) for p in self.penalties)
+            self.valeur_objectif = self.solver.ObjectiveValue()
+            self.borne_objectif = self.solver.BestObjectiveBound()
 
-            for morceau in self.morceaux:
-                if self.solver.Value(self.is_assigned[morceau]):
-                    idx = self.solver.Value(self.assignments[morceau])
-                    slot = self.creneaux[idx]
-                    self.solution[morceau] = slot
-
-                    # repérer les absents forcés
-                    for (mus, flag) in self.absent_participants[morceau].get(slot, []):
-                        if self.solver.Value(flag):
-                            self.musiciens_absents_force[morceau].add(mus)
-                else:
-                    num_unassigned += 1
+            num_unassigned = self._enregistrer_solution(self._lire_assignation(self.solver.BooleanValue))
 
             print(f"✅ {len(self.solution)} assignés, {num_unassigned} non-assignés, pénalité totale = {total_penalty}")
+            print(f"📉 Objectif {self.valeur_objectif:.0f}, borne {self.borne_objectif:.0f} "
+                  f"(écart {self.ecart_optimalite():.1%})")
         else:
             print("⚠️ Aucune solution trouvée")
 
         return status, self.solution, num_unassigned, total_penalty
 
 
+    def _enregistrer_solution(self, assignation: Dict[str, Optional[str]]) -> int:
+        """Remplit self.solution et les absents forcés ; renvoie le nombre de non assignés."""
+        P = self.probleme
+        num_unassigned = 0
+        for morceau, slot in assignation.items():
+            if slot is None:
+                num_unassigned += 1
+                continue
+            self.solution[morceau] = slot
+
+            # repérer les absents forcés
+            p, s = P.morceau_id[morceau], P.creneau_id[slot]
+            musiciens_ids = P.musiciens_de[p]
+            for musicien_id in musiciens_ids[P.disponibilite[musiciens_ids, s] == DISPO_NON]:
+                self.musiciens_absents_force[morceau].add(P.musiciens[musicien_id])
+        return num_unassigned
+
+    def adopter_solution(self, assignation: Dict[str, Optional[str]]):
+        """
+        Prend une assignation calculée ailleurs (décomposition) comme solution finale ;
+        son objectif est évalué par le modèle, en la donnant comme indice complet.
+        """
+        self.solution = {}
+        self.musiciens_absents_force.clear()
+        self.warm_start = {m: assignation.get(m) for m in self.morceaux}
+        self.build_model()
+        self.valeur_objectif, self.borne_objectif = self.objectif_indice, None
+        self._enregistrer_solution(self.warm_start)
+        self.status = cp_model.FEASIBLE if self.solution else cp_model.INFEASIBLE
+
+    def _solve_anytime(self):
+        """
+        Solve avec publication de chaque solution. Un thread surveille la demande d'arrêt :
+        le callback n'est appelé qu'à une nouvelle solution, l'utilisateur ne doit pas attendre la suivante.
+        """
+        callback = _IncumbentCallback(self, self._stream)
+        fini = threading.Event()
+
+        def surveiller():
+            while not fini.wait(0.2):
+                if self._stream.arret_demande():
+                    self.solver.StopSearch()
+                    return
+
+        surveillant = threading.Thread(target=surveiller, daemon=True)
+        surveillant.start()
+        try:
+            return self.solver.Solve(self.model, callback)
+        finally:
+            fini.set()
+            surveillant.join()
+
     def generer_planning(self):
+        # solve() construit le modèle lui-même
         self.load_data()
-        self.build_model()
         self.solve()
 
     def export_planning(self, directory=".", base_filename="planning"):
@@ -514,29 +666,10 @@ class RepetitionScheduler:
         os.makedirs(directory, exist_ok=True)
         filename = f"{base_filename}_maybe{self.maybe_penalty}_load{self.max_load}_abs{self.seuil_absence}_timeout{self.generation_time_limit}.xlsx"
         path = os.path.join(directory, filename)
-        # Constantes pour le tri et formatage (comme dans get_json_data)
-        DAY_ORDER = {"Lundi":1, "Mardi":2, "Mercredi":3, "Jeudi":4,"Vendredi":5,"Samedi":6,"Dimanche":7, 
-                    "LUN":1, "MAR":2, "MER":3, "JEU":4, "VEN":5, "SAM":6, "DIM":7}
-        DAY_NAMES = {"LUN":"Lundi", "MAR":"Mardi", "MER":"Mercredi", "JEU":"Jeudi", 
-                    "VEN":"Vendredi", "SAM":"Samedi", "DIM":"Dimanche"}
-
+        # Formatage (Slot.affichage, comme dans get_json_data) et tri chronologique
         def slot_sort_key(slot):
-            jour, heures = format_slot(slot)
-            reel_jour = jour.split(" ")[0]  # "Lundi 05" → "Lundi"
-            return (DAY_ORDER[reel_jour], heures)
-
-        def format_slot(slot: str) -> tuple[str,str]:
-            """
-            slot est au format "JOUR_DATE_START-END", ex. "LUN_05_14:00-16:00"
-            Retourne (affichage_jour, affichage_heures),
-            par exemple ("Lundi 05", "14:00-16:00").
-            """
-            try:
-                jour_code, date_num, periode = slot.split("_")
-            except ValueError:
-                return slot, ""
-            jour_aff = DAY_NAMES.get(jour_code, jour_code)
-            return f"{jour_aff} {date_num}", periode
+            # ordre chronologique du calendrier (date puis heure), pas seulement le jour de la semaine
+            return self.calendrier.ordre.get(slot, len(self.creneaux))
 
         # --- 1) DataFrame "Planning" ---
         planning_rows = []
@@ -550,7 +683,7 @@ class RepetitionScheduler:
                     })
             else:
                 slot = self.solution[morceau]
-                jour, heures = format_slot(slot)
+                jour, heures = creneau(slot).affichage
                 planning_rows.append({
                     "Morceau": morceau,
                     "Jour": jour,
@@ -561,10 +694,10 @@ class RepetitionScheduler:
         
         # Tri du planning par jour
         if not df_planning.empty:
-            df_planning["jour_order"] = df_planning["Jour"].apply(
-                lambda x: DAY_ORDER.get(x.split(" ")[0], 99) if x != "Non assigné" else 100
+            df_planning["jour_order"] = df_planning["Morceau"].map(
+                lambda m: slot_sort_key(self.solution[m]) if m in self.solution else len(self.creneaux)
             )
-            df_planning.sort_values(["jour_order", "Heures"], inplace=True)
+            df_planning.sort_values("jour_order", kind="stable", inplace=True)
             df_planning.drop("jour_order", axis=1, inplace=True)
 
         # --- 2) DataFrames par semaine ---
@@ -575,17 +708,15 @@ class RepetitionScheduler:
         # Pour chaque semaine détectée
         for w in self.weeks:
             # Sélection et tri des slots de la semaine w
-            week_slots = [s for s in self.creneaux
-                        if self.date2week[int(s.split("_")[1])] == w]
-            week_slots = sorted(week_slots, key=slot_sort_key)
+            week_slots = self.calendrier.creneaux_de_semaine(w)
 
             # --- DataFrame Disponibilités pour cette semaine ---
             dispo_rows = []
             for slot in week_slots:
-                jour, heures = format_slot(slot)
+                jour, heures = creneau(slot).affichage
                 row = {"Jour": jour, "Heures": heures}
                 for m in musiciens:
-                    row[m] = self.disponibilites.get(m, {}).get(slot, "non")
+                    row[m] = self.disponibilites.get(m, {}).get(slot, "no")
                 dispo_rows.append(row)
             
             dispo_dfs[f"Dispo_Semaine_{w}"] = pd.DataFrame(dispo_rows)
@@ -593,13 +724,20 @@ class RepetitionScheduler:
             # --- DataFrame Répartition pour cette semaine ---
             repart_rows = []
             for slot in week_slots:
-                jour, heures = format_slot(slot)
+                jour, heures = creneau(slot).affichage
                 piece = next((p for p,s in self.solution.items() if s==slot), None)
                 row = {"Jour": jour, "Heures": heures, "Morceau": piece or ""}
                 for m in musiciens:
                     if piece and m in self.repartition.get(piece, []):
-                        dispo = self.disponibilites.get(m,{}).get(slot,"non")
-                        row[m] = "Répète" if dispo=="oui" else "Répète"
+                        dispo = self.disponibilites.get(m,{}).get(slot,"no")
+                        if dispo.lower() in ["oui", "yes"]:
+                            row[m] = "Répète"
+                        elif dispo.lower() in ["non", "no"]:
+                            row[m] = "Absent"
+                        elif dispo.lower() in ["peut-être", "maybe"]:
+                            row[m] = "Maybe"
+                        else:
+                            row[m] = ""
                     else:
                         row[m] = ""
                 repart_rows.append(row)
@@ -637,9 +775,9 @@ class RepetitionScheduler:
             for row in ws.iter_rows(min_row=2, min_col=3):
                 for cell in row:
                     v = (cell.value or "").strip().lower()
-                    if v == "oui":
+                    if v in ["oui", "yes"]:
                         cell.fill = fill_yes
-                    elif v in ("peut-être", "peut‐être"):
+                    elif v in ("peut-être", "peut‐être", "maybe"):
                         cell.fill = fill_maybe
                     else:
                         cell.fill = fill_no
@@ -682,33 +820,6 @@ class RepetitionScheduler:
         return path
 
     def get_json_data(self):
-        # pour trier et formater
-        DAY_ORDER = {"Lundi":1, "Mardi":2, "Mercredi":3, "Jeudi":4,"Vendredi":5,"Samedi":6,"Dimanche":7, "LUN":1, "MAR":2, "MER":3, "JEU":4, "VEN":5, "SAM":6, "DIM":7}
-        DAY_NAMES = {"LUN":"Lundi", "MAR":"Mardi", "MER":"Mercredi", "JEU":"Jeudi", "VEN":"Vendredi", "SAM":"Samedi", "DIM":"Dimanche"}
-
-        def slot_sort_key(slot):
-            jour, heures = format_slot(slot)
-            reel_jour = jour.split(" ")[0]  # "Lundi 05" → "Lundi"
-            return (DAY_ORDER[reel_jour], heures)
-
-        def format_slot(slot: str) -> tuple[str,str]:
-            """
-            slot est au format "JOUR_DATE_START-END", ex. "LUN_05_14:00-16:00"
-            Retourne (affichage_jour, affichage_heures),
-            par exemple ("Lundi 05", "14:00-16:00").
-            """
-            # 1) découpage
-            try:
-                jour_code, date_num, periode = slot.split("_")
-            except ValueError:
-                # fallback si un slot mal formé traine
-                return slot, ""
-            # 2) optionnel : mappez "LUN" → "Lundi"
-            jour_aff = DAY_NAMES.get(jour_code, jour_code)
-            # 3) compose la chaîne complète pour l’entête "Jour"
-            #    ici on peut afficher jour_aff + " " + date_num
-            return f"{jour_aff} {date_num}", periode
-
         # 1) planning final (inchangé)
         planning = []
         for morceau in self.morceaux:
@@ -721,11 +832,13 @@ class RepetitionScheduler:
                 })
             else:
                 slot = self.solution[morceau]
-                jour, heures = format_slot(slot)
+                jour, heures = creneau(slot).affichage
                 planning.append({
                     "Morceau": morceau,
                     "Jour":     jour,
                     "Heures":   heures,
+                    # semaine du calendrier (les mois comptés), pour les onglets du front
+                    "Semaine":  self.calendrier.semaine_de.get(slot),
                     "Participants": ", ".join(self.repartition.get(morceau, []))
                 })
 
@@ -737,34 +850,32 @@ class RepetitionScheduler:
         # self.weeks contient déjà [1,2,3,…]
         for w in self.weeks:
             # sélection et tri des slots de la semaine w
-            week_slots = [s for s in self.creneaux
-                        if self.date2week[int(s.split("_")[1])] == w]
-            week_slots = sorted(week_slots, key=slot_sort_key)
+            week_slots = self.calendrier.creneaux_de_semaine(w)
 
             dispo_rows  = []
             repart_rows = []
 
             # dispo
             for slot in week_slots:
-                jour, heures = format_slot(slot)
+                jour, heures = creneau(slot).affichage
                 row = {"Jour": jour, "Heures": heures}
                 for m in musiciens:
-                    row[m] = self.disponibilites.get(m, {}).get(slot, "non")
+                    row[m] = self.disponibilites.get(m, {}).get(slot, "no")
                 dispo_rows.append(row)
 
             # répartition
             for slot in week_slots:
-                jour, heures = format_slot(slot)
+                jour, heures = creneau(slot).affichage
                 piece = next((p for p,s in self.solution.items() if s==slot), None)
                 row = {"Jour": jour, "Heures": heures, "Morceau": piece or ""}
                 for m in musiciens:
                     if piece and m in self.repartition.get(piece, []):
-                        dispo = self.disponibilites.get(m,{}).get(slot,"non")
-                        if dispo=="oui":
+                        dispo = self.disponibilites.get(m,{}).get(slot,"no")
+                        if dispo.lower() in ["oui", "yes"]:
                             row[m] = "repete"
-                        elif dispo =="non":
+                        elif dispo.lower() in ["non", "no"]:
                             row[m] = "absent"
-                        elif dispo == "peut-être":
+                        elif dispo.lower() in ["peut-être", "maybe"]:
                             row[m] = "maybe_absent"
                     else:
                         row[m] = "non"
@@ -777,6 +888,10 @@ class RepetitionScheduler:
         return {
             "planning":       planning,
             "disponibilites": dispo_output,
-            "repartition":     repart_output
+            "repartition":     repart_output,
+            "assigned": len(self.solution),
+            "total": len(self.morceaux),
+            "notassigned": [m for m in self.morceaux if m not in self.solution],
+            "morceaux_sans_creneau": self.morceaux_sans_creneau
         }
     
@@ -0,0 +1,113 @@
+"""
+Description : Le créneau "LUN_04_16:00-18:00", découpé une seule fois
+Licence : On devrait peut-être mettre une licence hein
+Anno : 43
+
+Avant, chaque en-tête passait dans re.search avec sa chaîne strip().replace(), le
+créneau était reconstruit avec des f-strings, puis redécoupé avec split("_") par le tri
+de load_data (_key), le calendrier, format_slot de l'export et de get_json_data...
+Un Slot reste une str (clé de dict, JSON, comparaison avec les chaînes : rien ne change
+pour le reste du code), mais porte ses morceaux déjà calculés :
+- jour "LUN", numero 4, debut 960 et fin 1080 (minutes) ;
+- date "LUN_04" (un jour du calendrier), heures "16:00-18:00" ;
+- libelle "Lundi 04" et affichage ("Lundi 04", "16:00-18:00") pour l'export.
+Pas de mois ni d'année dans les exports : la date "LUN_04" n'est qu'un jour de la semaine
+et un numéro, et l'ordre chronologique (changements de mois compris) est celui du
+calendrier (calendar_index.py), qui le tire de l'ordre des colonnes.
+creneau() les fabrique avec un cache : un seul objet, un seul découpage par texte.
+depuis_entete() et depuis_texte() lisent les en-têtes des fichiers et les créneaux
+spéciaux saisis à la main, avec des regex compilées une fois, mémoïsées elles aussi.
+"""
+import re
+from functools import lru_cache
+from typing import Optional
+
+# En-têtes des exports ("lun. 04\n16:00 - 18:00")
+JOURS_ENTETE = {'lun.': 'LUN', 'mar.': 'MAR', 'mer.': 'MER', 'jeu.': 'JEU',
+                'ven.': 'VEN', 'sam.': 'SAM', 'dim.': 'DIM'}
+NOMS_JOURS = {"LUN": "Lundi", "MAR": "Mardi", "MER": "Mercredi", "JEU": "Jeudi",
+              "VEN": "Vendredi", "SAM": "Samedi", "DIM": "Dimanche"}
+# Créneaux spéciaux saisis à la main ("Lundi 04 16:00-18:00", "lun 04 ...")
+CODES_JOURS = dict({nom.lower(): code for code, nom in NOMS_JOURS.items()},
+                   **{code.lower(): code for code in NOMS_JOURS})
+
+MOTIF_ENTETE = re.compile(r"(\w+\.)\s+(\d+).*?(\d{1,2}):(\d{2})\s*-\s*(\d{1,2}):(\d{2})")
+MOTIF_CRENEAU = re.compile(r"([^_]+)_(\d+)_(\d{1,2}):(\d{2})-(\d{1,2}):(\d{2})")
+MOTIF_SIMPLIFIE = re.compile(r"([^_]+)_(\d+)_(\d{1,2})_(\d{1,2})")
+MOTIF_TEXTE = re.compile(r"(\w+)\s+(\d+)\s+(\d{1,2}):(\d{2})-(\d{1,2}):(\d{2})")
+
+
+def _minutes(heures: str, minutes: str) -> int:
+    return int(heures) * 60 + int(minutes)
+
+
+def ecrire(jour: str, numero: int, debut: int, fin: int) -> str:
+    """("LUN", 4, 960, 1080) -> "LUN_04_16:00-18:00"."""
+    return f"{jour}_{numero:02d}_{debut // 60:02d}:{debut % 60:02d}-{fin // 60:02d}:{fin % 60:02d}"
+
+
+class Slot(str):
+    def __new__(cls, texte: str):
+        slot = super().__new__(cls, texte)
+        m = MOTIF_CRENEAU.fullmatch(texte)
+        if m:
+            jour, numero, h1, m1, h2, m2 = m.groups()
+            slot.jour, slot.numero = jour, int(numero)
+            slot.debut, slot.fin = _minutes(h1, m1), _minutes(h2, m2)
+            slot.date, slot.heures = f"{jour}_{numero}", texte[len(jour) + len(numero) + 2:]
+            slot.libelle = f"{NOMS_JOURS.get(jour, jour)} {numero}"
+        else:
+            # créneau hors format : une date à lui tout seul, affiché tel quel
+            slot.jour, slot.numero, slot.debut, slot.fin = texte, 0, 0, 0
+            slot.date, slot.heures, slot.libelle = texte, "", texte
+        slot.affichage = (slot.libelle, slot.heures)
+        return slot
+
+
+@lru_cache(maxsize=1 << 16)
+def creneau(texte: str) -> Slot:
+    """Le Slot de ce texte, toujours le même objet (accepte un Slot)."""
+    return texte if isinstance(texte, Slot) else Slot(str(texte))
+
+
+@lru_cache(maxsize=1 << 16)
+def depuis_entete(texte: str) -> Optional[Slot]:
+    """En-tête de fichier "lun. 04\\n16:00 - 18:00" -> Slot "LUN_04_16:00-18:00", None si ce n'en est pas un."""
+    m = MOTIF_ENTETE.search(texte.replace("\n", " ").replace("\r", " "))
+    if not m:
+        return None
+    jour_txt, numero, h1, m1, h2, m2 = m.groups()
+    jour = JOURS_ENTETE.get(jour_txt.lower(), jour_txt.upper().rstrip('.'))
+    return creneau(ecrire(jour, int(numero), _minutes(h1, m1), _minutes(h2, m2)))
+
+
+@lru_cache(maxsize=1 << 12)
+def depuis_texte(texte: str) -> Optional[Slot]:
+    """
+    Créneau saisi à la main, None s'il n'est pas reconnu :
+    "LUN_04_16:00-18:00", "LUN_04_16_18" (heures pleines) ou "Lundi 04 16:00-18:00".
+    """
+    t = texte.strip().lower()
+    m = MOTIF_CRENEAU.fullmatch(t)
+    if m:
+        jour, numero, h1, m1, h2, m2 = m.groups()
+        return creneau(ecrire(jour.upper(), int(numero), _minutes(h1, m1), _minutes(h2, m2)))
+    m = MOTIF_SIMPLIFIE.fullmatch(t)
+    if m:
+        jour, numero, h1, h2 = m.groups()
+        return creneau(ecrire(jour.upper(), int(numero), int(h1) * 60, int(h2) * 60))
+    m = MOTIF_TEXTE.match(t)
+    if m and m.group(1) in CODES_JOURS:
+        jour, numero, h1, m1, h2, m2 = m.groups()
+        return creneau(ecrire(CODES_JOURS[jour], int(numero), _minutes(h1, m1), _minutes(h2, m2)))
+    return None
+
+
+if __name__ == "__main__":
+    import pickle
+
+    s = depuis_entete("lun. 04\n16:00 - 18:00 [93%]")
+    print(repr(s), s.date, s.affichage, (s.debut, s.fin), s == "LUN_04_16:00-18:00", s is creneau("LUN_04_16:00-18:00"))
+    print([depuis_texte(t) for t in ("lun_04_16:00-18:00", "LUN_4_16_18", "Lundi 04 16:00-18:00", "n'importe quoi")])
+    copie = pickle.loads(pickle.dumps(s))
+    print(type(copie).__name__, copie.libelle, creneau("hors_format").affichage)
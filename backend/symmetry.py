@@ -0,0 +1,92 @@
+"""
+Description : Détection des morceaux et des jours interchangeables, pour casser les symétries du modèle CP-SAT
+Licence : On devrait peut-être mettre une licence hein
+Anno : 43
+
+- Deux morceaux joués par exactement les mêmes musiciens (même ligne d'incidence) ont
+  les mêmes coûts partout : échanger leurs créneaux ne change rien.
+- Échanger deux créneaux seuls change la charge des jours et les répétitions groupées,
+  sauf si tout le jour suit : deux dates avec le même nombre de créneaux, les mêmes
+  enchaînements de créneaux consécutifs et, position par position, la même colonne de
+  disponibilités sont interchangeables en bloc.
+  Une classe de jours regroupe donc des créneaux de même disponibilité et de même
+  position dans la journée. Un créneau réservé (creneaux_interdits de
+  RepetitionScheduler.restreindre) ne s'échange qu'avec un créneau réservé : sinon
+  l'ordre imposé aux jours peut exiger le jour réservé et rendre le modèle vide.
+Les contraintes (voir RepetitionScheduler.add_symmetry_breaking) gardent un seul
+représentant par orbite. canonicaliser() ramène une assignation quelconque sur ce
+représentant, pour que les indices (warm start) restent compatibles.
+"""
+from collections import defaultdict
+from typing import Dict, List, Optional, Set
+
+import numpy as np
+
+# Au-delà, les poids 2^i de l'ordre lexicographique débordent les entiers de CP-SAT
+MAX_CRENEAUX_LEX = 40
+
+
+def classes_morceaux(probleme) -> List[List[int]]:
+    """Classes (d'au moins deux morceaux) de même ligne d'incidence, morceaux triés par indice."""
+    classes = defaultdict(list)
+    for p in range(len(probleme.morceaux)):
+        classes[probleme.incidence[p].tobytes()].append(p)
+    return [c for c in classes.values() if len(c) > 1]
+
+
+def classes_jours(probleme, creneaux_par_jour: Dict[str, List[str]],
+                  interdits: Set[int] = frozenset()) -> List[List[List[int]]]:
+    """
+    Classes de jours interchangeables ; un jour = la liste ordonnée des indices de ses
+    créneaux. Les jours d'une classe sont gardés dans l'ordre du calendrier.
+    interdits : indices des créneaux où aucun morceau ne peut aller.
+    """
+    classes = defaultdict(list)
+    for slots in creneaux_par_jour.values():
+        ids = [probleme.creneau_id[c] for c in slots]
+        if not ids or len(ids) > MAX_CRENEAUX_LEX:
+            continue
+        # même disponibilités position par position, mêmes créneaux consécutifs et réservés
+        consecutifs = (probleme.creneau_adjacents[ids, 1] >= 0).tobytes()
+        reserves = bytes(s in interdits for s in ids)
+        cle = probleme.disponibilite[:, ids].T.tobytes() + consecutifs + reserves + len(ids).to_bytes(2, "little")
+        classes[cle].append(ids)
+    return [c for c in classes.values() if len(c) > 1]
+
+
+def cle_jour(occupes: List[bool]) -> int:
+    """Occupation d'un jour lue comme un nombre binaire (premier créneau = bit de poids fort)."""
+    cle = 0
+    for occupe in occupes:
+        cle = 2 * cle + int(occupe)
+    return cle
+
+
+def canonicaliser(assignation: Dict[int, Optional[int]], classes_p: List[List[int]],
+                  classes_j: List[List[List[int]]]) -> Dict[int, Optional[int]]:
+    """
+    Représentant de l'orbite de l'assignation (morceau -> créneau ou None, en indices) :
+    1) dans chaque classe de jours, les jours sont réordonnés par occupation décroissante ;
+    2) dans chaque classe de morceaux, les créneaux sont redistribués par ordre croissant,
+       les non assignés en dernier.
+    L'étape 2 ne change pas les créneaux occupés, donc ne défait pas l'étape 1.
+    """
+    resultat = dict(assignation)
+    occupes = set(s for s in resultat.values() if s is not None)
+    for jours in classes_j:
+        tries = sorted(jours, key=lambda ids: -cle_jour([s in occupes for s in ids]))
+        correspondance = {}
+        for source, cible in zip(tries, jours):
+            correspondance.update(zip(source, cible))
+        resultat = {p: correspondance.get(s, s) if s is not None else None for p, s in resultat.items()}
+        occupes = set(s for s in resultat.values() if s is not None)
+
+    for morceaux in classes_p:
+        presents = [p for p in morceaux if p in resultat]
+        valeurs = sorted((resultat[p] for p in presents), key=lambda s: (s is None, s if s is not None else 0))
+        resultat.update(zip(presents, valeurs))
+    return resultat
+
+
+def poids_lex(n: int) -> np.ndarray:
+    return 2 ** np.arange(n - 1, -1, -1, dtype=np.int64)
@@ -0,0 +1,200 @@
+"""
+Description : Vérification des fichiers envoyés avant de construire le planificateur
+Licence : On devrait peut-être mettre une licence hein
+Anno : 43
+
+Un classeur mal fichu ne se voyait qu'au fond de generer_planning() : fichier lu en entier,
+parfois modèle CP-SAT construit, puis une erreur 500 avec la trace dans la console. Ici,
+deux passes, la seconde seulement si la première ne trouve pas d'erreur :
+1. en-têtes : seules les premières lignes de chaque fichier sont lues (lire_tableau avec
+   max_lignes, le xlsx et le CSV ne sont pas parcourus plus loin) ; quelques
+   millisecondes, même pour un gros export Doodle ;
+2. contenu : musiciens de la répartition absents des disponibilités, morceaux sans
+   musicien. Les disponibilités passent par le ParseCache (parse_cache.py) s'il y en a
+   un : load_data les retrouve ensuite sans les relire.
+Chaque problème est un dict {"code", "fichier", "gravite", "message", "details"} :
+- "fichier_illisible", "fichier_vide" : le fichier ne se lit pas, ou n'a aucune ligne ;
+- "titre_manquant" : pas de colonne "Titre" dans la répartition ;
+- "nom_manquant" : ni colonne "Nom", ni en-têtes de créneaux cally dans les disponibilités ;
+- "creneaux_illisibles" : aucun en-tête de créneau reconnu (erreur), ou certains
+  seulement (avertissement : ces colonnes sont ignorées, comme avant) ;
+- "dates_ambigues" : même jour de la semaine et même numéro pour deux dates (lundi 1er
+  septembre et lundi 1er décembre), confondues faute de mois (avertissement, voir
+  calendar_index.py) ;
+- "aucun_musicien" : personne dans les disponibilités ;
+- "aucun_morceau" : aucun morceau avec des musiciens (format "Nom" ; en cally, tout le
+  monde joue alors un seul "morceau", voir ingestion.charger) ;
+- "ensemble_vide" : morceaux sans musicien (avertissement : ils sont ignorés, comme avant) ;
+- "musiciens_inconnus" : musiciens de la répartition sans ligne de disponibilités ;
+- "warm_start_illisible" : la solution précédente (champ ou fichier warm_start) ne se lit
+  pas (vérifiée dans back.py, pas ici).
+Les erreurs lèvent UploadInvalide (un ValueError) ; /api/upload répond alors 422 avec
+la liste. Les avertissements sont renvoyés et ajoutés au JSON du résultat.
+"""
+from typing import Dict, List, Optional
+
+from calendar_index import CalendarIndex
+from input_formats import lire_tableau
+from ingestion import (COLONNES_INFOS_MUSICIEN, LIGNES_ENTETE_CALLY, creneaux_cally, lire_disponibilites,
+                       lire_lignes_repartitions, manquant)
+from slot import depuis_entete
+
+ERREUR = "erreur"
+AVERTISSEMENT = "avertissement"
+
+# En-têtes + lignes d'en-tête cally + un premier musicien
+LIGNES_APERCU = 1 + LIGNES_ENTETE_CALLY + 1
+# Exemples gardés dans "details" (noms, en-têtes...)
+MAX_EXEMPLES = 10
+
+
+def probleme(code: str, fichier: str, message: str, gravite: str = ERREUR, **details) -> Dict:
+    return {"code": code, "fichier": fichier, "gravite": gravite, "message": message, "details": details}
+
+
+class UploadInvalide(ValueError):
+    def __init__(self, problemes: List[Dict]):
+        self.problemes = problemes
+        super().__init__(" ; ".join(p["message"] for p in problemes if p["gravite"] == ERREUR))
+
+    def json(self) -> Dict:
+        """Réponse de l'API : "error" (message, comme les autres erreurs), "code" de la première, tous les problèmes."""
+        erreurs = [p for p in self.problemes if p["gravite"] == ERREUR]
+        return {"error": str(self), "code": erreurs[0]["code"], "problemes": self.problemes}
+
+
+class _Illisible(Exception):
+    def __init__(self, probleme: Dict):
+        self.probleme = probleme
+
+
+def _lire(fichier: str, lire, *args):
+    """lire(*args), un fichier qui ne se lit pas devient un problème "fichier_illisible"."""
+    try:
+        return lire(*args)
+    except Exception as e:  # xlsx corrompu, JSON invalide, Parquet sans pyarrow...
+        raise _Illisible(probleme("fichier_illisible", fichier, f"Fichier {fichier} illisible : {e}",
+                                  exception=type(e).__name__))
+
+
+def _exemples(valeurs) -> List[str]:
+    return [str(v) for v in list(valeurs)[:MAX_EXEMPLES]]
+
+
+# --- 1. En-têtes ---
+
+def verifier_entetes_repartitions(chemin: str) -> List[Dict]:
+    lignes = _lire("repartition", lire_tableau, chemin, LIGNES_APERCU)
+    if not lignes:
+        return [probleme("fichier_vide", "repartition", "Le fichier de répartition est vide")]
+    entetes = [v for v in lignes[0] if not manquant(v)]
+    if "Titre" not in entetes:
+        return [probleme("titre_manquant", "repartition", "Colonne 'Titre' introuvable dans la répartition",
+                         colonnes=_exemples(entetes))]
+    return []
+
+
+def verifier_entetes_disponibilites(chemin: str) -> List[Dict]:
+    lignes = _lire("disponibilites", lire_tableau, chemin, LIGNES_APERCU)
+    if not lignes:
+        return [probleme("fichier_vide", "disponibilites", "Le fichier de disponibilités est vide")]
+    entetes = list(lignes[0])
+    if "Nom" in entetes:
+        textes = [str(e) for e in entetes[COLONNES_INFOS_MUSICIEN:] if not manquant(e)]
+        illisibles = [t for t in textes if depuis_entete(t) is None]
+        creneaux = [s for s in map(depuis_entete, textes) if s is not None]
+    else:
+        # format cally : les créneaux sont dans les lignes sous les titres
+        creneaux, illisibles = creneaux_cally(lignes[1:])
+        if not creneaux and not illisibles:
+            return [probleme("nom_manquant", "disponibilites",
+                             "Ni colonne 'Nom', ni créneaux au format cally dans les disponibilités",
+                             colonnes=_exemples(v for v in entetes if not manquant(v)))]
+    if not creneaux:
+        return [probleme("creneaux_illisibles", "disponibilites",
+                         "Aucun en-tête de créneau reconnu (attendu : \"lun. 04 16:00 - 18:00\")",
+                         exemples=_exemples(illisibles))]
+    problemes = []
+    if illisibles:
+        problemes.append(probleme("creneaux_illisibles", "disponibilites",
+                                  f"{len(illisibles)} colonne(s) sans créneau reconnu, ignorées", AVERTISSEMENT,
+                                  exemples=_exemples(illisibles)))
+    ambigues = CalendarIndex(creneaux).dates_ambigues
+    if ambigues:
+        problemes.append(probleme("dates_ambigues", "disponibilites",
+                                  f"{len(ambigues)} date(s) présentes dans deux mois différents, "
+                                  "leurs créneaux seront confondus : " + ", ".join(_exemples(ambigues)),
+                                  AVERTISSEMENT, dates=_exemples(ambigues)))
+    return problemes
+
+
+# --- 2. Contenu ---
+
+def verifier_contenu(repart_path: Optional[str], dispo_path: str, cache=None) -> List[Dict]:
+    donnees = _lire("disponibilites", cache.disponibilites if cache is not None else lire_disponibilites,
+                    dispo_path)
+    connus = set(donnees["noms"]) | donnees["musiciens"]
+    if not connus:
+        return [probleme("aucun_musicien", "disponibilites", "Aucun musicien dans les disponibilités")]
+    if not repart_path:
+        return []
+
+    lignes = _lire("repartition", lire_lignes_repartitions, repart_path, True)
+    problemes = []
+    vides = [morceau for morceau, noms in lignes if not noms]
+    if len(vides) == len(lignes) and donnees["format"] == "nom":
+        return [probleme("aucun_morceau", "repartition", "Aucun morceau avec des musiciens dans la répartition")]
+    if vides:
+        problemes.append(probleme("ensemble_vide", "repartition",
+                                  f"{len(vides)} morceau(x) sans musicien, ignoré(s)", AVERTISSEMENT,
+                                  morceaux=_exemples(vides)))
+
+    inconnus = sorted({nom for _, noms in lignes for nom in noms} - connus)
+    if inconnus:
+        # souvent une question de majuscules : les noms des disponibilités sont mis en "Title Case"
+        par_forme = {nom.casefold(): nom for nom in connus}
+        suggestions = {nom: par_forme[nom.casefold()] for nom in inconnus if nom.casefold() in par_forme}
+        problemes.insert(0, probleme("musiciens_inconnus", "repartition",
+                                     f"{len(inconnus)} musicien(s) de la répartition sans disponibilités : "
+                                     + ", ".join(_exemples(inconnus)),
+                                     musiciens=_exemples(inconnus), nombre=len(inconnus),
+                                     suggestions=suggestions))
+    return problemes
+
+
+def _verifier(verifier, *args) -> List[Dict]:
+    try:
+        return verifier(*args)
+    except _Illisible as e:
+        return [e.probleme]
+
+
+def _erreurs(problemes: List[Dict]) -> bool:
+    return any(p["gravite"] == ERREUR for p in problemes)
+
+
+def valider_upload(repart_path: Optional[str], dispo_path: str, cache=None) -> List[Dict]:
+    """
+    Les deux passes (en-têtes des deux fichiers, puis contenu) ; lève UploadInvalide dès
+    qu'une passe trouve une erreur, sinon renvoie les avertissements.
+    """
+    problemes: List[Dict] = []
+    if repart_path:
+        problemes += _verifier(verifier_entetes_repartitions, repart_path)
+    problemes += _verifier(verifier_entetes_disponibilites, dispo_path)
+    if not _erreurs(problemes):
+        problemes += _verifier(verifier_contenu, repart_path, dispo_path, cache)
+    if _erreurs(problemes):
+        raise UploadInvalide(problemes)
+    return problemes
+
+
+if __name__ == "__main__":
+    import json
+    import sys
+
+    # python upload_validation.py repartitions.xlsx disponibilites.xlsx
+    try:
+        print(json.dumps(valider_upload(*sys.argv[1:3]), ensure_ascii=False, indent=2))
+    except UploadInvalide as e:
+        print(json.dumps(e.json(), ensure_ascii=False, indent=2))
@@ -0,0 +1,61 @@
+"""
+Description : Lecture d'une solution précédente pour repartir d'elle (warm start)
+Licence : On devrait peut-être mettre une licence hein
+Anno : 43
+
+Formats acceptés par charger_solution :
+- dict {morceau: "LUN_04_16:00-18:00" ou None}
+- la liste "planning" de get_json_data(), ou le JSON complet renvoyé par /api/upload
+- le texte JSON de l'un des deux (une chaîne n'est jamais prise pour un chemin : le champ
+  warm_start du formulaire arrive tel quel, il ne doit pas faire lire un fichier du serveur)
+charger_fichier_solution lit un fichier exporté par export_planning (.xlsx, feuille
+"Planning") ou un .json des formats ci-dessus ; back.py ne lui passe que le fichier envoyé
+ou le dernier export du serveur.
+Les lignes de planning ("Jour": "Lundi 04", "Heures": "16:00-18:00") sont retraduites en
+créneaux ; "Non assigné" donne None. Les morceaux ou créneaux qui n'existent plus sont
+filtrés par le planificateur, pas ici.
+"""
+import json
+from typing import Dict, List, Optional, Union
+
+import pandas as pd
+
+from slot import NOMS_JOURS, creneau
+
+CODES_JOURS = {nom: code for code, nom in NOMS_JOURS.items()}
+
+
+def creneau_depuis_planning(jour: str, heures: str) -> Optional[str]:
+    """("Lundi 04", "16:00-18:00") -> Slot "LUN_04_16:00-18:00" ; None pour "Non assigné"."""
+    morceaux = str(jour).split()
+    if len(morceaux) != 2 or morceaux[0] not in CODES_JOURS:
+        return None
+    return creneau(f"{CODES_JOURS[morceaux[0]]}_{morceaux[1]}_{str(heures).strip()}")
+
+
+def _depuis_lignes(lignes: List[Dict]) -> Dict[str, Optional[str]]:
+    return {ligne["Morceau"]: creneau_depuis_planning(ligne.get("Jour", ""), ligne.get("Heures", ""))
+            for ligne in lignes if ligne.get("Morceau")}
+
+
+def charger_fichier_solution(chemin: str) -> Dict[str, Optional[str]]:
+    """Solution précédente depuis un fichier exporté (.xlsx) ou un .json des formats ci-dessus."""
+    if str(chemin).lower().endswith((".xlsx", ".xls")):
+        planning = pd.read_excel(chemin, sheet_name="Planning")
+        return _depuis_lignes(planning.to_dict("records"))
+    with open(chemin, encoding="utf-8") as f:
+        return charger_solution(json.load(f))
+
+
+def charger_solution(source: Union[str, Dict, List]) -> Dict[str, Optional[str]]:
+    """Solution précédente morceau -> créneau (ou None), depuis un dict, une liste ou leur texte JSON."""
+    if isinstance(source, str):
+        source = json.loads(source)
+
+    if isinstance(source, dict) and "planning" in source:
+        source = source["planning"]
+    if isinstance(source, list):
+        return _depuis_lignes(source)
+    if isinstance(source, dict):
+        return {morceau: creneau or None for morceau, creneau in source.items()}
+    raise ValueError("Solution précédente illisible : dict morceau -> créneau, planning ou fichier exporté attendu")